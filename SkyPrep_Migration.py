@@ -1,1060 +1,4076 @@
-"""
-Script: SkyPrep Data Migration Tool
-Description: This tool provides functionalities for transferring data
-             from ADP reports to SkyPrep Bulk update templates
-             using an interactive GUI interface.
-Version: 1.0
-Date: 2024-12-20
-Developer: Saikat Datta
-"""
-# region Imports
-# -----------------------------------------------------------
-# Imports Section
-# Handles all library and module imports required for the script
-# -----------------------------------------------------------
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
-import openpyxl
-import os
-import openpyxl.styles
-import pandas as pd
-from datetime import datetime
-import logging
-#endregion
-
-# region Clean Report
-# -----------------------------------------------------------
-# Clean Report Section
-# Handles the cleansing of data, applying rules, and saving
-# the cleaned report to a new Excel file.
-# -----------------------------------------------------------
-clean_file_path = ""
-
-# Browse and select an Excel file
-def select_clean_file():
-    global clean_file_path
-    file_path = filedialog.askopenfilename(
-        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
-    )
-    if file_path:
-        clean_file_path = file_path
-        file_label.config(text=f"Selected File: {os.path.basename(file_path)}")
-    else:
-        file_label.config(text="No file selected")
-
-# Read the uploaded Excel file, process it, and save the result
-def start_clean_logic():
-    global clean_file_path
-    if not clean_file_path:
-        messagebox.showerror("Error", "Please upload an Excel file before starting.")
-        return
-
-    try:
-        # Determine the selected report
-        report_type = selected_report.get()
-        messagebox.showinfo("Selected Report", f"Processing: {report_type} Report")
-
-        # Create the progress bar
-        progress_bar = ttk.Progressbar(bottom_bar, orient="horizontal", mode="determinate", length=400)
-        progress_bar.pack(pady=5)
-        
-        if report_type == "All_Course_Progresses":
-            # Handle Duplicate Removal logic
-            data_frame = pd.read_excel(clean_file_path)
-            data_frame["Email_Course"] = data_frame["Email"] + " | " + data_frame["Course Name"]
-            data_frame = data_frame.sort_values(by=["Email_Course", "Start Date", "Completion Date", "Expiration Date"], ascending=[True, False, False, False])
-            data_frame_cleaned = data_frame.drop_duplicates(subset=["Email_Course"], keep="first")
-            data_frame_cleaned = data_frame_cleaned.drop(columns=["Email_Course"])
-            save_path = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
-                filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
-                title="Save Cleaned Data",
-                initialfile="Output_ADP_All_Course_Progresses_Report_Cleaned.xlsx"
-            )
-            if not save_path:
-                messagebox.showinfo("Cancelled", "Save operation was cancelled.")
-                progress_bar.pack_forget()
-                return
-            data_frame_cleaned.to_excel(save_path, index=False)
-            messagebox.showinfo("Success", f"Cleaned data saved to: {save_path}")
-
-        elif report_type == "Deficiency_Recertification":
-            # Handle Deficiency Recertification logic
-            wb = openpyxl.load_workbook(clean_file_path)
-            sheet = wb.active
-            new_wb = openpyxl.Workbook()
-            new_sheet = new_wb.active
-
-            required_columns = [
-                "Position ID", "Payroll Name", "Course Name Description",
-                "Start Date", "Recertification Date", "Acquired Date",
-            ]
-            headers = [cell.value for cell in sheet[1]]
-            required_indices = [headers.index(col) for col in required_columns]
-
-            new_sheet.append(required_columns)
-            total_rows = sheet.max_row - 1
-            progress_bar["maximum"] = total_rows
-
-            for idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=1):
-                progress_bar["value"] = idx
-                progress_bar.update()
-                row_list = list(row)
-                filtered_row = [row_list[idx] for idx in required_indices]
-
-                start_date = filtered_row[required_columns.index("Start Date")]
-                recertification_date = filtered_row[required_columns.index("Recertification Date")]
-                acquired_date = filtered_row[required_columns.index("Acquired Date")]
-
-                if start_date and not recertification_date and not acquired_date:
-                    pass
-                elif start_date and acquired_date and not recertification_date:
-                    filtered_row[required_columns.index("Recertification Date")] = None
-                    filtered_row[required_columns.index("Acquired Date")] = None
-                elif start_date and recertification_date:
-                    if recertification_date > start_date:
-                        filtered_row[required_columns.index("Acquired Date")] = start_date
-                    elif recertification_date == start_date:
-                        filtered_row[required_columns.index("Recertification Date")] = None
-                        filtered_row[required_columns.index("Acquired Date")] = None
-                    elif recertification_date < start_date:
-                        filtered_row[required_columns.index("Recertification Date")] = None
-                        filtered_row[required_columns.index("Acquired Date")] = None
-
-                new_sheet.append(filtered_row)
-
-            save_path = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
-                filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
-                title="Save Cleaned Data",
-                initialfile="Output_ADP_Deficiency_Recertification_Report_Cleaned.xlsx"
-            )
-            if not save_path:
-                messagebox.showinfo("Cancelled", "Save operation was cancelled.")
-                progress_bar.pack_forget()
-                return
-            new_wb.save(save_path)
-            messagebox.showinfo("Success", f"Cleaned data saved to: {save_path}")
-
-        elif report_type == "Policies_Certifications_Vaccines_Licences":
-            # Handle Policies, Certifications, Vaccines and Licenses logic
-            wb = openpyxl.load_workbook(clean_file_path)
-            sheet = wb.active
-            new_wb = openpyxl.Workbook()
-            new_sheet = new_wb.active
-
-            existing_columns = [
-                "Position ID", "Payroll Name", "License/Certification Description",
-                "Effective Date", "Expiration Date", "Hire Date",
-            ]
-            required_columns = [
-                "Position ID", "Payroll Name", "Course Name Description",
-                "Start Date", "Recertification Date", "Acquired Date",
-            ]
-            new_sheet.append(required_columns)
-
-            existing_headers = [cell.value for cell in sheet[1]]
-            existing_indices = [existing_headers.index(col) for col in existing_columns]
-
-            total_rows = sheet.max_row - 1
-            progress_bar["maximum"] = total_rows
-
-            for idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=1):
-                progress_bar["value"] = idx
-                progress_bar.update()
-                row_list = list(row)
-                filtered_row = [row_list[idx] for idx in existing_indices]
-
-                position_id = filtered_row[existing_columns.index("Position ID")]
-                payroll_name = filtered_row[existing_columns.index("Payroll Name")]
-                course_name_description = filtered_row[existing_columns.index("License/Certification Description")]
-                
-                start_date = filtered_row[existing_columns.index("Effective Date")]
-                recertification_date = filtered_row[existing_columns.index("Expiration Date")]
-                hire_date = filtered_row[existing_columns.index("Hire Date")]
-
-                if start_date == None:
-                    if recertification_date == None:
-                        start_date = hire_date
-                        acquired_date = None
-                    else:
-                        start_date = hire_date
-                        acquired_date = start_date
-                else:
-                    acquired_date = start_date
-                    if recertification_date == None:
-                        recertification_date = datetime(2050, 1, 1)
-
-                if recertification_date == hire_date:
-                    acquired_date == None
-                    recertification_date == None
-
-                # Prepare the row for the new sheet
-                transformed_row = [
-                    position_id or "", payroll_name or "", course_name_description or "",
-                    start_date or "", recertification_date or "", acquired_date or ""
-                ]
-                new_sheet.append(transformed_row)
-
-            save_path = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
-                filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
-                title="Save Cleaned Data",
-                initialfile="Output_ADP_Policies_Certifications_Vaccines_Licences_Report_Cleaned.xlsx"
-            )
-            if not save_path:
-                messagebox.showinfo("Cancelled", "Save operation was cancelled.")
-                progress_bar.pack_forget()
-                return
-            new_wb.save(save_path)
-            messagebox.showinfo("Success", f"Cleaned data saved to: {save_path}")
-    except Exception as e:
-        messagebox.showerror("Error", f"An error occurred: {e}")
-    finally:
-        # Remove the progress bar after completion
-        progress_bar.pack_forget()
-# endregion
-
-# region Transform Report
-# -----------------------------------------------------------
-# Transform Report Section
-# Manages the transformation of data, including mapping fields,
-# modifying structures and preparing the transformed report.
-# -----------------------------------------------------------
-transform_file_path = ""
-course_mapping_file_path = ""
-user_list_file_path = ""
-
-def select_transform_file():
-    """Browse and select the main Excel file for transformation."""
-    global transform_file_path
-    file_path = filedialog.askopenfilename(
-        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
-    )
-    if file_path:
-        transform_file_path = file_path
-        transform_file_label.config(text=f"Selected File: {os.path.basename(file_path)}")
-    else:
-        transform_file_label.config(text="No file selected")
-
-def select_course_mapping_file():
-    """Browse and select the course mapping Excel file."""
-    global course_mapping_file_path
-    file_path = filedialog.askopenfilename(
-        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
-    )
-    if file_path:
-        course_mapping_file_path = file_path
-        course_mapping_file_label.config(text=f"Selected File: {os.path.basename(file_path)}")
-    else:
-        course_mapping_file_label.config(text="No file selected")
-
-def select_user_list_file():
-    """Browse and select the user list Excel file."""
-    global user_list_file_path
-    file_path = filedialog.askopenfilename(
-        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
-    )
-    if file_path:
-        user_list_file_path = file_path
-        user_list_file_label.config(text=f"Selected File: {os.path.basename(file_path)}")
-    else:
-        user_list_file_label.config(text="No file selected")
-
-def start_transform_logic():
-    """Perform the transformation logic as per the requirements."""
-    if not (transform_file_path and course_mapping_file_path and user_list_file_path):
-        messagebox.showerror("Error", "Please upload all required files.")
-        return
-
-    try:
-        # Create the progress bar
-        progress_bar = ttk.Progressbar(bottom_bar, orient="horizontal", mode="determinate", length=400)
-        progress_bar.pack(pady=5)
-
-        # Open the main Excel file
-        main_wb = openpyxl.load_workbook(transform_file_path)
-        main_sheet = main_wb.active
-
-        # Open the course mapping Excel file
-        course_mapping_wb = openpyxl.load_workbook(course_mapping_file_path)
-        course_mapping_sheet = course_mapping_wb.active
-
-        # Open the user list Excel file
-        user_list_wb = openpyxl.load_workbook(user_list_file_path)
-        user_list_sheet = user_list_wb.active
-
-        # Create a new workbook for the transformed data
-        transformed_wb = openpyxl.Workbook()
-        transformed_sheet = transformed_wb.active
-        transformed_sheet.title = "Transformed Data"
-
-        # Create a separate sheet for "Discarded Data"
-        discarded_sheet = transformed_wb.create_sheet(title="Discarded Data")
-
-        # Create a separate sheet for rows with "Login Status: Not found"
-        not_found_sheet = transformed_wb.create_sheet(title="Not Found Records")
-
-        # Define the mapping for headers between the main file and transformed sheet
-        main_to_transformed_mapping = {
-            "Position ID": "Work phone",
-            "Course Name Description": "Course Name",
-            "Start Date": "Start Date",
-            "Recertification Date": "Expiration Date",
-            "Acquired Date": "Completion Date",
-        }
-
-        # Define additional static fields for the transformed sheet
-        additional_fields = {
-            "Login Status": lambda email: "Active" if email else "Not found",
-            "Course Progress Status": lambda recertification_date: "passed" if recertification_date else "not-started",
-            "Deadline Date": lambda: "",  # Always blank
-        }
-
-        # Write the headers to the transformed sheet
-        transformed_headers = [
-            "SkyPrep ID", "First name", "Last name", "Email",
-            "Work phone", "Course Number", "Course Name",
-            "Login Status", "Course Progress Status",
-            "Start Date", "Completion Date",
-            "Deadline Date", "Expiration Date"
-        ]
-        transformed_sheet.append(transformed_headers)
-
-        # Extract headers from the main file
-        main_headers = [cell.value for cell in main_sheet[1]]
-
-        # Map main headers to their indices
-        main_header_indices = {header: idx for idx, header in enumerate(main_headers)}
-
-        # Ensure all required headers are present in the main file
-        missing_headers = [
-            header for header in main_to_transformed_mapping.keys()
-            if header not in main_header_indices
-        ]
-        if missing_headers:
-            messagebox.showerror("Error", f"Missing required columns in main file: {', '.join(missing_headers)}")
-            return
-
-        # Write the headers to the Not Found Records sheet
-        no_records_headers = ["Position ID", "Payroll Name", "Login Status"]
-        not_found_sheet.append(no_records_headers)
-
-        # Write headers from the original source file to the "Discarded Data" sheet
-        discarded_headers = main_headers  # Same headers as the headers from main file
-        discarded_sheet.append(discarded_headers)
-
-        # Create a set to track unique position IDs in the Not Found Records sheet
-        existing_position_ids = set()
-        
-        # Initialize progress bar
-        total_rows = main_sheet.max_row - 1  # Exclude the header row
-        progress_bar["maximum"] = total_rows
-        
-        # Extract headers from the user list file
-        user_list_headers = [cell.value for cell in user_list_sheet[1]]
-
-        # Map user list headers to their indices
-        user_list_header_indices = {header: idx for idx, header in enumerate(user_list_headers)}
-
-        # Process rows in the main file
-        for idx, row in enumerate(main_sheet.iter_rows(min_row=2, values_only=True), start=1):
-            # Update progress bar
-            progress_bar["value"] = idx
-            progress_bar.update()
-
-            # Extract data from the main sheet
-            position_id = row[main_header_indices.get("Position ID")]
-            payroll_name = row[main_header_indices.get("Payroll Name")]
-            course_name_description = row[main_header_indices.get("Course Name Description")]
-            start_date = row[main_header_indices.get("Start Date")]
-            recertification_date = row[main_header_indices.get("Recertification Date")]
-            acquired_date = row[main_header_indices.get("Acquired Date")]
-
-            # Perform course mapping
-            course_number_skyprep = None
-            course_name_skyprep = None
-            for mapping_row in course_mapping_sheet.iter_rows(min_row=2, values_only=True):
-                if mapping_row[0] == course_name_description:
-                    course_number_skyprep = mapping_row[1]
-                    course_name_skyprep = mapping_row[2]
-                    break
-
-            # If course is marked as "Discard", store it in the Discarded Data sheet
-            if course_name_skyprep == "Discard":
-                discarded_sheet.append(list(row))
-                continue
-            
-            # Check if course mapping not found
-            elif course_name_skyprep == None:
-                course_name_skyprep = "Course Mapping Not Found"
-            
-            # Perform user mapping
-            skyprep = email = first_name = last_name = None
-            for user_row in user_list_sheet.iter_rows(min_row=2, values_only=True):
-                if user_row[user_list_header_indices["work_phone"]] == position_id:
-                    skyprep = user_row[user_list_header_indices["skyprep_internal_id"]]
-                    email = user_row[user_list_header_indices["email_or_username"]]
-                    first_name = user_row[user_list_header_indices["first_name"]]
-                    last_name = user_row[user_list_header_indices["last_name"]]
-                    break
-
-            # Determine additional fields
-            login_status = additional_fields["Login Status"](email)
-            course_progress_status = additional_fields["Course Progress Status"](recertification_date)
-            deadline_date = additional_fields["Deadline Date"]()
-
-            # Remove start date if course progress status is not started
-            if course_progress_status == "not-started":
-                start_date = None
-
-            # Append to the appropriate sheet
-            if login_status == "Not found":
-                # Prepare the row for the records not found sheet
-                no_records_row = [position_id or "", payroll_name or "", login_status]
-                # Check if the position_id already exists in the set
-                if position_id not in existing_position_ids:
-                    not_found_sheet.append(no_records_row)
-                    existing_position_ids.add(position_id)  # Add to the set after appending
-            else:
-                # Prepare the row for the transformed sheet
-                transformed_row = [
-                    skyprep or "", first_name or "", last_name or "",
-                    email or "", position_id or "",
-                    course_number_skyprep or "", course_name_skyprep or "",
-                    login_status, course_progress_status,
-                    start_date or "", acquired_date or "",
-                    deadline_date, recertification_date or ""
-                ]
-                transformed_sheet.append(transformed_row)
-
-        # Ask the user where to save the transformed file
-        save_path = filedialog.asksaveasfilename(
-            defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
-            title="Save Transformed Data",
-            initialfile="Output_ADP_All_Course_Progresses_Report.xlsx"
-        )
-        if not save_path:
-            messagebox.showinfo("Cancelled", "Save operation was cancelled.")
-            progress_bar.pack_forget()  # Remove progress bar on cancel
-            return
-
-        # Save the transformed workbook
-        transformed_wb.save(save_path)
-        messagebox.showinfo("Success", f"Transformed data saved to: {save_path}")
-    except Exception as e:
-        messagebox.showerror("Error", f"An error occurred: {e}")
-    finally:
-        # Remove the progress bar after completion
-        progress_bar.pack_forget()
-# endregion
-
-# region Transfer Report
-# -----------------------------------------------------------
-# Transfer Report Section
-# Facilitates data transfer operations, including organizing
-# data into the target format and saving the result.
-# -----------------------------------------------------------
-transfer_file_path = ""
-
-def select_transfer_file():
-    """Select an Excel file for the Transfer section."""
-    global transfer_file_path
-    file_path = filedialog.askopenfilename(
-        title="Select an Excel File",
-        filetypes=[("Excel Files", "*.xlsx *.xls"), ("All Files", "*.*")]
-    )
-    if file_path:
-        transfer_file_path = file_path
-        transfer_file_label.config(text=f"Selected File: {os.path.basename(file_path)}")
-    else:
-        transfer_file_label.config(text="No file selected")
-
-def generate_destination_columns(max_courses=84):
-    """Dynamically generate destination columns."""
-    columns = ['skyprep_internal_id', 'first_name', 'last_name', 'email_or_username', 'work_phone']
-    for i in range(1, max_courses + 1):
-        columns.extend([
-            f'course {i}', f'course {i} status', f'course {i} date started', f'course {i} date finished',
-            f'course {i} access date', f'course {i} deadline date', f'course {i} expiration date'
-        ])
-    return columns
-
-def start_transfer_logic():
-    """Transfer the source data into the desired format."""
-    if not (transfer_file_path):
-        messagebox.showerror("Error", "Please upload an Excel file before starting.")
-        return
-    try:
-        # Create the progress bar
-        progress_bar = ttk.Progressbar(bottom_bar, orient="horizontal", mode="determinate", length=400)
-        progress_bar.pack(pady=5)
-
-        # Load the source file
-        source_data_frame = pd.read_excel(transfer_file_path)
-
-        # Generate destination columns dynamically
-        destination_columns = generate_destination_columns()
-
-        # Initialize a list to collect rows
-        rows_list = []
-
-        # Create an empty DataFrame with the destination format columns
-        output_data_frame = pd.DataFrame(columns=destination_columns)
-        grouped = source_data_frame.groupby('SkyPrep ID')
-
-        # Set progress bar maximum to the number of groups
-        total_groups = len(grouped)
-        progress_bar["maximum"] = total_groups
-
-        for idx, (employee, group) in enumerate(grouped, start=1):
-            row = {col: '' for col in destination_columns}
-            row['skyprep_internal_id'] = employee
-            row['first_name'] = group['First name'].iloc[0]
-            row['last_name'] = group['Last name'].iloc[0]
-            row['email_or_username'] = group['Email'].iloc[0]
-            row['work_phone'] = group['Work phone'].iloc[0]
-
-            for _, course in group.iterrows():
-                course_number = course['Course Number']
-                course_name = course['Course Name']
-                course_progress_status = course['Course Progress Status']
-                start_date = course['Start Date']
-                completion_date = course['Completion Date']
-                expiration_date = course['Expiration Date']
-
-                for i in range(1, (len(destination_columns) - 5) // 7 + 1): #Static Columns=5, Dynamic Columns=7
-                    target_course_column = f'course {i}'
-                    if target_course_column in destination_columns and course_number == f'Course {i}':
-                        row[target_course_column] = course_name
-                        row[f'course {i} status'] = course_progress_status
-                        row[f'course {i} date started'] = start_date
-                        row[f'course {i} date finished'] = completion_date
-                        row[f'course {i} expiration date'] = expiration_date
-                        break
-
-            # Add the row to the list
-            rows_list.append(row)
-
-            # Update the progress bar
-            progress_bar["value"] = idx
-            progress_bar.update()
-            
-        # After processing all rows, create the final DataFrame
-        output_data_frame = pd.DataFrame(rows_list, columns=destination_columns)
-
-        # Save the transformed data to a new file
-        output_file_path = filedialog.asksaveasfilename(
-            defaultextension=".xlsx",
-            filetypes=[("Excel Files", "*.xlsx")],
-            title="Save Transformed File",
-            initialfile="Output_ADP_Bulk_Update_User_List (including courses).xlsx"
-        )
-        if output_file_path:
-            output_data_frame.to_excel(output_file_path, index=False, engine='openpyxl')
-            messagebox.showinfo("Success", f"File saved successfully:\n{output_file_path}")
-    except Exception as e:
-        messagebox.showerror("Error", f"An error occurred: {e}")
-    finally:
-        # Remove the progress bar after completion
-        progress_bar.pack_forget()
-# endregion
-
-# region Compare Report
-# -----------------------------------------------------------
-# Compare Report Section
-# Facilitates data comparison between the generated user list
-# and the bulk update user list downloaded from SkyPrep.
-# -----------------------------------------------------------
-compare_file_path = ""
-reference_file_path = ""
-
-def select_compare_file():
-    """Select the Compare Excel file."""
-    global compare_file_path
-    file_path = filedialog.askopenfilename(
-        title="Select Compare Excel File",
-        filetypes=[("Excel Files", "*.xlsx *.xls"), ("All Files", "*.*")]
-    )
-    if file_path:
-        compare_file_path = file_path
-        compare_file_label.config(text=f"Compare File: {os.path.basename(file_path)}")
-    else:
-        compare_file_label.config(text="No file selected")
-
-def select_reference_file():
-    """Select the Reference Excel file."""
-    global reference_file_path
-    file_path = filedialog.askopenfilename(
-        title="Select Reference Excel File",
-        filetypes=[("Excel Files", "*.xlsx *.xls"), ("All Files", "*.*")]
-    )
-    if file_path:
-        reference_file_path = file_path
-        reference_file_label.config(text=f"Reference File: {os.path.basename(file_path)}")
-    else:
-        reference_file_label.config(text="No file selected")
-
-def start_compare_logic():
-    """Compare the uploaded sheets and update values based on the comparison."""
-    if not (compare_file_path and reference_file_path):
-        messagebox.showerror("Error", "Please upload both files for comparison.")
-        return
-    
-    # Define the log file name
-    log_file = "update_log.txt"
-
-    # Write the header before setting up logging
-    with open(log_file, "w") as log:
-        log.write(
-            "Skyprep_ID,"
-            "Last_Name,"
-            "First_Name,"
-            "Course_ID,"
-            "Course_Name(SkyPrep),"
-            "Final_Status,"
-            "Final_Start_Date,"
-            "Final_Finish_Date,"
-            "Final_Expiration_Date,"
-            "SkyPrep_Status,"
-            "SkyPrep_Start_Date,"
-            "SkyPrep_Finish_Date,"
-            "SkyPrep_Expiration_Date,"
-            "ADP_Status,"
-            "ADP_Start_Date,"
-            "ADP_Finish_Date,"
-            "ADP_Expiration_Date,"
-            "Row_Number,"
-            "Timestamp\n")
-    
-    # Configure logging to write to a file
-    logging.basicConfig(
-        filename=log_file,
-        filemode="a", # Append mode to retain the header
-        format="%(message)s,%(asctime)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-        level=logging.INFO
-    )
-
-    try:
-        # Create a progress bar
-        progress_bar = ttk.Progressbar(bottom_bar, orient="horizontal", mode="determinate", length=400)
-        progress_bar.pack(pady=5)
-
-        # Load the Compare and Reference workbooks
-        compare_wb = openpyxl.load_workbook(compare_file_path)
-        reference_wb = openpyxl.load_workbook(reference_file_path)
-        
-        # Assume the first sheet is the active one in both files
-        compare_sheet = compare_wb.active
-        reference_sheet = reference_wb.active
-
-        # Get the headers from both sheets
-        compare_headers = [cell.value for cell in compare_sheet[1]]
-        reference_headers = [cell.value for cell in reference_sheet[1]]
-
-        # Define the key column for matching rows and declare the total number of courses
-        key_column = "skyprep_internal_id"
-        max_courses = 84
-
-        # Find the index of the key column in both sheets
-        compare_key_idx = compare_headers.index(key_column)
-        reference_key_idx = reference_headers.index(key_column)
-
-        # Initialize progress bar
-        total_rows = compare_sheet.max_row - 1  # Exclude the header row
-        progress_bar["maximum"] = total_rows
-
-        # Loop through each row in the Compare sheet (starting from the second row)
-        for compare_row_idx, compare_row in enumerate(compare_sheet.iter_rows(min_row=2, values_only=True), start=2):
-            compare_key = compare_row[compare_key_idx]
-            compare_last_name = compare_row[2]
-            compare_first_name = compare_row[1]
-
-            # Search for the matching key in the Reference sheet
-            for reference_row in reference_sheet.iter_rows(min_row=2, values_only=True):
-                if reference_row[reference_key_idx] == compare_key:
-                    
-                    # Match found - loop through all the courses
-                    for i in range(1, (max_courses + 1)):
-                        # Define course column group names dynamically
-                        column_names = [
-                            f"course {i}",
-                            f"course {i} status",
-                            f"course {i} date started",
-                            f"course {i} date finished",
-                            f"course {i} deadline date",
-                            f"course {i} expiration date",
-                        ]
-
-                        # Check if these columns exist in both sheets
-                        if all(col in compare_headers and col in reference_headers for col in column_names):
-                            # Get column indices dynamically
-                            compare_indices = {name: compare_headers.index(name) for name in column_names}
-                            reference_indices = {name: reference_headers.index(name) for name in column_names}
-
-                            # Extract values from Compare and Reference rows
-                            compare_values = {name: compare_row[idx] for name, idx in compare_indices.items()}
-                            reference_values = {name: reference_row[idx] for name, idx in reference_indices.items()}
-
-                            # Get course status
-                            compare_course_status = compare_values[f"course {i} status"]
-                            reference_course_status = reference_values[f"course {i} status"]
-
-                            # Get course dates
-                            compare_date_started = compare_values[f"course {i} date started"]
-                            compare_date_finished = compare_values[f"course {i} date finished"]
-                            compare_expiration_date = compare_values[f"course {i} expiration date"]
-
-                            reference_date_started = reference_values[f"course {i} date started"]
-                            reference_date_finished = reference_values[f"course {i} date finished"]
-                            reference_deadline_date = reference_values[f"course {i} deadline date"]
-                            reference_expiration_date = reference_values[f"course {i} expiration date"]
-
-                            # Variables for logging purpose only
-                            adp_course_status = compare_course_status
-                            adp_date_started = compare_date_started
-                            adp_date_finished = compare_date_finished
-                            adp_expiration_date = compare_expiration_date
-
-                            skyprep_course_status = reference_course_status
-                            skyprep_date_started = reference_date_started
-                            skyprep_date_finished = reference_date_finished
-                            skyprep_expiration_date = reference_expiration_date
-
-                            # Skip this course if course {i} in the Compare file is None
-                            if compare_values[f"course {i}"] is not None:
-
-                                # Initialize update needed as false
-                                update_needed = False
-
-                                # Condition 1: If course status is 'passed' in the compare sheet
-                                if compare_course_status == "passed":
-                                    if reference_course_status == "passed":
-                                        if (reference_date_started is None) and (reference_date_finished is not None):
-                                            reference_date_started = reference_date_finished
-                                        elif (reference_date_started is not None) and (reference_date_finished is None):
-                                            reference_date_finished = reference_date_started
-                                        elif (reference_date_started is None) and (reference_date_finished is None):
-                                            reference_date_started = compare_date_started
-                                            reference_date_finished = compare_date_finished
-                                            reference_expiration_date = compare_expiration_date
-
-                                        if reference_expiration_date is None:
-                                            if compare_expiration_date.strftime("%Y") == "2050":
-                                                reference_expiration_date = compare_expiration_date
-                                            else:
-                                                reference_expiration_date = reference_date_finished + (compare_expiration_date - compare_date_finished)
-
-                                        if reference_date_started.strftime("%Y-%m-%d") == compare_date_started.strftime("%Y-%d-%m"):
-                                            update_needed = False
-                                        elif reference_date_finished > compare_date_finished:
-                                            compare_values[f"course {i} date started"] = reference_date_started
-                                            compare_values[f"course {i} date finished"] = reference_date_finished
-                                            compare_values[f"course {i} expiration date"] = reference_expiration_date
-                                        
-                                            update_needed = True
-                                    else:
-                                        update_needed = False
-
-                                # Condition 2: If course status is 'not-started' in the compare sheet
-                                elif compare_course_status == "not-started":
-                                    if (reference_course_status == "passed"):
-                                        if reference_date_started is None and reference_date_finished is not None:
-                                            reference_date_started = reference_date_finished
-                                        elif reference_date_started is not None and reference_date_finished is None:
-                                            reference_date_finished = reference_date_started
-                                        
-                                        compare_values[f"course {i} status"] = reference_course_status
-                                        compare_values[f"course {i} date started"] = reference_date_started
-                                        compare_values[f"course {i} date finished"] = reference_date_finished
-                                        compare_values[f"course {i} expiration date"] = reference_expiration_date
-
-                                        update_needed = True
-                                    
-                                    elif (reference_course_status == "in-progress"):
-                                        compare_values[f"course {i} status"] = reference_course_status
-                                        compare_values[f"course {i} date started"] = reference_date_started
-                                        compare_values[f"course {i} deadline date"] = reference_deadline_date
-
-                                        update_needed = True
-
-                                    else:
-                                        update_needed = False                                        
-
-                                if update_needed == True:
-                                    # Update Compare Sheet
-                                    for key in ["status", "date started", "date finished", "deadline date", "expiration date"]:
-                                        col_name = f"course {i} {key}"
-                                        compare_sheet.cell(row=compare_row_idx, column=compare_indices[col_name] + 1).value = compare_values[col_name]
-
-                                # Log the update
-                                logging.info(
-                                    f"{compare_key},{compare_last_name},{compare_first_name},"
-                                    f"Course {i},{compare_values[f'course {i}']},"
-                                    f"{compare_values[f'course {i} status']},"
-                                    f"{compare_values[f'course {i} date started']},"
-                                    f"{compare_values[f'course {i} date finished']},"
-                                    f"{compare_values[f'course {i} expiration date']},"
-                                    f"{skyprep_course_status},{skyprep_date_started},"
-                                    f"{skyprep_date_finished},{skyprep_expiration_date},"
-                                    f"{adp_course_status},{adp_date_started},"
-                                    f"{adp_date_finished},{adp_expiration_date},"
-                                    f"{compare_row_idx}"
-                                )
-            
-            # Update the progress bar
-            progress_bar["value"] = compare_row_idx - 1  # Adjust for 1-based indexing
-            progress_bar.update()
-        
-        # Save the updated Compare workbook
-        output_file_path = filedialog.asksaveasfilename(
-            defaultextension=".xlsx",
-            filetypes=[("Excel Files", "*.xlsx")],
-            title="Save Updated Compare File",
-            initialfile="Final_Bulk_Update_File.xlsx"
-        )
-        if output_file_path:
-            compare_wb.save(output_file_path)
-            messagebox.showinfo("Success", f"Updated Compare File saved to: {output_file_path}")
-        else:
-            messagebox.showinfo("Cancelled", "Save operation was cancelled.")
-
-    except Exception as e:
-        logging.error(f"An error occurred: {e}")
-        messagebox.showerror("Error", f"An error occurred: {e}")
-    finally:
-        # Remove the progress bar after completion
-        progress_bar.pack_forget()
-# endregion
-
-# region Main Window
-# -----------------------------------------------------------
-# Main Window Section
-# Sets up the main GUI window, including navigation buttons,
-# layout configuration and frame management.
-# -----------------------------------------------------------
-
-root = tk.Tk()
-root.title("SkyPrep Migration Tool")
-root.geometry("600x400")
-root.minsize(600, 400)  # Set minimum size to prevent distortion
-root.configure(bg="#2E2E2E")  # Background color
-
-# Set favicon path for logo at the top left corner of the frame
-icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "favicon.ico")
-root.iconbitmap(icon_path)
-
-# Main container frames
-main_frame = tk.Frame(root)
-main_frame.pack(fill="both", expand=True)
-
-# Left menu frame
-menu_frame = tk.Frame(main_frame, width=150, bg="#3C3F41", relief="raised")
-menu_frame.pack(side="left", fill="y")
-
-# Right content frame
-content_frame = tk.Frame(main_frame, bg="#F5F5F5")
-content_frame.pack(side="right", expand=True, fill="both")
-
-# Bottom bar
-bottom_bar = tk.Frame(root, bg="#2E2E2E", height=50)
-bottom_bar.pack(side="bottom", fill="x")
-
-# Footer label with dynamic text
-footer_label = tk.Label(
-    bottom_bar,
-    text=f"© Voyago | {datetime.now().strftime('%Y-%m-%d')}",
-    bg="#2E2E2E",
-    fg="white",
-    font=("Arial", 10),
-)
-footer_label.pack(side="right", padx=10)
-
-# Define frames for each screen in the content area
-clean_frame = tk.Frame(content_frame, bg="#F5F5F5")
-transform_frame = tk.Frame(content_frame, bg="#F5F5F5")
-transfer_frame = tk.Frame(content_frame, bg="#F5F5F5")
-compare_frame = tk.Frame(content_frame, bg="#F5F5F5")
-
-# Place all frames on the same stack
-for frame in (clean_frame, transform_frame, transfer_frame, compare_frame):
-    frame.place(relwidth=1, relheight=1)
-
-# region Clean Screen widgets
-# Add widgets to the Clean Screen
-tk.Label(clean_frame, text="Clean Report", bg="#F5F5F5", font=("Arial", 16)).pack(pady=10)
-
-label_select_report = tk.Label(clean_frame, text="Select Report to Clean", font=("Arial", 12), bg="#F5F5F5")
-label_select_report.pack(pady=5)
-
-selected_report = tk.StringVar(value="Deficiency_Recertification")  # Default report selection
-
-radio_deficiency = tk.Radiobutton(
-    clean_frame, text="ADP Deficiency_Recertification Report", variable=selected_report,
-    value="Deficiency_Recertification", bg="#F5F5F5", font=("Arial", 10)
-)
-radio_deficiency.pack(anchor="w", padx=(50, 0), pady=(10, 0))
-
-radio_policies = tk.Radiobutton(
-    clean_frame, text="ADP Policies_Certifications_Vaccines_Licences Report", variable=selected_report,
-    value="Policies_Certifications_Vaccines_Licences", bg="#F5F5F5", font=("Arial", 10)
-)
-radio_policies.pack(anchor="w", padx=(50, 0), pady=(0, 0))
-
-radio_courses = tk.Radiobutton(
-    clean_frame, text="ADP All_Course_Progresses Report", variable=selected_report,
-    value="All_Course_Progresses", bg="#F5F5F5", font=("Arial", 10)
-)
-radio_courses.pack(anchor="w", padx=(50, 0), pady=(0, 10))
-
-clean_browse_button = tk.Button(clean_frame, text="Select Report", font=("Arial", 12),
-                                width=25, height=1, command=select_clean_file)
-clean_browse_button.pack(pady=5)
-
-file_label = tk.Label(clean_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
-file_label.pack(pady=5)
-
-start_button = tk.Button(clean_frame, text="Start Clean", font=("Arial", 14),
-                         width=20, height=2, command=start_clean_logic)
-start_button.pack(pady=10)
-# endregion
-
-# region Transform Screen widgets
-# Add widgets to the Transform Screen
-tk.Label(transform_frame, text="Transform Report", bg="#F5F5F5", font=("Arial", 16)).pack(pady=10)
-
-transform_browse_button = tk.Button(transform_frame, text="Select Cleaned Report", font=("Arial", 12),
-                                           width=25, height=1, command=select_transform_file)
-transform_browse_button.pack(pady=5)
-
-transform_file_label = tk.Label(transform_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
-transform_file_label.pack(pady=5)
-
-transform_course_mapping_button = tk.Button(transform_frame, text="Add Course Mapping", font=("Arial", 12),
-                                            width=25, height=1, command=select_course_mapping_file)
-transform_course_mapping_button.pack(pady=5)
-
-course_mapping_file_label = tk.Label(transform_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
-course_mapping_file_label.pack(pady=5)
-
-transform_user_list_button = tk.Button(transform_frame, text="Add User List", font=("Arial", 12),
-                                       width=25, height=1, command=select_user_list_file)
-transform_user_list_button.pack(pady=5)
-
-user_list_file_label = tk.Label(transform_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
-user_list_file_label.pack(pady=5)
-
-start_transform_button = tk.Button(transform_frame, text="Start Transform", font=("Arial", 14),
-                                   width=20, height=2, command=start_transform_logic)
-start_transform_button.pack(pady=10)
-# endregion
-
-# region Transfer Screen widgets
-# Add widgets to the Transfer Screen
-tk.Label(transfer_frame, text="Transfer Report", bg="#F5F5F5", font=("Arial", 16)).pack(pady=30)
-
-transfer_browse_button = tk.Button(transfer_frame, text="Select Output Report", font=("Arial", 12),
-                                   width=25, height=1, command=select_transfer_file)
-transfer_browse_button.pack(pady=5)
-
-transfer_file_label = tk.Label(transfer_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
-transfer_file_label.pack(pady=5)
-
-start_transfer_button = tk.Button(transfer_frame, text="Start Transfer", font=("Arial", 14),
-                                  width=20, height=2, command=start_transfer_logic)
-start_transfer_button.pack(pady=30)
-# endregion
-
-# region Compare Screen widgets
-# Add widgets to the Compare Screen
-tk.Label(compare_frame, text="Compare Reports", bg="#F5F5F5", font=("Arial", 16)).pack(pady=20)
-
-compare_browse_button = tk.Button(compare_frame, text="Select Generated Report", font=("Arial", 12),
-                                  width=25, height=1, command=select_compare_file)
-compare_browse_button.pack(pady=5)
-
-compare_file_label = tk.Label(compare_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
-compare_file_label.pack(pady=5)
-
-reference_browse_button = tk.Button(compare_frame, text="Select Reference Report", font=("Arial", 12),
-                                    width=25, height=1, command=select_reference_file)
-reference_browse_button.pack(pady=5)
-
-reference_file_label = tk.Label(compare_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
-reference_file_label.pack(pady=5)
-
-start_compare_button = tk.Button(compare_frame, text="Start Compare", font=("Arial", 14),
-                                 width=20, height=2, command=start_compare_logic)
-start_compare_button.pack(pady=30)
-# endregion
-
-# Bring the selected frame to the front
-def show_frame(frame):
-    frame.tkraise()
-
-# Change button color on hover to a darker version
-def on_enter(e):    
-    idx = button_widgets.index(e.widget)
-    original_color = buttons[idx][1]
-    # Darken the color slightly
-    darker_color = "#%02x%02x%02x" % tuple(max(0, int(original_color[i:i+2], 16) - 30) for i in (1, 3, 5))
-    e.widget['bg'] = darker_color
-
-# Revert button color when hover ends
-def on_leave(e):    
-    idx = button_widgets.index(e.widget)
-    e.widget['bg'] = buttons[idx][1]  # Original color
-
-# Function to dynamically resize buttons with spacing and padding
-def resize_buttons():    
-    frame_width = menu_frame.winfo_width()
-    button_width = frame_width - 2 * padding  # Button width matches the menu frame width with padding
-    button_height = 60  # Fixed height for all buttons
-
-    for idx, button in enumerate(button_widgets):
-        button.place(
-            x=padding,  # Align with padding
-            y=padding + idx * (button_height + spacing),  # Space buttons vertically
-            width=button_width,
-            height=button_height,
-        )
-
-# Define button properties
-buttons = [(text, "#E90000", frame) for text, frame in [
-    ("Clean", clean_frame),
-    ("Transform", transform_frame),
-    ("Transfer", transfer_frame),
-    ("Compare", compare_frame),
-]]
-button_widgets = []
-padding = 20  # Padding around the buttons
-spacing = 30  # Space between buttons
-
-# Add buttons to the menu frame with hover effects
-for text, color, frame in buttons:
-    btn = tk.Button(
-        menu_frame,
-        text=text,
-        bg=color,
-        fg="white",
-        font=("Arial", 12, "bold"),
-        relief="raised",
-        borderwidth=2,
-        command=lambda f=frame: show_frame(f),
-    )
-    btn.bind("<Enter>", on_enter)
-    btn.bind("<Leave>", on_leave)
-    button_widgets.append(btn)
-
-# Bind the resize event to dynamically adjust button size, padding and spacing
-menu_frame.bind("<Configure>", lambda e: resize_buttons())
-
-# Show the first screen by default
-show_frame(clean_frame)
-
-# Run the application
-root.mainloop()
-
-# endregion
\ No newline at end of file
+"""
+Script: SkyPrep Data Migration Tool
+Description: This tool provides functionalities for transferring data
+             from ADP reports to SkyPrep Bulk update templates
+             using an interactive GUI interface.
+Version: 1.0
+Date: 2024-12-20
+Developer: Saikat Datta
+"""
+# region Imports
+# -----------------------------------------------------------
+# Imports Section
+# Handles all library and module imports required for the script
+# -----------------------------------------------------------
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+import argparse
+import array
+import importlib.util
+import os
+from datetime import datetime, date, timedelta
+import logging
+import concurrent.futures
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import multiprocessing
+import pickle
+import posixpath
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import zipfile
+from xml.etree import ElementTree
+
+# Import a module on first attribute access instead of at startup
+def lazy_import(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+# pandas and openpyxl take seconds to import, so they are loaded
+# the first time a stage needs them
+openpyxl = lazy_import("openpyxl")
+pd = lazy_import("pandas")
+
+# Per-user folder for the files the app keeps between runs
+def app_data_path(*parts):
+    base_dir = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_DATA_HOME")
+                or os.path.join(os.path.expanduser("~"), ".local", "share"))
+    return os.path.join(base_dir, "SkyPrep_Migration", *parts)
+
+# Finish loading the lazy modules up front, for long-running processes
+def preload_lazy_modules():
+    for module in (openpyxl, pd):
+        dir(module)
+#endregion
+
+# region Clean Report
+# -----------------------------------------------------------
+# Clean Report Section
+# Handles the cleansing of data, applying rules, and saving
+# the cleaned report to a new Excel file.
+# -----------------------------------------------------------
+clean_file_path = ""
+
+# Browse and select an Excel file
+def select_clean_file():
+    global clean_file_path
+    file_path = filedialog.askopenfilename(
+        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
+    )
+    if file_path:
+        clean_file_path = file_path
+        file_label.config(text=f"Selected File: {os.path.basename(file_path)}")
+    else:
+        file_label.config(text="No file selected")
+
+# Columns of the cleaned Deficiency_Recertification and Policies reports
+cleaned_report_columns = [
+    "Position ID", "Payroll Name", "Course Name Description",
+    "Start Date", "Recertification Date", "Acquired Date",
+]
+
+# Columns read from the Policies_Certifications_Vaccines_Licences report
+policies_report_columns = [
+    "Position ID", "Payroll Name", "License/Certification Description",
+    "Effective Date", "Expiration Date", "Hire Date",
+]
+
+# Keep only the latest course progress per Email and Course Name
+def remove_duplicate_course_progresses(data_frame):
+    data_frame["Email_Course"] = data_frame["Email"].astype(object) + " | " + data_frame["Course Name"].astype(object)
+    data_frame = data_frame.sort_values(by=["Email_Course", "Start Date", "Completion Date", "Expiration Date"], ascending=[True, False, False, False])
+    data_frame_cleaned = data_frame.drop_duplicates(subset=["Email_Course"], keep="first")
+    return data_frame_cleaned.drop(columns=["Email_Course"])
+
+# Apply the Deficiency_Recertification date rules to one report row
+def clean_deficiency_row(row, required_indices):
+    required_columns = cleaned_report_columns
+    row_list = list(row)
+    filtered_row = [row_list[idx] for idx in required_indices]
+
+    start_date = filtered_row[required_columns.index("Start Date")]
+    recertification_date = filtered_row[required_columns.index("Recertification Date")]
+    acquired_date = filtered_row[required_columns.index("Acquired Date")]
+
+    if start_date and not recertification_date and not acquired_date:
+        pass
+    elif start_date and acquired_date and not recertification_date:
+        filtered_row[required_columns.index("Recertification Date")] = None
+        filtered_row[required_columns.index("Acquired Date")] = None
+    elif start_date and recertification_date:
+        if recertification_date > start_date:
+            filtered_row[required_columns.index("Acquired Date")] = start_date
+        elif recertification_date == start_date:
+            filtered_row[required_columns.index("Recertification Date")] = None
+            filtered_row[required_columns.index("Acquired Date")] = None
+        elif recertification_date < start_date:
+            filtered_row[required_columns.index("Recertification Date")] = None
+            filtered_row[required_columns.index("Acquired Date")] = None
+    return filtered_row
+
+# Map one Policies, Certifications, Vaccines and Licenses row to the cleaned columns
+def clean_policies_row(row, existing_indices):
+    existing_columns = policies_report_columns
+    row_list = list(row)
+    filtered_row = [row_list[idx] for idx in existing_indices]
+
+    position_id = filtered_row[existing_columns.index("Position ID")]
+    payroll_name = filtered_row[existing_columns.index("Payroll Name")]
+    course_name_description = filtered_row[existing_columns.index("License/Certification Description")]
+    
+    start_date = filtered_row[existing_columns.index("Effective Date")]
+    recertification_date = filtered_row[existing_columns.index("Expiration Date")]
+    hire_date = filtered_row[existing_columns.index("Hire Date")]
+
+    if start_date == None:
+        if recertification_date == None:
+            start_date = hire_date
+            acquired_date = None
+        else:
+            start_date = hire_date
+            acquired_date = start_date
+    else:
+        acquired_date = start_date
+        if recertification_date == None:
+            recertification_date = datetime(2050, 1, 1)
+
+    if recertification_date == hire_date:
+        acquired_date == None
+        recertification_date == None
+
+    # Prepare the row for the new sheet
+    return [
+        position_id or "", payroll_name or "", course_name_description or "",
+        start_date or "", recertification_date or "", acquired_date or ""
+    ]
+
+# Read the uploaded Excel file, process it, and save the result
+def start_clean_logic():
+    global clean_file_path
+    if not clean_file_path:
+        messagebox.showerror("Error", "Please upload an Excel file before starting.")
+        return
+    if not check_stage_inputs(selected_report.get(), [clean_file_path]):
+        return
+    try:
+        # Determine the selected report
+        report_type = selected_report.get()
+        messagebox.showinfo("Selected Report", f"Processing: {report_type} Report")
+
+        # Create the progress bar
+        progress_bar = ttk.Progressbar(bottom_bar, orient="horizontal", mode="determinate", length=400)
+        progress_bar.pack(pady=5)
+        plan_gui_stage(report_type, [clean_file_path])
+        if report_type == "All_Course_Progresses" and is_legacy_excel_file(clean_file_path) and out_of_core_mode.get():
+            messagebox.showerror("Error", "Out-of-core mode streams .xlsx workbooks only. "
+                                          "Save the .xls file as .xlsx or turn out-of-core mode off.")
+            return
+
+        save_title = "Save Cleaned Data"
+        save_initialfile = f"Output_ADP_{report_type}_Report_Cleaned.xlsx"
+
+        # Reuse the saved result of an earlier Clean of the same file
+        cache_key = gui_stage_cache_key("Clean", [clean_file_path], report_type)
+        if cache_key and stage_cache_entry(cache_key):
+            save_path = save_stage_result(cache_key, None, save_title, save_initialfile)
+            if save_path:
+                messagebox.showinfo("Success", f"Cleaned data (unchanged input, cached result) saved to: {save_path}")
+            else:
+                messagebox.showinfo("Cancelled", "Save operation was cancelled.")
+            return
+
+        if report_type == "All_Course_Progresses" and out_of_core_mode.get():
+            # Handle Duplicate Removal logic with sorted runs spilled to disk
+            cleaned_file = out_of_core_clean_course_progresses(
+                clean_file_path, memory_budget_mb=memory_budget_mb.get(),
+                progress_callback=make_progress_callback(progress_bar)
+            )
+            write_output = lambda path: shutil.move(cleaned_file, path)
+
+        elif report_type == "All_Course_Progresses":
+            # Handle Duplicate Removal logic
+            data_frame = compact_data_frame(pd.read_excel(clean_file_path))
+            data_frame_cleaned = remove_duplicate_course_progresses(data_frame)
+            write_output = lambda path: data_frame_cleaned.to_excel(path, index=False)
+
+        elif report_type == "Deficiency_Recertification":
+            # Handle Deficiency Recertification logic, decoding only the required columns
+            _, rows = read_projected_rows(clean_file_path, stage_schemas[report_type], "report")
+            new_wb = openpyxl.Workbook()
+            new_sheet = new_wb.active
+
+            required_columns = cleaned_report_columns
+            required_indices = list(range(len(required_columns)))
+
+            new_sheet.append(required_columns)
+            total_rows = count_excel_rows(clean_file_path)
+            progress_bar["maximum"] = total_rows
+
+            for idx, (_, row) in enumerate(rows, start=1):
+                progress_bar["value"] = idx
+                progress_bar.update()
+                new_sheet.append(clean_deficiency_row(row, required_indices))
+            write_output = new_wb.save
+
+        elif report_type == "Policies_Certifications_Vaccines_Licences":
+            # Handle Policies, Certifications, Vaccines and Licenses logic, decoding only the existing columns
+            _, rows = read_projected_rows(clean_file_path, stage_schemas[report_type], "report")
+            new_wb = openpyxl.Workbook()
+            new_sheet = new_wb.active
+
+            existing_columns = policies_report_columns
+            required_columns = cleaned_report_columns
+            new_sheet.append(required_columns)
+
+            existing_indices = list(range(len(existing_columns)))
+
+            total_rows = count_excel_rows(clean_file_path)
+            progress_bar["maximum"] = total_rows
+
+            for idx, (_, row) in enumerate(rows, start=1):
+                progress_bar["value"] = idx
+                progress_bar.update()
+                new_sheet.append(clean_policies_row(row, existing_indices))
+            write_output = new_wb.save
+
+        save_path = save_stage_result(cache_key, write_output, save_title, save_initialfile)
+        if report_type == "All_Course_Progresses" and out_of_core_mode.get() and os.path.exists(cleaned_file):
+            # The spilled result was not moved to the save path or the cache
+            os.remove(cleaned_file)
+        if not save_path:
+            messagebox.showinfo("Cancelled", "Save operation was cancelled.")
+            return
+        messagebox.showinfo("Success", f"Cleaned data saved to: {save_path}")
+    except Exception as e:
+        messagebox.showerror("Error", f"An error occurred: {e}")
+    finally:
+        # Remove the progress bar after completion
+        progress_bar.pack_forget()
+# endregion
+
+# region Transform Report
+# -----------------------------------------------------------
+# Transform Report Section
+# Manages the transformation of data, including mapping fields,
+# modifying structures and preparing the transformed report.
+# -----------------------------------------------------------
+transform_file_path = ""
+course_mapping_file_path = ""
+user_list_file_path = ""
+
+def select_transform_file():
+    """Browse and select the main Excel file for transformation."""
+    global transform_file_path
+    file_path = filedialog.askopenfilename(
+        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
+    )
+    if file_path:
+        transform_file_path = file_path
+        transform_file_label.config(text=f"Selected File: {os.path.basename(file_path)}")
+    else:
+        transform_file_label.config(text="No file selected")
+
+def select_course_mapping_file():
+    """Browse and select the course mapping Excel file."""
+    global course_mapping_file_path
+    file_path = filedialog.askopenfilename(
+        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
+    )
+    if file_path:
+        course_mapping_file_path = file_path
+        course_mapping_file_label.config(text=f"Selected File: {os.path.basename(file_path)}")
+    else:
+        course_mapping_file_label.config(text="No file selected")
+
+def select_user_list_file():
+    """Browse and select the user list Excel file."""
+    global user_list_file_path
+    file_path = filedialog.askopenfilename(
+        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
+    )
+    if file_path:
+        user_list_file_path = file_path
+        user_list_file_label.config(text=f"Selected File: {os.path.basename(file_path)}")
+    else:
+        user_list_file_label.config(text="No file selected")
+
+# Define the mapping for headers between the main file and transformed sheet
+main_to_transformed_mapping = {
+    "Position ID": "Work phone",
+    "Course Name Description": "Course Name",
+    "Start Date": "Start Date",
+    "Recertification Date": "Expiration Date",
+    "Acquired Date": "Completion Date",
+}
+
+# Define additional static fields for the transformed sheet
+additional_fields = {
+    "Login Status": lambda email: "Active" if email else "Not found",
+    "Course Progress Status": lambda recertification_date: "passed" if recertification_date else "not-started",
+    "Deadline Date": lambda: "",  # Always blank
+}
+
+# Headers of the transformed and Not Found Records sheets
+transformed_headers = [
+    "SkyPrep ID", "First name", "Last name", "Email",
+    "Work phone", "Course Number", "Course Name",
+    "Login Status", "Course Progress Status",
+    "Start Date", "Completion Date",
+    "Deadline Date", "Expiration Date"
+]
+no_records_headers = ["Position ID", "Payroll Name", "Login Status"]
+
+def scan_course_mapping(course_mapping_rows, course_name_description):
+    """Find the SkyPrep course number and name by scanning the course mapping rows."""
+    for mapping_row in course_mapping_rows:
+        if mapping_row[0] == course_name_description:
+            return mapping_row[1], mapping_row[2]
+    return None, None
+
+def scan_user_list(user_list_rows, user_list_header_indices, position_id):
+    """Find the SkyPrep user details by scanning the user list rows."""
+    for user_row in user_list_rows:
+        if user_row[user_list_header_indices["work_phone"]] == position_id:
+            return user_details(user_row, user_list_header_indices)
+    return None, None, None, None
+
+def user_details(user_row, user_list_header_indices):
+    """Extract the SkyPrep ID, email, first name and last name of a user row."""
+    return (
+        user_row[user_list_header_indices["skyprep_internal_id"]],
+        user_row[user_list_header_indices["email_or_username"]],
+        user_row[user_list_header_indices["first_name"]],
+        user_row[user_list_header_indices["last_name"]],
+    )
+
+def scan_transform_matches(main_rows, course_mapping_rows, user_list_rows, main_header_indices, user_list_header_indices):
+    """Pair each numbered main report row with its course mapping and user by scanning the mapping rows."""
+    for row_number, row in main_rows:
+        course_mapping = scan_course_mapping(course_mapping_rows, row[main_header_indices.get("Course Name Description")])
+
+        # Discarded courses are never matched against the user list
+        if course_mapping[1] == "Discard":
+            yield row_number, row, course_mapping, (None, None, None, None)
+            continue
+
+        user = scan_user_list(user_list_rows, user_list_header_indices, row[main_header_indices.get("Position ID")])
+        yield row_number, row, course_mapping, user
+
+def transform_row(row, main_header_indices, course_mapping, user):
+    """Transform one main report row given its course mapping and user match.
+
+    Returns the name of the sheet the row belongs to together with the
+    values to append to that sheet.
+    """
+    # Extract data from the main sheet
+    position_id = row[main_header_indices.get("Position ID")]
+    payroll_name = row[main_header_indices.get("Payroll Name")]
+    start_date = row[main_header_indices.get("Start Date")]
+    recertification_date = row[main_header_indices.get("Recertification Date")]
+    acquired_date = row[main_header_indices.get("Acquired Date")]
+
+    course_number_skyprep, course_name_skyprep = course_mapping
+
+    # If course is marked as "Discard", store it in the Discarded Data sheet
+    if course_name_skyprep == "Discard":
+        return "Discarded Data", list(row)
+
+    # Check if course mapping not found
+    elif course_name_skyprep == None:
+        course_name_skyprep = "Course Mapping Not Found"
+
+    skyprep, email, first_name, last_name = user
+
+    # Determine additional fields
+    login_status = additional_fields["Login Status"](email)
+    course_progress_status = additional_fields["Course Progress Status"](recertification_date)
+    deadline_date = additional_fields["Deadline Date"]()
+
+    # Remove start date if course progress status is not started
+    if course_progress_status == "not-started":
+        start_date = None
+
+    if login_status == "Not found":
+        # Prepare the row for the records not found sheet
+        return "Not Found Records", [position_id or "", payroll_name or "", login_status]
+
+    # Prepare the row for the transformed sheet
+    return "Transformed Data", [
+        skyprep or "", first_name or "", last_name or "",
+        email or "", position_id or "",
+        course_number_skyprep or "", course_name_skyprep or "",
+        login_status, course_progress_status,
+        start_date or "", acquired_date or "",
+        deadline_date, recertification_date or ""
+    ]
+
+def start_transform_logic():
+    """Perform the transformation logic as per the requirements."""
+    if not (transform_file_path and course_mapping_file_path and user_list_file_path):
+        messagebox.showerror("Error", "Please upload all required files.")
+        return
+    if not check_stage_inputs("Transform", [transform_file_path, course_mapping_file_path, user_list_file_path]):
+        return
+    staging_connection = None
+    try:
+        # Create the progress bar
+        progress_bar = ttk.Progressbar(bottom_bar, orient="horizontal", mode="determinate", length=400)
+        progress_bar.pack(pady=5)
+        plan_gui_stage("Transform", [transform_file_path, course_mapping_file_path, user_list_file_path])
+
+        save_title = "Save Transformed Data"
+        save_initialfile = "Output_ADP_All_Course_Progresses_Report.xlsx"
+
+        # Reuse the saved result of an earlier Transform of the same three files
+        cache_key = gui_stage_cache_key("Transform", [transform_file_path, course_mapping_file_path, user_list_file_path])
+        if cache_key and stage_cache_entry(cache_key):
+            save_path = save_stage_result(cache_key, None, save_title, save_initialfile)
+            if save_path:
+                messagebox.showinfo("Success", f"Transformed data (unchanged inputs, cached result) saved to: {save_path}")
+            else:
+                messagebox.showinfo("Cancelled", "Save operation was cancelled.")
+            return
+
+        if staging_engine_mode.get():
+            # Stage the three files in SQLite and match them with indexed joins
+            staging_connection = stage_transform_inputs(
+                staging_db_path, transform_file_path, course_mapping_file_path, user_list_file_path
+            )
+            main_headers = staged_headers(staging_connection, "adp_report")
+            total_rows = staged_row_count(staging_connection, "adp_report")
+        elif parallel_loading_mode.get():
+            # Load the three files at once and index the lookups as each one finishes
+            loaded_inputs = load_transform_inputs(transform_file_path, course_mapping_file_path, user_list_file_path)
+            main_headers, main_table = loaded_inputs["main file"]
+            total_rows = compact_table_rows(main_table)
+            main_rows = iter_compact_columns(main_table)
+        else:
+            # Open the main Excel file, decoding only the columns Transform needs
+            main_headers, main_rows = read_projected_rows(transform_file_path, stage_schemas["Transform"], "main file")
+            total_rows = count_excel_rows(transform_file_path)
+
+            # Open the course mapping Excel file, keeping the first three columns
+            _, course_mapping_rows = open_sheet_rows(course_mapping_file_path, lambda headers: [0, 1, 2])
+            course_mapping_rows = [row for _, row in course_mapping_rows]
+
+            # Open the user list Excel file, keeping the user columns
+            user_list_schema = stage_schemas["Transform User List"]
+            _, user_list_rows = read_projected_rows(user_list_file_path, user_list_schema, "user list")
+            user_list_rows = [row for _, row in user_list_rows]
+
+        # Create a new workbook for the transformed data
+        transformed_wb = openpyxl.Workbook()
+        transformed_sheet = transformed_wb.active
+        transformed_sheet.title = "Transformed Data"
+
+        # Create a separate sheet for "Discarded Data"
+        discarded_sheet = transformed_wb.create_sheet(title="Discarded Data")
+
+        # Create a separate sheet for rows with "Login Status: Not found"
+        not_found_sheet = transformed_wb.create_sheet(title="Not Found Records")
+
+        # Write the headers to the transformed sheet
+        transformed_sheet.append(transformed_headers)
+
+        # Map main headers to their indices
+        main_header_indices = {header: idx for idx, header in enumerate(main_headers)}
+
+        # Ensure all required headers are present in the main file
+        missing_headers = [
+            header for header in main_to_transformed_mapping.keys()
+            if header not in main_header_indices
+        ]
+        if missing_headers:
+            messagebox.showerror("Error", f"Missing required columns in main file: {', '.join(missing_headers)}")
+            return
+
+        # Write the headers to the Not Found Records sheet
+        not_found_sheet.append(no_records_headers)
+
+        # Write headers from the original source file to the "Discarded Data" sheet
+        discarded_headers = main_headers  # Same headers as the headers from main file
+        discarded_sheet.append(discarded_headers)
+
+        # Create a set to track unique position IDs in the Not Found Records sheet
+        existing_position_ids = set()
+        
+        # Initialize progress bar
+        progress_bar["maximum"] = total_rows
+
+        # Discarded rows of a projected read are fetched in full after the loop
+        discarded_row_numbers = []
+
+        if staging_engine_mode.get():
+            row_indices = main_header_indices
+            matched_rows = query_transform_matches(staging_connection, main_header_indices)
+        elif parallel_loading_mode.get():
+            row_indices = {header: idx for idx, header in enumerate(stage_schemas["Transform"])}
+            matched_rows = index_transform_matches(
+                main_rows, loaded_inputs["course mapping"], loaded_inputs["user list"], row_indices
+            )
+        else:
+            # Map the projected columns and user list columns to their indices
+            row_indices = {header: idx for idx, header in enumerate(stage_schemas["Transform"])}
+            user_list_header_indices = {header: idx for idx, header in enumerate(user_list_schema)}
+
+            matched_rows = scan_transform_matches(
+                main_rows, course_mapping_rows, user_list_rows, row_indices, user_list_header_indices
+            )
+
+        # Process rows in the main file
+        for idx, (row_number, row, course_mapping, user) in enumerate(matched_rows, start=1):
+            # Update progress bar
+            progress_bar["value"] = idx
+            progress_bar.update()
+
+            sheet_name, output_row = transform_row(row, row_indices, course_mapping, user)
+
+            # Append to the appropriate sheet
+            if sheet_name == "Discarded Data":
+                if staging_engine_mode.get():
+                    discarded_sheet.append(output_row)
+                else:
+                    discarded_row_numbers.append(row_number)
+            elif sheet_name == "Not Found Records":
+                position_id = row[row_indices.get("Position ID")]
+                # Check if the position_id already exists in the set
+                if position_id not in existing_position_ids:
+                    not_found_sheet.append(output_row)
+                    existing_position_ids.add(position_id)  # Add to the set after appending
+            else:
+                transformed_sheet.append(output_row)
+
+        # Fetch the full source rows of the discarded courses
+        discarded_rows = fetch_full_rows(transform_file_path, discarded_row_numbers)
+        for row_number in discarded_row_numbers:
+            discarded_sheet.append(list(discarded_rows[row_number]))
+
+        # Ask the user where to save the transformed workbook
+        save_path = save_stage_result(cache_key, transformed_wb.save, save_title, save_initialfile)
+        if not save_path:
+            messagebox.showinfo("Cancelled", "Save operation was cancelled.")
+            progress_bar.pack_forget()  # Remove progress bar on cancel
+            return
+        messagebox.showinfo("Success", f"Transformed data saved to: {save_path}")
+    except Exception as e:
+        messagebox.showerror("Error", f"An error occurred: {e}")
+    finally:
+        # Remove the progress bar after completion
+        progress_bar.pack_forget()
+        if staging_connection:
+            staging_connection.close()
+# endregion
+
+# region Transfer Report
+# -----------------------------------------------------------
+# Transfer Report Section
+# Facilitates data transfer operations, including organizing
+# data into the target format and saving the result.
+# -----------------------------------------------------------
+transfer_file_path = ""
+
+def select_transfer_file():
+    """Select an Excel file for the Transfer section."""
+    global transfer_file_path
+    file_path = filedialog.askopenfilename(
+        title="Select an Excel File",
+        filetypes=[("Excel Files", "*.xlsx *.xls"), ("All Files", "*.*")]
+    )
+    if file_path:
+        transfer_file_path = file_path
+        transfer_file_label.config(text=f"Selected File: {os.path.basename(file_path)}")
+    else:
+        transfer_file_label.config(text="No file selected")
+
+def generate_destination_columns(max_courses=84):
+    """Dynamically generate destination columns."""
+    columns = ['skyprep_internal_id', 'first_name', 'last_name', 'email_or_username', 'work_phone']
+    for i in range(1, max_courses + 1):
+        columns.extend([
+            f'course {i}', f'course {i} status', f'course {i} date started', f'course {i} date finished',
+            f'course {i} access date', f'course {i} deadline date', f'course {i} expiration date'
+        ])
+    return columns
+
+def build_transfer_row(employee, courses, destination_columns):
+    """Build one destination row from the course records of an employee."""
+    row = {col: '' for col in destination_columns}
+    row['skyprep_internal_id'] = employee
+    row['first_name'] = courses[0]['First name']
+    row['last_name'] = courses[0]['Last name']
+    row['email_or_username'] = courses[0]['Email']
+    row['work_phone'] = courses[0]['Work phone']
+
+    for course in courses:
+        course_number = course['Course Number']
+        course_name = course['Course Name']
+        course_progress_status = course['Course Progress Status']
+        start_date = course['Start Date']
+        completion_date = course['Completion Date']
+        expiration_date = course['Expiration Date']
+
+        for i in range(1, (len(destination_columns) - 5) // 7 + 1): #Static Columns=5, Dynamic Columns=7
+            target_course_column = f'course {i}'
+            if target_course_column in destination_columns and course_number == f'Course {i}':
+                row[target_course_column] = course_name
+                row[f'course {i} status'] = course_progress_status
+                row[f'course {i} date started'] = start_date
+                row[f'course {i} date finished'] = completion_date
+                row[f'course {i} expiration date'] = expiration_date
+                break
+    return row
+
+def start_transfer_logic():
+    """Transfer the source data into the desired format."""
+    if not (transfer_file_path):
+        messagebox.showerror("Error", "Please upload an Excel file before starting.")
+        return
+    if not check_stage_inputs("Transfer", [transfer_file_path]):
+        return
+    try:
+        # Create the progress bar
+        progress_bar = ttk.Progressbar(bottom_bar, orient="horizontal", mode="determinate", length=400)
+        progress_bar.pack(pady=5)
+
+        plan_gui_stage("Transfer", [transfer_file_path])
+        if is_legacy_excel_file(transfer_file_path) and out_of_core_mode.get():
+            messagebox.showerror("Error", "Out-of-core mode streams .xlsx workbooks only. "
+                                          "Save the .xls file as .xlsx or turn out-of-core mode off.")
+            return
+
+        save_title = "Save Transformed File"
+        save_initialfile = "Output_ADP_Bulk_Update_User_List (including courses).xlsx"
+
+        # Reuse the saved result of an earlier Transfer of the same file
+        cache_key = gui_stage_cache_key("Transfer", [transfer_file_path])
+        if cache_key and stage_cache_entry(cache_key):
+            output_file_path = save_stage_result(cache_key, None, save_title, save_initialfile)
+            if output_file_path:
+                messagebox.showinfo("Success", f"File saved successfully (unchanged input, cached result):\n{output_file_path}")
+            return
+
+        if out_of_core_mode.get() and sharded_output_mode.get():
+            # Stream the employees straight into the shard files
+            output_file_path = filedialog.asksaveasfilename(
+                defaultextension=".xlsx",
+                filetypes=[("Excel Files", "*.xlsx")],
+                title="Save Transformed File",
+                initialfile="Output_ADP_Bulk_Update_User_List (including courses).xlsx"
+            )
+            if output_file_path:
+                save_sharded_output(output_file_path, generate_destination_columns(), out_of_core_transfer_rows(
+                    transfer_file_path, memory_budget_mb=memory_budget_mb.get(),
+                    progress_callback=make_progress_callback(progress_bar)
+                ))
+            return
+
+        if out_of_core_mode.get():
+            # Group the courses per employee with sorted runs spilled to disk
+            transferred_file = out_of_core_transfer(
+                transfer_file_path, memory_budget_mb=memory_budget_mb.get(),
+                progress_callback=make_progress_callback(progress_bar)
+            )
+            output_file_path = save_stage_result(
+                cache_key, lambda path: shutil.move(transferred_file, path), save_title, save_initialfile
+            )
+            if output_file_path:
+                messagebox.showinfo("Success", f"File saved successfully:\n{output_file_path}")
+            if os.path.exists(transferred_file):
+                os.remove(transferred_file)
+            return
+
+        # Load only the columns Transfer needs from the source file
+        source_data_frame = compact_data_frame(pd.read_excel(transfer_file_path, usecols=stage_schemas["Transfer"]))
+
+        # Generate destination columns dynamically
+        destination_columns = generate_destination_columns()
+
+        # Initialize a list to collect rows
+        rows_list = []
+
+        # Create an empty DataFrame with the destination format columns
+        output_data_frame = pd.DataFrame(columns=destination_columns)
+        grouped = source_data_frame.groupby('SkyPrep ID')
+
+        # Set progress bar maximum to the number of groups
+        total_groups = len(grouped)
+        progress_bar["maximum"] = total_groups
+
+        for idx, (employee, group) in enumerate(grouped, start=1):
+            row = build_transfer_row(employee, group.to_dict("records"), destination_columns)
+
+            # Add the row to the list
+            rows_list.append(row)
+
+            # Update the progress bar
+            progress_bar["value"] = idx
+            progress_bar.update()
+            
+        # After processing all rows, create the final DataFrame
+        output_data_frame = pd.DataFrame(rows_list, columns=destination_columns)
+
+        # Save the transformed data to a new file
+        if sharded_output_mode.get():
+            output_file_path = filedialog.asksaveasfilename(
+                defaultextension=".xlsx",
+                filetypes=[("Excel Files", "*.xlsx")],
+                title=save_title,
+                initialfile=save_initialfile
+            )
+            if output_file_path:
+                output_rows = output_data_frame.astype(object).where(output_data_frame.notna(), None)
+                save_sharded_output(output_file_path, destination_columns, output_rows.itertuples(index=False, name=None))
+            return
+        output_file_path = save_stage_result(
+            cache_key, lambda path: output_data_frame.to_excel(path, index=False, engine='openpyxl'),
+            save_title, save_initialfile
+        )
+        if output_file_path:
+            messagebox.showinfo("Success", f"File saved successfully:\n{output_file_path}")
+    except Exception as e:
+        messagebox.showerror("Error", f"An error occurred: {e}")
+    finally:
+        # Remove the progress bar after completion
+        progress_bar.pack_forget()
+# endregion
+
+# region Compare Report
+# -----------------------------------------------------------
+# Compare Report Section
+# Facilitates data comparison between the generated user list
+# and the bulk update user list downloaded from SkyPrep.
+# -----------------------------------------------------------
+compare_file_path = ""
+reference_file_path = ""
+compare_cancel_requested = False
+compare_identity_columns = ["skyprep_internal_id", "first_name", "last_name", "email_or_username"]
+
+# Columns of the update log written by Compare
+update_log_columns = [
+    "Skyprep_ID", "Last_Name", "First_Name", "Course_ID", "Course_Name(SkyPrep)",
+    "Final_Status", "Final_Start_Date", "Final_Finish_Date", "Final_Expiration_Date",
+    "SkyPrep_Status", "SkyPrep_Start_Date", "SkyPrep_Finish_Date", "SkyPrep_Expiration_Date",
+    "ADP_Status", "ADP_Start_Date", "ADP_Finish_Date", "ADP_Expiration_Date",
+    "Row_Number", "Timestamp",
+]
+
+def select_compare_file():
+    """Select the Compare Excel file."""
+    global compare_file_path
+    file_path = filedialog.askopenfilename(
+        title="Select Compare Excel File",
+        filetypes=[("Excel Files", "*.xlsx"), ("All Files", "*.*")]
+    )
+    if file_path:
+        compare_file_path = file_path
+        compare_file_label.config(text=f"Compare File: {os.path.basename(file_path)}")
+    else:
+        compare_file_label.config(text="No file selected")
+
+def select_reference_file():
+    """Select the Reference Excel file."""
+    global reference_file_path
+    file_path = filedialog.askopenfilename(
+        title="Select Reference Excel File",
+        filetypes=[("Excel Files", "*.xlsx"), ("All Files", "*.*")]
+    )
+    if file_path:
+        reference_file_path = file_path
+        reference_file_label.config(text=f"Reference File: {os.path.basename(file_path)}")
+    else:
+        reference_file_label.config(text="No file selected")
+
+def build_course_columns(compare_headers, reference_headers, max_courses):
+    """Find the column indices of every course group present in both sheets."""
+    course_columns = []
+    for i in range(1, (max_courses + 1)):
+        # Define course column group names dynamically
+        column_names = [
+            f"course {i}",
+            f"course {i} status",
+            f"course {i} date started",
+            f"course {i} date finished",
+            f"course {i} deadline date",
+            f"course {i} expiration date",
+        ]
+
+        # Check if these columns exist in both sheets
+        if all(col in compare_headers and col in reference_headers for col in column_names):
+            # Get column indices dynamically
+            compare_indices = {name: compare_headers.index(name) for name in column_names}
+            reference_indices = {name: reference_headers.index(name) for name in column_names}
+            course_columns.append((i, compare_indices, reference_indices))
+    return course_columns
+
+def evaluate_course_updates(compare_row, reference_row, course_columns):
+    """Apply the comparison rules to every course of a matched pair of rows.
+
+    Yields, for each course assigned in the Compare row, the cell updates
+    as (column index, value) pairs and the course values to log.
+    """
+    for i, compare_indices, reference_indices in course_columns:
+        # Extract values from Compare and Reference rows
+        compare_values = {name: compare_row[idx] for name, idx in compare_indices.items()}
+        reference_values = {name: reference_row[idx] for name, idx in reference_indices.items()}
+
+        # Get course status
+        compare_course_status = compare_values[f"course {i} status"]
+        reference_course_status = reference_values[f"course {i} status"]
+
+        # Get course dates
+        compare_date_started = compare_values[f"course {i} date started"]
+        compare_date_finished = compare_values[f"course {i} date finished"]
+        compare_expiration_date = compare_values[f"course {i} expiration date"]
+
+        reference_date_started = reference_values[f"course {i} date started"]
+        reference_date_finished = reference_values[f"course {i} date finished"]
+        reference_deadline_date = reference_values[f"course {i} deadline date"]
+        reference_expiration_date = reference_values[f"course {i} expiration date"]
+
+        # Variables for logging purpose only
+        adp_course_status = compare_course_status
+        adp_date_started = compare_date_started
+        adp_date_finished = compare_date_finished
+        adp_expiration_date = compare_expiration_date
+
+        skyprep_course_status = reference_course_status
+        skyprep_date_started = reference_date_started
+        skyprep_date_finished = reference_date_finished
+        skyprep_expiration_date = reference_expiration_date
+
+        # Skip this course if course {i} in the Compare file is None
+        if compare_values[f"course {i}"] is None:
+            continue
+
+        # Initialize update needed as false
+        update_needed = False
+
+        # Condition 1: If course status is 'passed' in the compare sheet
+        if compare_course_status == "passed":
+            if reference_course_status == "passed":
+                if (reference_date_started is None) and (reference_date_finished is not None):
+                    reference_date_started = reference_date_finished
+                elif (reference_date_started is not None) and (reference_date_finished is None):
+                    reference_date_finished = reference_date_started
+                elif (reference_date_started is None) and (reference_date_finished is None):
+                    reference_date_started = compare_date_started
+                    reference_date_finished = compare_date_finished
+                    reference_expiration_date = compare_expiration_date
+
+                if reference_expiration_date is None:
+                    if compare_expiration_date.strftime("%Y") == "2050":
+                        reference_expiration_date = compare_expiration_date
+                    else:
+                        reference_expiration_date = reference_date_finished + (compare_expiration_date - compare_date_finished)
+
+                if reference_date_started.strftime("%Y-%m-%d") == compare_date_started.strftime("%Y-%d-%m"):
+                    update_needed = False
+                elif reference_date_finished > compare_date_finished:
+                    compare_values[f"course {i} date started"] = reference_date_started
+                    compare_values[f"course {i} date finished"] = reference_date_finished
+                    compare_values[f"course {i} expiration date"] = reference_expiration_date
+
+                    update_needed = True
+            else:
+                update_needed = False
+
+        # Condition 2: If course status is 'not-started' in the compare sheet
+        elif compare_course_status == "not-started":
+            if (reference_course_status == "passed"):
+                if reference_date_started is None and reference_date_finished is not None:
+                    reference_date_started = reference_date_finished
+                elif reference_date_started is not None and reference_date_finished is None:
+                    reference_date_finished = reference_date_started
+
+                compare_values[f"course {i} status"] = reference_course_status
+                compare_values[f"course {i} date started"] = reference_date_started
+                compare_values[f"course {i} date finished"] = reference_date_finished
+                compare_values[f"course {i} expiration date"] = reference_expiration_date
+
+                update_needed = True
+
+            elif (reference_course_status == "in-progress"):
+                compare_values[f"course {i} status"] = reference_course_status
+                compare_values[f"course {i} date started"] = reference_date_started
+                compare_values[f"course {i} deadline date"] = reference_deadline_date
+
+                update_needed = True
+
+            else:
+                update_needed = False
+
+        updates = []
+        if update_needed == True:
+            for key in ["status", "date started", "date finished", "deadline date", "expiration date"]:
+                col_name = f"course {i} {key}"
+                updates.append((compare_indices[col_name], compare_values[col_name]))
+
+        log_values = (
+            f"Course {i}", compare_values[f"course {i}"],
+            compare_values[f"course {i} status"],
+            compare_values[f"course {i} date started"],
+            compare_values[f"course {i} date finished"],
+            compare_values[f"course {i} expiration date"],
+            skyprep_course_status, skyprep_date_started,
+            skyprep_date_finished, skyprep_expiration_date,
+            adp_course_status, adp_date_started,
+            adp_date_finished, adp_expiration_date,
+        )
+        yield updates, log_values
+
+def format_update_log(compare_key, compare_last_name, compare_first_name, log_values, compare_row_idx):
+    """Format one line of the update log."""
+    values = (compare_key, compare_last_name, compare_first_name) + tuple(log_values) + (compare_row_idx,)
+    return ",".join(f"{value}" for value in values)
+
+def compare_course_updates(compare_row, compare_row_idx, compare_key_idx, reference_rows, course_columns):
+    """Yield the cell updates and the update log line of every assigned course of a Compare row."""
+    compare_key = compare_row[compare_key_idx]
+    compare_last_name = compare_row[2]
+    compare_first_name = compare_row[1]
+    for reference_row in reference_rows:
+        for updates, log_values in evaluate_course_updates(compare_row, reference_row, course_columns):
+            yield updates, format_update_log(
+                compare_key, compare_last_name, compare_first_name, log_values, compare_row_idx
+            )
+
+def course_group_number(header):
+    """Return the course number of a course column header, or None for other columns."""
+    match = re.fullmatch(r"course (\d+)(?: .*)?", str(header))
+    return int(match.group(1)) if match else None
+
+def compare_diff_columns(compare_headers, cell_updates):
+    """Find the identity columns and the columns of every course group that was updated."""
+    changed_courses = {course_group_number(compare_headers[column_idx - 1]) for _, column_idx in cell_updates}
+    return [
+        idx for idx, header in enumerate(compare_headers)
+        if header in compare_identity_columns or course_group_number(header) in changed_courses - {None}
+    ]
+
+def patch_value(value):
+    """Convert a cell value for the JSON patch file."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def write_compare_diff(output_path, compare_sheet, compare_headers, cell_updates, original_path=None, patch_path=None,
+                       shard_limits=None):
+    """Write only the updated employees, trimmed to the identity columns and changed course groups.
+
+    With shard_limits, a (max rows, max MB) pair, the rows are split into
+    shard files with a manifest instead of one workbook. When patch_path
+    is given, also writes a JSON patch with the old and new value of
+    every changed cell, read back from original_path. Returns the number
+    of rows written.
+    """
+    columns = compare_diff_columns(compare_headers, cell_updates)
+    updated_rows = {row_idx for row_idx, _ in cell_updates}
+    diff_rows = (
+        (row_idx, row) for row_idx, row in enumerate(compare_sheet.iter_rows(min_row=2, values_only=True), start=2)
+        if row_idx in updated_rows
+    )
+    diff_headers = [compare_headers[idx] for idx in columns]
+    if shard_limits:
+        write_sharded_excel(output_path, diff_headers, ([row[idx] for idx in columns] for _, row in diff_rows),
+                            max_rows=shard_limits[0], max_mb=shard_limits[1])
+    else:
+        write_rows_to_excel(output_path, diff_headers, ([row[idx] for idx in columns] for _, row in diff_rows))
+
+    if patch_path:
+        row_updates = {}
+        for (row_idx, column_idx), value in sorted(cell_updates.items()):
+            row_updates.setdefault(row_idx, []).append((column_idx - 1, value))
+        original_rows = fetch_full_rows(original_path, updated_rows)
+        key_idx = compare_headers.index("skyprep_internal_id")
+        patch_rows = []
+        for row_idx, updates in row_updates.items():
+            original_row = original_rows[row_idx]
+            changes = [
+                {"column": compare_headers[idx], "old": patch_value(original_row[idx]), "new": patch_value(value)}
+                for idx, value in updates if original_row[idx] != value
+            ]
+            patch_rows.append({"row": row_idx, "skyprep_internal_id": original_row[key_idx], "changes": changes})
+        with open(patch_path, "w") as patch_file:
+            json.dump({
+                "source": os.path.basename(original_path),
+                "key_column": "skyprep_internal_id",
+                "rows": patch_rows,
+            }, patch_file, indent=2, default=str)
+    return len(updated_rows)
+
+def request_compare_cancel():
+    """Ask the running Compare to stop after the current row."""
+    global compare_cancel_requested
+    compare_cancel_requested = True
+
+def start_compare_logic():
+    """Compare the uploaded sheets and update values based on the comparison."""
+    global compare_cancel_requested
+    if not (compare_file_path and reference_file_path):
+        messagebox.showerror("Error", "Please upload both files for comparison.")
+        return
+    if not check_stage_inputs("Compare", [compare_file_path, reference_file_path]):
+        return
+    # Reuse the saved result and update log of an earlier Compare of the same files
+    save_title = "Save Updated Compare File"
+    save_initialfile = "Final_Bulk_Update_File.xlsx"
+    cache_key = None if diff_output_mode.get() else gui_stage_cache_key("Compare", [compare_file_path, reference_file_path])
+    cached_log_path = stage_cache_entry(cache_key, "update_log.txt") if cache_key else None
+    if cached_log_path and stage_cache_entry(cache_key):
+        try:
+            shutil.copyfile(cached_log_path, "update_log.txt")
+            output_file_path = save_stage_result(cache_key, None, save_title, save_initialfile)
+            if output_file_path:
+                messagebox.showinfo("Success", f"Updated Compare File (unchanged inputs, cached result) saved to: {output_file_path}")
+            else:
+                messagebox.showinfo("Cancelled", "Save operation was cancelled.")
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {e}")
+        return
+
+    # Offer to resume from the last checkpoint of the same pair of files
+    compare_checkpoint_path = compare_checkpoint_file(compare_file_path, reference_file_path)
+    checkpoint = load_compare_checkpoint(compare_checkpoint_path, compare_file_path, reference_file_path)
+    if checkpoint and not messagebox.askyesno(
+        "Resume Compare",
+        f"A previous Compare of these files stopped after row {checkpoint['last_row']}. Resume from there?"
+    ):
+        checkpoint = None
+    if checkpoint is None:
+        checkpoint = new_compare_checkpoint(compare_file_path, reference_file_path)
+    # Start the journal of this run from a compact snapshot
+    save_compare_checkpoint(compare_checkpoint_path, checkpoint)
+    compare_cancel_requested = False
+    
+    # Define the log file name
+    log_file = "update_log.txt"
+
+    # Write the header before setting up logging
+    with open(log_file, "w") as log:
+        log.write(",".join(update_log_columns) + "\n")
+
+        # Restore the audit records of a resumed run
+        for message, timestamp in checkpoint["audit_records"]:
+            log.write(f"{message},{timestamp}\n")
+    
+    # Configure logging to write to a file
+    logging.basicConfig(
+        filename=log_file,
+        filemode="a", # Append mode to retain the header
+        format="%(message)s,%(asctime)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        level=logging.INFO
+    )
+
+    staging_connection = None
+    try:
+        # Create a progress bar
+        progress_bar = ttk.Progressbar(bottom_bar, orient="horizontal", mode="determinate", length=400)
+        progress_bar.pack(pady=5)
+
+        # Create a button to cancel the Compare after the current row
+        cancel_button = tk.Button(bottom_bar, text="Cancel Compare", font=("Arial", 10), command=request_compare_cancel)
+        cancel_button.pack(pady=5)
+        plan_gui_stage("Compare", [compare_file_path, reference_file_path])
+
+        # Define the key column for matching rows and declare the total number of courses
+        key_column = "skyprep_internal_id"
+        max_courses = 84
+
+        if staging_engine_mode.get():
+            # Load the Compare workbook, assuming the first sheet is the active one
+            compare_wb = openpyxl.load_workbook(compare_file_path)
+
+            # Stage the Reference file in SQLite and look up matches by index
+            staging_connection = stage_compare_reference(staging_db_path, reference_file_path)
+            reference_headers = staged_headers(staging_connection, "reference_bulk")
+            reference_key_column = staged_column(staging_connection, "reference_bulk", key_column)
+        elif parallel_loading_mode.get():
+            # Parse the Reference file in a worker process while the Compare workbook loads
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+                reference_future = executor.submit(load_sheet_table, reference_file_path)
+                compare_wb = openpyxl.load_workbook(compare_file_path)
+                reference_headers, reference_rows = reference_future.result()
+            reference_index = index_rows_by_key(
+                (row for _, row in reference_rows), reference_headers.index(key_column)
+            )
+        else:
+            # Load the Compare workbook, assuming the first sheet is the active one
+            compare_wb = openpyxl.load_workbook(compare_file_path)
+            reference_wb = openpyxl.load_workbook(reference_file_path)
+            reference_sheet = reference_wb.active
+            reference_headers = [cell.value for cell in reference_sheet[1]]
+        compare_sheet = compare_wb.active
+        compare_headers = [cell.value for cell in compare_sheet[1]]
+
+        # Find the index of the key column in both sheets
+        compare_key_idx = compare_headers.index(key_column)
+        reference_key_idx = reference_headers.index(key_column)
+
+        # Find the course column groups present in both sheets
+        course_columns = build_course_columns(compare_headers, reference_headers, max_courses)
+
+        # Initialize progress bar
+        total_rows = compare_sheet.max_row - 1  # Exclude the header row
+        progress_bar["maximum"] = total_rows
+
+        # Re-apply the cell updates of a resumed run
+        for (row_idx, column_idx), value in checkpoint["cell_updates"].items():
+            compare_sheet.cell(row=row_idx, column=column_idx).value = value
+        last_checkpoint_time = time.monotonic()
+        journal_rows = []
+        cancelled = False
+
+        if parallel_compare_mode.get():
+            # Evaluate the remaining rows on all cores, one partition of employees per worker
+            if staging_engine_mode.get():
+                partition_reference_rows = (row for _, row in open_sheet_rows(reference_file_path)[1])
+            elif parallel_loading_mode.get():
+                partition_reference_rows = (row for _, row in reference_rows)
+            else:
+                partition_reference_rows = reference_sheet.iter_rows(min_row=2, values_only=True)
+            remaining_rows = (
+                (row_idx, row) for row_idx, row in enumerate(compare_sheet.iter_rows(min_row=2, values_only=True), start=2)
+                if row_idx > checkpoint["last_row"]
+            )
+            resumed_rows = max(checkpoint["last_row"] - 1, 0)
+            report_progress = make_progress_callback(progress_bar)
+
+            # A cancel stops the partitions and the row loop below stops at the first row, because
+            # the partitions finish out of row order and only applied rows are checkpointed
+            partitioned_updates = partitioned_compare(
+                remaining_rows, partition_reference_rows, course_columns, compare_key_idx, reference_key_idx,
+                progress_callback=lambda done, total: report_progress(resumed_rows + done, total_rows),
+                cancel_check=lambda: compare_cancel_requested
+            )
+
+        # Loop through each row in the Compare sheet (starting from the second row)
+        for compare_row_idx, compare_row in enumerate(compare_sheet.iter_rows(min_row=2, values_only=True), start=2):
+            # Skip the rows already processed by a resumed run
+            if compare_row_idx <= checkpoint["last_row"]:
+                continue
+
+            # Stop at a row boundary when the user cancels
+            if compare_cancel_requested:
+                cancelled = True
+                break
+
+            row_cell_updates = {}
+            row_audit_records = []
+            compare_key = compare_row[compare_key_idx]
+
+            # Search for the matching key in the Reference sheet
+            if parallel_compare_mode.get():
+                reference_rows = None
+            elif staging_engine_mode.get():
+                reference_rows = query_staged_rows(staging_connection, "reference_bulk", reference_key_column, compare_key)
+            elif parallel_loading_mode.get():
+                reference_rows = reference_index.get(compare_key, [])
+            else:
+                reference_rows = (
+                    reference_row for reference_row in reference_sheet.iter_rows(min_row=2, values_only=True)
+                    if reference_row[reference_key_idx] == compare_key
+                )
+
+            # Match found - loop through all the courses, or take the results of the partitioned run
+            if parallel_compare_mode.get():
+                course_updates = partitioned_updates.get(compare_row_idx, [])
+            else:
+                course_updates = compare_course_updates(
+                    compare_row, compare_row_idx, compare_key_idx, reference_rows, course_columns
+                )
+            for updates, message in course_updates:
+                # Update Compare Sheet
+                for column_idx, value in updates:
+                    compare_sheet.cell(row=compare_row_idx, column=column_idx + 1).value = value
+                    row_cell_updates[(compare_row_idx, column_idx + 1)] = value
+
+                # Log the update
+                logging.info(message)
+                row_audit_records.append((message, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+            # Record the completed row and append the new rows to the journal periodically
+            checkpoint["cell_updates"].update(row_cell_updates)
+            checkpoint["audit_records"].extend(row_audit_records)
+            checkpoint["last_row"] = compare_row_idx
+            journal_rows.append((compare_row_idx, row_cell_updates, row_audit_records))
+            if time.monotonic() - last_checkpoint_time >= compare_checkpoint_interval:
+                append_compare_journal(compare_checkpoint_path, journal_rows)
+                journal_rows = []
+                last_checkpoint_time = time.monotonic()
+            
+            # Update the progress bar
+            progress_bar["value"] = compare_row_idx - 1  # Adjust for 1-based indexing
+            progress_bar.update()
+
+        save_compare_checkpoint(compare_checkpoint_path, checkpoint)
+        if cancelled:
+            messagebox.showinfo(
+                "Cancelled",
+                f"Compare cancelled after row {checkpoint['last_row']}. Start Compare again to resume."
+            )
+            return
+        
+        if diff_output_mode.get():
+            # Save only the employees and course groups that changed
+            output_file_path = filedialog.asksaveasfilename(
+                defaultextension=".xlsx",
+                filetypes=[("Excel Files", "*.xlsx")],
+                title="Save Compare Changes",
+                initialfile="Final_Bulk_Update_Changes.xlsx"
+            )
+            if not output_file_path:
+                messagebox.showinfo("Cancelled", "Save operation was cancelled.")
+                return
+            patch_path = f"{os.path.splitext(output_file_path)[0]}_patch.json" if diff_patch_file.get() else None
+            shard_limits = (shard_max_rows.get(), shard_max_mb.get()) if sharded_output_mode.get() else None
+            changed_rows = write_compare_diff(
+                output_file_path, compare_sheet, compare_headers, checkpoint["cell_updates"],
+                original_path=compare_file_path, patch_path=patch_path, shard_limits=shard_limits
+            )
+            clear_compare_checkpoint(compare_checkpoint_path)
+            if shard_limits:
+                manifest_path = f"{os.path.splitext(output_file_path)[0]}_manifest.json"
+                messagebox.showinfo("Success", f"{changed_rows} changed employees saved in shard files.\nManifest: {manifest_path}")
+            else:
+                messagebox.showinfo("Success", f"{changed_rows} changed employees saved to: {output_file_path}")
+            return
+
+        # Save the updated Compare workbook
+        if sharded_output_mode.get():
+            output_file_path = filedialog.asksaveasfilename(
+                defaultextension=".xlsx",
+                filetypes=[("Excel Files", "*.xlsx")],
+                title=save_title,
+                initialfile=save_initialfile
+            )
+        else:
+            # The cache keeps the result even if the save dialog is cancelled
+            output_file_path = save_stage_result(
+                cache_key, compare_wb.save, save_title, save_initialfile, extra_files=[log_file]
+            )
+            if cache_key:
+                clear_compare_checkpoint(compare_checkpoint_path)
+        if output_file_path and sharded_output_mode.get():
+            output_rows = compare_sheet.iter_rows(values_only=True)
+            save_sharded_output(output_file_path, next(output_rows), output_rows)
+            clear_compare_checkpoint(compare_checkpoint_path)
+        elif output_file_path:
+            clear_compare_checkpoint(compare_checkpoint_path)
+            messagebox.showinfo("Success", f"Updated Compare File saved to: {output_file_path}")
+        else:
+            messagebox.showinfo("Cancelled", "Save operation was cancelled.")
+
+    except Exception as e:
+        # Keep the progress of the completed rows for the next run
+        if checkpoint["last_row"] > 1:
+            save_compare_checkpoint(compare_checkpoint_path, checkpoint)
+        logging.error(f"An error occurred: {e}")
+        messagebox.showerror("Error", f"An error occurred: {e}")
+    finally:
+        # Remove the progress bar and cancel button after completion
+        progress_bar.pack_forget()
+        cancel_button.pack_forget()
+        if staging_connection:
+            staging_connection.close()
+# endregion
+
+# region Out-of-Core Engine
+# -----------------------------------------------------------
+# Out-of-Core Engine Section
+# Handles reports larger than the available memory by reading
+# them in chunks, spilling sorted runs to temporary files and
+# merging the runs back in a single streaming pass.
+# -----------------------------------------------------------
+default_memory_budget_mb = 512  # Memory allowed for one in-memory sorted run
+max_merge_fan_in = 64  # Maximum number of runs merged at once
+progress_update_interval = 1000  # Rows processed between progress bar updates
+
+def make_progress_callback(progress_bar):
+    """Create a callback that reports (done, total) progress to a progress bar."""
+    def report_progress(done, total):
+        progress_bar["maximum"] = max(total, done, 1)
+        progress_bar["value"] = done
+        progress_bar.update()
+    return report_progress
+
+def count_excel_rows(file_path):
+    """Return the number of data rows recorded in the sheet dimension."""
+    dimension = read_sheet_dimension(file_path)
+    if dimension:
+        return max(dimension[0] - 1, 0)
+    return max(scan_last_row_number(file_path) - 1, 0)
+
+def iter_excel_rows(file_path):
+    """Stream the rows of the active sheet, starting with the header row.
+
+    Rows are padded to the header width, because read-only sheets of files
+    without a dimension drop the trailing empty cells of each row.
+    """
+    wb = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        width = None
+        for row in wb.active.iter_rows(values_only=True):
+            if width is None:
+                width = len(row)
+            elif len(row) < width:
+                row = row + (None,) * (width - len(row))
+            yield row
+    finally:
+        wb.close()
+
+def estimate_row_size(row):
+    """Estimate the memory held by one row and its cell values."""
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+
+class DescendingText(str):
+    """Text that compares in reverse order, so it sorts descending inside an ascending sort key."""
+    __slots__ = ()
+
+    def __lt__(self, other):
+        return str.__gt__(self, other)
+
+    def __le__(self, other):
+        return str.__ge__(self, other)
+
+    def __gt__(self, other):
+        return str.__lt__(self, other)
+
+    def __ge__(self, other):
+        return str.__le__(self, other)
+
+def descending_sort_key(value):
+    """Sort key that orders values descending with blanks last, like pandas."""
+    if value is None:
+        return (2, 0)
+    if isinstance(value, datetime):
+        return (0, -((value - datetime.min) // timedelta(microseconds=1)))
+    if isinstance(value, date):
+        return (0, -((datetime.combine(value, datetime.min.time()) - datetime.min) // timedelta(microseconds=1)))
+    if isinstance(value, (int, float)):
+        return (0, -value)
+    return (1, DescendingText(value))
+
+def ascending_sort_key(value):
+    """Sort key that orders mixed values ascending with blanks last."""
+    if value is None:
+        return (2, 0)
+    if isinstance(value, (int, float)):
+        return (0, value)
+    return (1, str(value))
+
+def spill_sorted_run(entries, temp_dir):
+    """Write an already sorted list of entries to a temporary run file."""
+    file_descriptor, run_path = tempfile.mkstemp(suffix=".run", dir=temp_dir)
+    with os.fdopen(file_descriptor, "wb") as run_file:
+        for entry in entries:
+            pickle.dump(entry, run_file, protocol=pickle.HIGHEST_PROTOCOL)
+    return run_path
+
+def read_sorted_run(run_path):
+    """Stream the entries of a run file back in sorted order."""
+    with open(run_path, "rb") as run_file:
+        while True:
+            try:
+                yield pickle.load(run_file)
+            except EOFError:
+                return
+
+def merge_sorted_runs(run_paths, temp_dir):
+    """Merge run files, reducing them in passes when there are too many to open at once."""
+    while len(run_paths) > max_merge_fan_in:
+        merged_paths = []
+        for start in range(0, len(run_paths), max_merge_fan_in):
+            batch = run_paths[start:start + max_merge_fan_in]
+            merged_paths.append(spill_sorted_run(heapq.merge(*[read_sorted_run(path) for path in batch]), temp_dir))
+            for path in batch:
+                os.remove(path)
+        run_paths[:] = merged_paths
+    return heapq.merge(*[read_sorted_run(path) for path in run_paths])
+
+def external_sort(rows, sort_key, memory_budget_mb=None, temp_dir=None, row_codec=None):
+    """Sort rows that may not fit in memory, keeping the input order for equal keys.
+
+    With a row_codec from make_row_codec, rows are buffered and spilled in
+    their compact encoding and decoded again as they are yielded.
+    """
+    budget_bytes = (memory_budget_mb or default_memory_budget_mb) * 1024 * 1024
+    encode_row, decode_row = row_codec or (None, None)
+    run_paths = []
+    buffer = []
+    buffer_size = 0
+    try:
+        for sequence, row in enumerate(rows):
+            key = sort_key(row)
+            if encode_row:
+                row = encode_row(row)
+            buffer.append((key, sequence, row))
+            buffer_size += estimate_row_size(row) + estimate_row_size(key)
+
+            # Spill the buffer as a sorted run once the memory budget is reached
+            if buffer_size >= budget_bytes:
+                buffer.sort()
+                run_paths.append(spill_sorted_run(buffer, temp_dir))
+                buffer = []
+                buffer_size = 0
+
+        buffer.sort()
+        if not run_paths:
+            # Everything fit in memory, no merge needed
+            for _, _, row in buffer:
+                yield decode_row(row) if decode_row else row
+            return
+
+        if buffer:
+            run_paths.append(spill_sorted_run(buffer, temp_dir))
+            buffer = []
+        for _, _, row in merge_sorted_runs(run_paths, temp_dir):
+            yield decode_row(row) if decode_row else row
+    finally:
+        for path in run_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+def write_rows_to_excel(file_path, headers, rows):
+    """Stream a header row and data rows into a new workbook."""
+    wb = openpyxl.Workbook(write_only=True)
+    sheet = wb.create_sheet()
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    wb.save(file_path)
+
+def write_tables_to_excel(file_path, sheets):
+    """Stream several (headers, rows) tables into a new workbook, one sheet per title."""
+    wb = openpyxl.Workbook(write_only=True)
+    for title, (headers, rows) in sheets.items():
+        sheet = wb.create_sheet(title=title)
+        sheet.append(headers)
+        for row in rows:
+            sheet.append(row)
+    wb.save(file_path)
+
+def track_progress(rows, total_rows, progress_callback):
+    """Pass rows through while reporting progress every few rows."""
+    for idx, row in enumerate(rows, start=1):
+        if progress_callback and idx % progress_update_interval == 0:
+            progress_callback(idx, total_rows)
+        yield row
+    if progress_callback:
+        progress_callback(total_rows, total_rows)
+
+def out_of_core_clean_course_progresses(source_path, memory_budget_mb=None, progress_callback=None):
+    """Remove duplicate course progresses from a report larger than memory.
+
+    Keeps the latest record per Email and Course Name, the same as the
+    in-memory pandas sort and drop_duplicates, and returns the path of a
+    temporary workbook with the cleaned rows.
+    """
+    rows = iter_excel_rows(source_path)
+    headers = list(next(rows))
+    email_idx = headers.index("Email")
+    course_idx = headers.index("Course Name")
+    date_indices = [headers.index(col) for col in ["Start Date", "Completion Date", "Expiration Date"]]
+
+    def email_course(row):
+        if row[email_idx] is None or row[course_idx] is None:
+            return None
+        return f"{row[email_idx]} | {row[course_idx]}"
+
+    def sort_key(row):
+        return (ascending_sort_key(email_course(row)),) + tuple(descending_sort_key(row[idx]) for idx in date_indices)
+
+    def keep_first_per_email_course(sorted_rows):
+        previous_key = object()
+        for row in sorted_rows:
+            key = email_course(row)
+            if key != previous_key:
+                previous_key = key
+                yield row
+
+    total_rows = count_excel_rows(source_path)
+    temp_dir = tempfile.mkdtemp(prefix="skyprep_clean_")
+    try:
+        sorted_rows = external_sort(track_progress(rows, total_rows, progress_callback),
+                                    sort_key, memory_budget_mb, temp_dir, make_row_codec(headers))
+        file_descriptor, cleaned_file = tempfile.mkstemp(suffix=".xlsx")
+        os.close(file_descriptor)
+        try:
+            write_rows_to_excel(cleaned_file, headers, keep_first_per_email_course(sorted_rows))
+        except BaseException:
+            # Do not leave a partial workbook behind
+            os.remove(cleaned_file)
+            raise
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return cleaned_file
+
+def out_of_core_transfer_rows(source_path, memory_budget_mb=None, progress_callback=None):
+    """Stream the destination rows for a report larger than memory.
+
+    Sorts the course rows by SkyPrep ID with spilled runs and yields one
+    destination row per employee, in the order of generate_destination_columns.
+    """
+    headers = stage_schemas["Transfer"]
+    _, numbered_rows = read_projected_rows(source_path, headers, "source file")
+    rows = (row for _, row in numbered_rows)
+    skyprep_idx = headers.index("SkyPrep ID")
+    destination_columns = generate_destination_columns()
+
+    total_rows = count_excel_rows(source_path)
+    temp_dir = tempfile.mkdtemp(prefix="skyprep_transfer_")
+    try:
+        sorted_rows = external_sort(track_progress(rows, total_rows, progress_callback),
+                                    lambda row: ascending_sort_key(row[skyprep_idx]),
+                                    memory_budget_mb, temp_dir, make_row_codec(headers))
+        # Employees without a SkyPrep ID are dropped, as in pandas groupby
+        grouped = itertools.groupby(
+            (row for row in sorted_rows if row[skyprep_idx] is not None),
+            key=lambda row: row[skyprep_idx]
+        )
+        for employee, group in grouped:
+            courses = [dict(zip(headers, row)) for row in group]
+            row = build_transfer_row(employee, courses, destination_columns)
+            yield [row[col] for col in destination_columns]
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def out_of_core_transfer(source_path, memory_budget_mb=None, progress_callback=None):
+    """Group the courses per employee for a report larger than memory.
+
+    Returns the path of a temporary workbook with one destination row
+    per employee.
+    """
+    file_descriptor, transferred_file = tempfile.mkstemp(suffix=".xlsx")
+    os.close(file_descriptor)
+    try:
+        write_rows_to_excel(
+            transferred_file, generate_destination_columns(),
+            out_of_core_transfer_rows(source_path, memory_budget_mb, progress_callback)
+        )
+    except BaseException:
+        # Do not leave a partial workbook behind
+        os.remove(transferred_file)
+        raise
+    return transferred_file
+# endregion
+
+# region Compact Columns
+# -----------------------------------------------------------
+# Compact Columns Section
+# Encodes repetitive text columns as integer codes into a shared
+# category list and dates as day numbers, so the in-memory tables
+# and the spilled runs of the out-of-core sorts hold small integers
+# instead of separate string and datetime objects for every cell.
+# -----------------------------------------------------------
+
+# Text columns with a bounded set of values, repeated across the employees. The sorted runs
+# leave per-employee columns such as Email, names, Position ID and Work phone as text,
+# because their category lists would grow with every employee for the whole run.
+compact_categorical_columns = [
+    "Course Name", "Course Number", "Course Progress Status", "Login Status",
+    "Course Name Description", "License/Certification Description",
+]
+
+# In-memory tables hold every row anyway, so they also code the per-employee columns
+# that repeat once for each course of an employee
+compact_table_columns = compact_categorical_columns + ["Payroll Name", "Email"]
+
+# Date columns of the cleaned, transformed and course progress reports
+compact_date_columns = [
+    "Start Date", "Completion Date", "Expiration Date", "Deadline Date",
+    "Recertification Date", "Acquired Date", "Effective Date", "Hire Date",
+]
+missing_day_number = 0  # Day numbers start at 1, so 0 marks a blank date
+missing_category_code = -1  # Marks a blank cell in a category code array
+
+def day_number(value):
+    """Return the day number of a midnight datetime, or None if the value is not one."""
+    if isinstance(value, datetime) and value.tzinfo is None and value.hour == value.minute == value.second == value.microsecond == 0:
+        return value.toordinal()
+    return None
+
+def make_row_codec(headers, categorical_columns=compact_categorical_columns, date_columns=compact_date_columns,
+                   categories=None):
+    """Create encode and decode functions for the rows of a table.
+
+    Encoding replaces the text of categorical columns with codes into a
+    category list shared by all rows, and midnight datetimes of date
+    columns with day numbers. Values of any other type are kept wrapped
+    in a 1-tuple, so decoding is lossless. Pass a categories list to
+    share it with the caller, or to decode rows encoded elsewhere.
+    """
+    categorical_indices = [idx for idx, header in enumerate(headers) if header in categorical_columns]
+    date_indices = [idx for idx, header in enumerate(headers) if header in date_columns]
+    categories = [] if categories is None else categories
+    category_codes = {value: code for code, value in enumerate(categories)}
+
+    def encode(row):
+        encoded_row = list(row)
+        for idx in categorical_indices:
+            value = encoded_row[idx]
+            if isinstance(value, str):
+                code = category_codes.get(value)
+                if code is None:
+                    code = category_codes[value] = len(categories)
+                    categories.append(value)
+                encoded_row[idx] = code
+            elif value is not None:
+                encoded_row[idx] = (value,)
+        for idx in date_indices:
+            value = encoded_row[idx]
+            if value is not None:
+                number = day_number(value)
+                encoded_row[idx] = (value,) if number is None else number
+        return tuple(encoded_row)
+
+    def decode(encoded_row):
+        row = list(encoded_row)
+        for idx in categorical_indices:
+            value = row[idx]
+            if value is not None:
+                row[idx] = categories[value] if isinstance(value, int) else value[0]
+        for idx in date_indices:
+            value = row[idx]
+            if value is not None:
+                row[idx] = datetime.fromordinal(value) if isinstance(value, int) else value[0]
+        return tuple(row)
+
+    return encode, decode
+
+def compact_column_blanks(headers, categorical_columns, date_columns):
+    """Return the value that marks a blank cell in each code array column, or None for the text columns."""
+    return [
+        missing_category_code if header in categorical_columns
+        else missing_day_number if header in date_columns
+        else None
+        for header in headers
+    ]
+
+def encode_compact_columns(headers, numbered_rows, categorical_columns=compact_table_columns,
+                           date_columns=compact_date_columns):
+    """Store (row number, values) rows column by column, for holding a large table in memory.
+
+    Category codes and day numbers are kept in int32 arrays. A coded
+    column that meets a value without a code, such as a number in a
+    text column, falls back to a list of coded values. Returns a
+    picklable table for iter_compact_columns.
+    """
+    categories = []
+    encode, _ = make_row_codec(headers, categorical_columns, date_columns, categories)
+    blanks = compact_column_blanks(headers, categorical_columns, date_columns)
+    row_numbers = array.array("i")
+    columns = [[] if blank is None else array.array("i") for blank in blanks]
+    for row_number, row in numbered_rows:
+        row_numbers.append(row_number)
+        for idx, value in enumerate(encode(row)):
+            column = columns[idx]
+            if isinstance(column, array.array):
+                if value is None:
+                    value = blanks[idx]
+                elif not isinstance(value, int):
+                    column = columns[idx] = [None if code == blanks[idx] else code for code in column]
+            column.append(value)
+    return {
+        "headers": list(headers), "categorical_columns": list(categorical_columns), "date_columns": list(date_columns),
+        "categories": categories, "row_numbers": row_numbers, "columns": columns,
+    }
+
+def compact_table_rows(table):
+    """Return the number of rows of a table from encode_compact_columns."""
+    return len(table["row_numbers"])
+
+def iter_compact_columns(table):
+    """Decode the (row number, values) rows of a table from encode_compact_columns, one at a time."""
+    headers = table["headers"]
+    _, decode = make_row_codec(headers, table["categorical_columns"], table["date_columns"], table["categories"])
+    blanks = compact_column_blanks(headers, table["categorical_columns"], table["date_columns"])
+    code_columns = [(column, blanks[idx] if isinstance(column, array.array) else None)
+                    for idx, column in enumerate(table["columns"])]
+    for position, row_number in enumerate(table["row_numbers"]):
+        encoded_row = []
+        for column, blank in code_columns:
+            value = column[position]
+            encoded_row.append(None if blank is not None and value == blank else value)
+        yield row_number, decode(encoded_row)
+
+def compact_data_frame(data_frame, categorical_columns=compact_table_columns):
+    """Hold the repetitive text columns of a pandas table as categoricals.
+
+    Date columns are left alone, because pandas already holds them as
+    datetime64 numbers rather than Python objects.
+    """
+    for column in categorical_columns:
+        if column in data_frame.columns and not isinstance(data_frame[column].dtype, pd.CategoricalDtype):
+            data_frame[column] = data_frame[column].astype("category")
+    return data_frame
+# endregion
+
+# region Streaming Sheet Reader
+# -----------------------------------------------------------
+# Streaming Sheet Reader Section
+# Reads the active sheet straight from the workbook XML and
+# decodes only the columns a stage declares in its schema, so
+# wide ADP exports are not converted cell by cell in full.
+# -----------------------------------------------------------
+spreadsheet_ns = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+relationships_ns = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+package_relationships_ns = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Columns each stage reads from its input files
+stage_schemas = {
+    "Deficiency_Recertification": cleaned_report_columns,
+    "Policies_Certifications_Vaccines_Licences": policies_report_columns,
+    "Transform": [
+        "Position ID", "Payroll Name", "Course Name Description",
+        "Start Date", "Recertification Date", "Acquired Date",
+    ],
+    "Transform User List": ["skyprep_internal_id", "email_or_username", "first_name", "last_name", "work_phone"],
+    "Transfer": [
+        "SkyPrep ID", "First name", "Last name", "Email", "Work phone",
+        "Course Number", "Course Name", "Course Progress Status",
+        "Start Date", "Completion Date", "Expiration Date",
+    ],
+}
+
+def column_index_from_reference(cell_reference):
+    """Convert a cell reference such as "BC12" into a 0-based column index."""
+    column_idx = 0
+    for character in cell_reference:
+        if not character.isalpha():
+            break
+        column_idx = column_idx * 26 + (ord(character.upper()) - 64)
+    return column_idx - 1
+
+def active_sheet_xml_path(archive):
+    """Find the XML part of the active sheet inside an opened workbook archive."""
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    workbook_view = workbook.find(f"{spreadsheet_ns}bookViews/{spreadsheet_ns}workbookView")
+    active_tab = int(workbook_view.get("activeTab", 0)) if workbook_view is not None else 0
+    sheets = workbook.findall(f"{spreadsheet_ns}sheets/{spreadsheet_ns}sheet")
+    relationship_id = sheets[min(active_tab, len(sheets) - 1)].get(f"{relationships_ns}id")
+
+    relationships = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for relationship in relationships.iter(f"{package_relationships_ns}Relationship"):
+        if relationship.get("Id") == relationship_id:
+            target = relationship.get("Target")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise ValueError("The workbook has no active sheet.")
+
+def workbook_epoch(archive):
+    """Return the date epoch of the workbook, which differs for 1904 based files."""
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    properties = workbook.find(f"{spreadsheet_ns}workbookPr")
+    if properties is not None and properties.get("date1904") in ("1", "true"):
+        return openpyxl.utils.datetime.CALENDAR_MAC_1904
+    return openpyxl.utils.datetime.CALENDAR_WINDOWS_1900
+
+def read_shared_strings(archive):
+    """Load the shared strings table of a workbook archive."""
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    shared_strings = []
+    with archive.open("xl/sharedStrings.xml") as shared_strings_file:
+        for _, element in ElementTree.iterparse(shared_strings_file):
+            if element.tag != f"{spreadsheet_ns}si":
+                continue
+            # Plain text or rich text runs, skipping phonetic hints
+            text = element.find(f"{spreadsheet_ns}t")
+            if text is not None:
+                shared_strings.append(text.text or "")
+            else:
+                shared_strings.append("".join(
+                    run.findtext(f"{spreadsheet_ns}t") or "" for run in element.findall(f"{spreadsheet_ns}r")
+                ))
+            element.clear()
+    return shared_strings
+
+def read_date_styles(archive):
+    """Return the indices of the cell styles that format numbers as dates."""
+    if "xl/styles.xml" not in archive.namelist():
+        return set()
+    styles = ElementTree.fromstring(archive.read("xl/styles.xml"))
+    number_formats = dict(openpyxl.styles.numbers.BUILTIN_FORMATS)
+    for number_format in styles.iter(f"{spreadsheet_ns}numFmt"):
+        number_formats[int(number_format.get("numFmtId"))] = number_format.get("formatCode")
+    cell_formats = styles.find(f"{spreadsheet_ns}cellXfs")
+    if cell_formats is None:
+        return set()
+    return {
+        style_idx for style_idx, cell_format in enumerate(cell_formats.findall(f"{spreadsheet_ns}xf"))
+        if openpyxl.styles.numbers.is_date_format(number_formats.get(int(cell_format.get("numFmtId", 0))) or "")
+    }
+
+def decode_cell(cell, shared_strings, date_styles, epoch):
+    """Convert a cell element of the sheet XML into its Python value."""
+    cell_type = cell.get("t", "n")
+    if cell_type == "inlineStr":
+        inline_string = cell.find(f"{spreadsheet_ns}is")
+        return "".join(text.text or "" for text in inline_string.iter(f"{spreadsheet_ns}t")) if inline_string is not None else None
+
+    value = cell.findtext(f"{spreadsheet_ns}v")
+    if value is None:
+        return None
+    if cell_type == "s":
+        return shared_strings[int(value)]
+    if cell_type in ("str", "e"):
+        return value
+    if cell_type == "b":
+        return value == "1"
+    if cell_type == "d":
+        return datetime.fromisoformat(value)
+
+    number = float(value) if any(character in value for character in ".eE") else int(value)
+    if int(cell.get("s", 0)) in date_styles:
+        return openpyxl.utils.datetime.from_excel(number, epoch=epoch)
+    return number
+
+def read_archive_dimension(archive):
+    """Return the (rows, columns) recorded in the dimension of the active sheet, if any."""
+    with archive.open(active_sheet_xml_path(archive)) as sheet_file:
+        for _, element in ElementTree.iterparse(sheet_file, events=("start",)):
+            if element.tag == f"{spreadsheet_ns}dimension":
+                last_cell = element.get("ref", "").split(":")[-1]
+                row_digits = "".join(character for character in last_cell if character.isdigit())
+                return int(row_digits or 1), column_index_from_reference(last_cell) + 1
+            if element.tag == f"{spreadsheet_ns}sheetData":
+                return None
+
+def read_sheet_dimension(file_path):
+    """Return the (rows, columns) of the active sheet from its dimension metadata, if any."""
+    with zipfile.ZipFile(file_path) as archive:
+        return read_archive_dimension(archive)
+
+def parse_row_element(row_element, wanted, shared_strings, date_styles, epoch):
+    """Decode the wanted cells of a row element into {column index: value}."""
+    values = {}
+    next_column_idx = 0
+    for cell in row_element.iter(f"{spreadsheet_ns}c"):
+        reference = cell.get("r")
+        column_idx = column_index_from_reference(reference) if reference else next_column_idx
+        next_column_idx = column_idx + 1
+        if wanted is None or column_idx in wanted:
+            values[column_idx] = decode_cell(cell, shared_strings, date_styles, epoch)
+    return values
+
+def scan_last_row_number(file_path):
+    """Find the last row number of the active sheet by scanning the raw XML, for files without a dimension."""
+    row_pattern = re.compile(rb'<(?:\w+:)?row\b[^>]*?\br="(\d+)"')
+    last_row_number = 0
+    tail = b""
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open(active_sheet_xml_path(archive)) as sheet_file:
+            while True:
+                chunk = sheet_file.read(1024 * 1024)
+                if not chunk:
+                    break
+                data = tail + chunk
+                for match in row_pattern.finditer(data):
+                    last_row_number = int(match.group(1))
+                # Keep the end of the chunk in case a row tag is split across chunks
+                tail = data[-256:]
+    return last_row_number
+
+def open_sheet_rows(file_path, select_columns=None, row_numbers=None):
+    """Open the active sheet of a workbook for streaming.
+
+    Returns the header values and a generator of (row number, values) for
+    the data rows. select_columns receives the headers and returns the
+    column positions to decode; cells in other columns are skipped without
+    conversion. Without it, every column up to the sheet width is returned.
+    With row_numbers, only those rows are decoded and returned. Formula
+    cells return their cached value.
+    """
+    archive = zipfile.ZipFile(file_path)
+    try:
+        shared_strings = read_shared_strings(archive)
+        date_styles = read_date_styles(archive)
+        epoch = workbook_epoch(archive)
+        dimension = read_archive_dimension(archive)
+        sheet_file = archive.open(active_sheet_xml_path(archive))
+        row_elements = (
+            element for _, element in ElementTree.iterparse(sheet_file)
+            if element.tag == f"{spreadsheet_ns}row"
+        )
+
+        # The first row holds the headers and is always decoded in full
+        header_element = next(row_elements, None)
+        if header_element is None:
+            header_row_number, header_values = 1, {}
+        else:
+            header_row_number = int(header_element.get("r", 1))
+            header_values = parse_row_element(header_element, None, shared_strings, date_styles, epoch)
+            header_element.clear()
+        header_width = max(header_values) + 1 if header_values else 0
+        width = max(header_width, dimension[1] if dimension else 0)
+        headers = [header_values.get(idx) for idx in range(width)]
+        positions = list(select_columns(headers)) if select_columns else list(range(width))
+    except Exception:
+        archive.close()
+        raise
+
+    def data_rows():
+        wanted = set(positions)
+        expected_row_number = header_row_number + 1
+        try:
+            for row_element in row_elements:
+                row_number = int(row_element.get("r", expected_row_number))
+
+                # Rows without any cells are not stored in the XML
+                while expected_row_number < row_number:
+                    if row_numbers is None or expected_row_number in row_numbers:
+                        yield expected_row_number, tuple(None for _ in positions)
+                    expected_row_number += 1
+                expected_row_number = row_number + 1
+
+                # Skip unwanted rows before decoding any of their cells
+                if row_numbers is not None and row_number not in row_numbers:
+                    row_element.clear()
+                    continue
+                values = parse_row_element(row_element, wanted, shared_strings, date_styles, epoch)
+                row_element.clear()
+                yield row_number, tuple(values.get(idx) for idx in positions)
+        finally:
+            sheet_file.close()
+            archive.close()
+
+    return headers, data_rows()
+
+def schema_positions(schema, description="input file"):
+    """Build a column selector that resolves schema columns against the header row."""
+    def select_columns(headers):
+        missing_columns = [column for column in schema if column not in headers]
+        if missing_columns:
+            raise ValueError(f"Missing required columns in {description}: {', '.join(map(str, missing_columns))}")
+        return [headers.index(column) for column in schema]
+    return select_columns
+
+def read_projected_rows(file_path, schema, description="input file"):
+    """Stream only the schema columns of a workbook, in schema order.
+
+    Returns the full header row and a generator of (row number, values).
+    """
+    return open_sheet_rows(file_path, schema_positions(schema, description))
+
+def fetch_full_rows(file_path, row_numbers):
+    """Fetch every column of the given rows, for passthrough sheets, in one streaming pass."""
+    wanted_rows = set(row_numbers)
+    if not wanted_rows:
+        return {}
+    _, rows = open_sheet_rows(file_path, row_numbers=wanted_rows)
+    full_rows = {}
+    for row_number, values in rows:
+        if row_number in wanted_rows:
+            full_rows[row_number] = values
+            if len(full_rows) == len(wanted_rows):
+                rows.close()
+                break
+    return full_rows
+# endregion
+
+# region Schema Probe
+# -----------------------------------------------------------
+# Schema Probe Section
+# Reads only the header row of each input by stopping the sheet
+# XML stream after its first row, and checks the columns a stage
+# needs before any workbook is loaded in full.
+# -----------------------------------------------------------
+
+# Inputs of each stage as (description, required columns), in the order
+# of the file paths passed to the probe. A number requires at least that
+# many columns, for files read by position. Compare reads the first and
+# last name by position (columns B and C), so only the key is required
+# by name and the Compare file must have at least compare_min_columns.
+stage_input_requirements = {
+    "Deficiency_Recertification": [("report", stage_schemas["Deficiency_Recertification"])],
+    "Policies_Certifications_Vaccines_Licences": [("report", stage_schemas["Policies_Certifications_Vaccines_Licences"])],
+    "All_Course_Progresses": [("report", ["Email", "Course Name", "Start Date", "Completion Date", "Expiration Date"])],
+    "Transform": [
+        ("main file", stage_schemas["Transform"]),
+        ("course mapping", 3),
+        ("user list", stage_schemas["Transform User List"]),
+    ],
+    "Transfer": [("source file", stage_schemas["Transfer"])],
+    "Compare": [
+        ("Compare file", ["skyprep_internal_id"]),
+        ("Reference file", ["skyprep_internal_id"]),
+    ],
+}
+compare_min_columns = 3
+
+# Stages that read their input with pandas, which also opens .xls workbooks
+legacy_excel_stages = ("All_Course_Progresses", "Transfer")
+
+def is_legacy_excel_file(file_path):
+    """Return whether a file is an .xls workbook, which only the pandas reader can open."""
+    return str(file_path).lower().endswith(".xls")
+
+def read_shared_string_subset(archive, string_indices):
+    """Stream the shared strings table only as far as the highest wanted index."""
+    wanted = set(string_indices)
+    if not wanted or "xl/sharedStrings.xml" not in archive.namelist():
+        return {}
+    shared_strings = {}
+    string_idx = 0
+    with archive.open("xl/sharedStrings.xml") as shared_strings_file:
+        for _, element in ElementTree.iterparse(shared_strings_file):
+            if element.tag != f"{spreadsheet_ns}si":
+                continue
+            if string_idx in wanted:
+                text = element.find(f"{spreadsheet_ns}t")
+                if text is not None:
+                    shared_strings[string_idx] = text.text or ""
+                else:
+                    shared_strings[string_idx] = "".join(
+                        run.findtext(f"{spreadsheet_ns}t") or "" for run in element.findall(f"{spreadsheet_ns}r")
+                    )
+                if len(shared_strings) == len(wanted):
+                    break
+            element.clear()
+            string_idx += 1
+    return shared_strings
+
+def read_header_row(file_path):
+    """Read the header row of the active sheet without parsing the rows below it."""
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open(active_sheet_xml_path(archive)) as sheet_file:
+            header_element = next(
+                (element for _, element in ElementTree.iterparse(sheet_file) if element.tag == f"{spreadsheet_ns}row"),
+                None
+            )
+            if header_element is None:
+                return []
+            string_indices = [
+                int(cell.findtext(f"{spreadsheet_ns}v"))
+                for cell in header_element.iter(f"{spreadsheet_ns}c")
+                if cell.get("t") == "s" and cell.findtext(f"{spreadsheet_ns}v") is not None
+            ]
+            shared_strings = read_shared_string_subset(archive, string_indices)
+            # Header cells are labels, so date styles are not resolved
+            header_values = parse_row_element(header_element, None, shared_strings, set(), None)
+    return [header_values.get(idx) for idx in range(max(header_values) + 1)] if header_values else []
+
+def probe_stage_inputs(stage, file_paths):
+    """Check the header rows of the inputs of a stage and return every problem found.
+
+    stage is a Clean report type, "Transform", "Transfer" or "Compare", and
+    file_paths follow the order of stage_input_requirements.
+    """
+    problems = []
+    input_headers = []
+    for (description, required_columns), file_path in zip(stage_input_requirements[stage], file_paths):
+        try:
+            if stage in legacy_excel_stages and is_legacy_excel_file(file_path):
+                # These stages read .xls files with pandas, which has no streaming header reader
+                headers = list(pd.read_excel(file_path, nrows=0).columns)
+            else:
+                headers = read_header_row(file_path)
+        except (OSError, KeyError, ValueError, ImportError, zipfile.BadZipFile, ElementTree.ParseError) as e:
+            problems.append(f"The {description} cannot be read as an Excel workbook: {e}")
+            input_headers.append(None)
+            continue
+        input_headers.append(headers)
+        if isinstance(required_columns, int):
+            if len(headers) < required_columns:
+                problems.append(f"The {description} needs at least {required_columns} columns, found {len(headers)}.")
+            continue
+        missing_columns = [column for column in required_columns if column not in headers]
+        if missing_columns:
+            problems.append(f"Missing required columns in {description}: {', '.join(missing_columns)}")
+
+    if stage == "Compare" and input_headers[0] is not None and len(input_headers[0]) < compare_min_columns:
+        problems.append(f"The Compare file needs at least {compare_min_columns} columns "
+                        f"(first and last name are read from columns B and C), found {len(input_headers[0])}.")
+
+    # Compare only updates the course groups present in both files
+    if stage == "Compare" and None not in input_headers and not problems:
+        if not build_course_columns(input_headers[0], input_headers[1], 84):
+            problems.append("The Compare and Reference files have no course columns in common.")
+    return problems
+
+def check_stage_inputs(stage, file_paths):
+    """Probe the inputs of a stage and show every problem at once, returning whether they can be used."""
+    problems = probe_stage_inputs(stage, file_paths)
+    if problems:
+        messagebox.showerror("Error", "The selected files cannot be used:\n\n" + "\n".join(f"- {problem}" for problem in problems))
+        return False
+    return True
+# endregion
+
+# region Concurrent Loading
+# -----------------------------------------------------------
+# Concurrent Loading Section
+# Parses the input workbooks of a stage in worker processes at
+# the same time and builds each lookup index as soon as its file
+# has been loaded, instead of loading the files one by one.
+# -----------------------------------------------------------
+
+def load_sheet_table(file_path, schema=None, description="input file", positions=None, compact=False):
+    """Load a workbook as its headers and a list of (row number, values), in a worker process.
+
+    Decodes the schema columns when a schema is given, the columns at the
+    given positions when positions are given, and every column otherwise.
+    With compact, the schema columns are returned as a compact table from
+    encode_compact_columns instead of a list.
+    """
+    if schema:
+        headers, rows = read_projected_rows(file_path, schema, description)
+        if compact:
+            return headers, encode_compact_columns(schema, rows)
+    elif positions is not None:
+        headers, rows = open_sheet_rows(file_path, lambda headers: positions)
+    else:
+        headers, rows = open_sheet_rows(file_path)
+    return headers, list(rows)
+
+def load_inputs_concurrently(loads, index_builders=None):
+    """Load several workbooks in parallel worker processes.
+
+    loads maps a name to the keyword arguments of load_sheet_table. As
+    soon as a file is loaded, its entry in index_builders, if any, is
+    called with the loaded table while the other files keep loading.
+    Returns the built index, or the table itself, by name.
+    """
+    index_builders = index_builders or {}
+    results = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(len(loads), os.cpu_count() or 1)) as executor:
+        futures = {executor.submit(load_sheet_table, **arguments): name for name, arguments in loads.items()}
+        for future in concurrent.futures.as_completed(futures):
+            name = futures[future]
+            table = future.result()
+            results[name] = index_builders[name](table) if name in index_builders else table
+    return results
+
+def load_transform_inputs(report_path, course_mapping_path, user_list_path):
+    """Load the three Transform inputs in parallel.
+
+    Returns the projected main file as a compact table and the first-match
+    indexes of the course mapping and the user list, by input name.
+    """
+    user_list_schema = stage_schemas["Transform User List"]
+    return load_inputs_concurrently(
+        {
+            "main file": {"file_path": report_path, "schema": stage_schemas["Transform"], "description": "main file",
+                          "compact": True},
+            "course mapping": {"file_path": course_mapping_path, "positions": [0, 1, 2]},
+            "user list": {"file_path": user_list_path, "schema": user_list_schema, "description": "user list"},
+        },
+        {
+            "course mapping": lambda table: index_first_matches(
+                table[0], (row for _, row in table[1]), 0, [1, 2]
+            ),
+            "user list": lambda table: index_first_matches(
+                user_list_schema, (row for _, row in table[1]), "work_phone",
+                ["skyprep_internal_id", "email_or_username", "first_name", "last_name"]
+            ),
+        }
+    )
+
+def index_rows_by_key(rows, key_idx):
+    """Group rows by the value of their key column, keeping the file order."""
+    index = {}
+    for row in rows:
+        index.setdefault(row[key_idx], []).append(row)
+    return index
+
+def index_transform_matches(main_rows, course_index, user_index, main_header_indices):
+    """Pair each numbered main report row with its course mapping and user through the lookup indexes."""
+    for row_number, row in main_rows:
+        course_mapping = course_index.get(row[main_header_indices.get("Course Name Description")], (None, None))
+
+        # Discarded courses are never matched against the user list
+        if course_mapping[1] == "Discard":
+            yield row_number, row, course_mapping, (None, None, None, None)
+            continue
+
+        user = user_index.get(row[main_header_indices.get("Position ID")], (None, None, None, None))
+        yield row_number, row, course_mapping, user
+# endregion
+
+# region Partitioned Compare
+# -----------------------------------------------------------
+# Partitioned Compare Section
+# Splits the employees of both bulk files into partitions by a
+# hash of skyprep_internal_id and evaluates the Compare rules of
+# each partition on its own worker process.
+# -----------------------------------------------------------
+
+def compare_partition(numbered_rows, reference_rows, course_columns, compare_key_idx, reference_key_idx):
+    """Evaluate the Compare rules for one partition in a worker process.
+
+    Returns the (cell updates, update log line) pairs of every assigned
+    course by Compare row number.
+    """
+    reference_index = index_rows_by_key(reference_rows, reference_key_idx)
+    partition_updates = {}
+    for compare_row_idx, compare_row in numbered_rows:
+        course_updates = list(compare_course_updates(
+            compare_row, compare_row_idx, compare_key_idx,
+            reference_index.get(compare_row[compare_key_idx], []), course_columns
+        ))
+        if course_updates:
+            partition_updates[compare_row_idx] = course_updates
+    return partition_updates
+
+partition_poll_seconds = 0.1  # Longest wait for a partition before reporting progress again
+
+def partitioned_compare(numbered_rows, reference_rows, course_columns, compare_key_idx, reference_key_idx, partitions=None,
+                        progress_callback=None, cancel_check=None):
+    """Run the Compare rules over hash partitions of the employees on worker processes.
+
+    numbered_rows and reference_rows may be generators: they are read
+    once and each worker receives only the rows of its own partition.
+    Every employee lands in the same partition as its Reference rows, and
+    the Reference rows keep their file order within a partition. Returns
+    the merged course updates by Compare row number. The caller applies
+    them in row order, so the result does not depend on which partition
+    finishes first.
+
+    While the workers run, progress_callback receives the (done, total)
+    Compare rows of the finished partitions at least every
+    partition_poll_seconds, so a GUI can keep handling events. When
+    cancel_check returns True, the pending partitions are cancelled and
+    None is returned.
+    """
+    partitions = partitions or os.cpu_count() or 1
+    compare_partitions = [[] for _ in range(partitions)]
+    reference_partitions = [[] for _ in range(partitions)]
+    for compare_row_idx, compare_row in numbered_rows:
+        compare_partitions[hash(compare_row[compare_key_idx]) % partitions].append((compare_row_idx, compare_row))
+    for reference_row in reference_rows:
+        reference_partitions[hash(reference_row[reference_key_idx]) % partitions].append(reference_row)
+    total_rows = sum(len(partition) for partition in compare_partitions)
+
+    merged_updates = {}
+    done_rows = 0
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=partitions)
+    try:
+        pending = {}
+        for partition_idx in range(partitions):
+            future = executor.submit(
+                compare_partition, compare_partitions[partition_idx], reference_partitions[partition_idx],
+                course_columns, compare_key_idx, reference_key_idx
+            )
+            pending[future] = len(compare_partitions[partition_idx])
+            # The worker holds its own copy, so the parent can release this partition
+            compare_partitions[partition_idx] = reference_partitions[partition_idx] = None
+
+        while pending:
+            if cancel_check and cancel_check():
+                return None
+            finished, _ = concurrent.futures.wait(
+                pending, timeout=partition_poll_seconds, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in finished:
+                merged_updates.update(future.result())
+                done_rows += pending.pop(future)
+            if progress_callback:
+                progress_callback(done_rows, total_rows)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return merged_updates
+# endregion
+
+# region Compare Checkpoints
+# -----------------------------------------------------------
+# Compare Checkpoints Section
+# Saves the progress of a Compare run to disk so a cancelled
+# or crashed run can resume from the last processed row. The
+# completed rows are appended to a journal next to a snapshot,
+# and folded into the snapshot when the run stops.
+# -----------------------------------------------------------
+# The checkpoints hold employee rows and are unpickled on resume, so they
+# live in the per-user data folder, one per pair of input files
+compare_checkpoint_dir = app_data_path("compare_checkpoints")
+compare_checkpoint_interval = 30  # Seconds between journal flushes
+
+def compare_checkpoint_file(compare_path, reference_path, checkpoint_dir=None):
+    """Return the checkpoint path of a Compare of two files, creating its private folder."""
+    checkpoint_dir = checkpoint_dir or compare_checkpoint_dir
+    os.makedirs(checkpoint_dir, mode=0o700, exist_ok=True)
+    pair_key = hashlib.sha256(
+        "\0".join(os.path.normcase(os.path.abspath(path)) for path in (compare_path, reference_path)).encode("utf-8")
+    ).hexdigest()
+    return os.path.join(checkpoint_dir, f"{pair_key}.pkl")
+
+def compare_journal_path(checkpoint_path):
+    """Return the path of the journal that belongs to a checkpoint snapshot."""
+    return checkpoint_path + ".journal"
+
+def file_fingerprint(file_path):
+    """Identify a file by its absolute path, size and modification time."""
+    file_stat = os.stat(file_path)
+    return (os.path.abspath(file_path), file_stat.st_size, file_stat.st_mtime)
+
+def new_compare_checkpoint(compare_path, reference_path):
+    """Create an empty checkpoint for a Compare of two files."""
+    return {
+        "compare_file": file_fingerprint(compare_path),
+        "reference_file": file_fingerprint(reference_path),
+        "last_row": 1,  # Header row, nothing processed yet
+        "cell_updates": {},  # (row, column) -> value, 1-based like openpyxl
+        "audit_records": [],  # (log message, timestamp)
+    }
+
+def save_compare_checkpoint(checkpoint_path, checkpoint):
+    """Write a full checkpoint snapshot atomically and drop the journal it replaces."""
+    temp_path = checkpoint_path + ".tmp"
+    with open(temp_path, "wb") as checkpoint_file:
+        pickle.dump(checkpoint, checkpoint_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, checkpoint_path)
+    if os.path.exists(compare_journal_path(checkpoint_path)):
+        os.remove(compare_journal_path(checkpoint_path))
+
+def append_compare_journal(checkpoint_path, row_deltas):
+    """Append the (row, cell updates, audit records) of completed rows to the checkpoint journal."""
+    if not row_deltas:
+        return
+    with open(compare_journal_path(checkpoint_path), "ab") as journal_file:
+        for row_delta in row_deltas:
+            pickle.dump(row_delta, journal_file, protocol=pickle.HIGHEST_PROTOCOL)
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
+
+def replay_compare_journal(checkpoint_path, checkpoint):
+    """Apply the journaled rows to a loaded snapshot, stopping at a torn final record."""
+    journal_path = compare_journal_path(checkpoint_path)
+    if not os.path.exists(journal_path):
+        return
+    with open(journal_path, "rb") as journal_file:
+        while True:
+            try:
+                row_idx, cell_updates, audit_records = pickle.load(journal_file)
+            except (EOFError, pickle.UnpicklingError, ValueError):
+                break
+            checkpoint["cell_updates"].update(cell_updates)
+            checkpoint["audit_records"].extend(audit_records)
+            checkpoint["last_row"] = row_idx
+
+def load_compare_checkpoint(checkpoint_path, compare_path, reference_path):
+    """Return the saved checkpoint if it belongs to the same unchanged files."""
+    if not os.path.exists(checkpoint_path):
+        return None
+    try:
+        with open(checkpoint_path, "rb") as checkpoint_file:
+            checkpoint = pickle.load(checkpoint_file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if (checkpoint.get("compare_file") != file_fingerprint(compare_path)
+            or checkpoint.get("reference_file") != file_fingerprint(reference_path)):
+        return None
+    replay_compare_journal(checkpoint_path, checkpoint)
+    if checkpoint["last_row"] <= 1:
+        return None
+    return checkpoint
+
+def clear_compare_checkpoint(checkpoint_path):
+    """Remove the checkpoint and its journal once the Compare result has been saved."""
+    for path in (checkpoint_path, compare_journal_path(checkpoint_path)):
+        if os.path.exists(path):
+            os.remove(path)
+# endregion
+
+# region Stage Cache
+# -----------------------------------------------------------
+# Stage Cache Section
+# Memoizes stage results by a hash of the input file contents,
+# the report type and the rule version, so re-running a stage
+# on unchanged inputs reuses the saved result. The results hold
+# employee data, so the cache lives in the per-user data folder
+# and the screens only use it when the user turns it on.
+# -----------------------------------------------------------
+stage_cache_dir = app_data_path("stage_cache")
+stage_cache_max_mb = 1024  # Cache size kept after eviction, least recently used first
+stage_rule_version = "1"  # Bump whenever the Clean, Transform, Transfer or Compare rules change
+stage_result_file = "result.xlsx"
+file_content_hashes = {}  # file_fingerprint -> content hash, so unchanged files are hashed once
+
+def file_content_hash(file_path):
+    """Hash the contents of a file, reusing the hash while the file is unchanged."""
+    fingerprint = file_fingerprint(file_path)
+    if fingerprint not in file_content_hashes:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as input_file:
+            for chunk in iter(lambda: input_file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        file_content_hashes[fingerprint] = digest.hexdigest()
+    return file_content_hashes[fingerprint]
+
+def table_content_hash(table):
+    """Hash a workbook file, or the values of an in-memory (headers, rows) table."""
+    if isinstance(table, (str, os.PathLike)):
+        return file_content_hash(table)
+    headers, rows = table
+    return hashlib.sha256(pickle.dumps((list(headers), [list(row) for row in rows]))).hexdigest()
+
+def stage_cache_key(stage, inputs, report_type=None, parent_key=None):
+    """Build the cache key of a stage from its input files or tables, report type and rule version."""
+    digest = hashlib.sha256()
+    for part in [stage_rule_version, stage, report_type or "", parent_key or ""]:
+        digest.update(part.encode("utf-8") + b"\0")
+    for stage_input in inputs:
+        digest.update(table_content_hash(stage_input).encode("ascii") + b"\0")
+    return digest.hexdigest()
+
+def write_pickle(file_path, value):
+    """Pickle a value to a file."""
+    with open(file_path, "wb") as output_file:
+        pickle.dump(value, output_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+def stage_cache_entry(cache_key, file_name=stage_result_file, cache_dir=None):
+    """Return the path of a cached result file, or None if it is not cached."""
+    entry_dir = os.path.join(cache_dir or stage_cache_dir, cache_key)
+    entry_path = os.path.join(entry_dir, file_name)
+    if not os.path.exists(entry_path):
+        return None
+    # Mark the entry as recently used for eviction
+    os.utime(entry_dir)
+    return entry_path
+
+def store_stage_cache(cache_key, write_files, cache_dir=None, max_mb=None):
+    """Write the result files of a stage into the cache and evict old entries.
+
+    write_files(entry_dir) writes the files; the entry only appears once
+    they are all written, so an interrupted run never leaves a partial one.
+    """
+    cache_dir = cache_dir or stage_cache_dir
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_dir = os.path.join(cache_dir, cache_key)
+    temp_dir = tempfile.mkdtemp(prefix=".pending_", dir=cache_dir)
+    try:
+        write_files(temp_dir)
+        if os.path.exists(entry_dir):
+            shutil.rmtree(entry_dir)
+        os.replace(temp_dir, entry_dir)
+    finally:
+        if os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir)
+    evict_stage_cache(cache_dir, stage_cache_max_mb if max_mb is None else max_mb, keep=cache_key)
+    return entry_dir
+
+def evict_stage_cache(cache_dir, max_mb, keep=None):
+    """Remove the least recently used cache entries until the cache fits in max_mb."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry_dir = os.path.join(cache_dir, name)
+        if name.startswith(".") or not os.path.isdir(entry_dir):
+            continue
+        size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+        entries.append((os.stat(entry_dir).st_mtime, name, size))
+    total_bytes = sum(size for _, _, size in entries)
+    for _, name, size in sorted(entries):
+        if total_bytes <= max_mb * 1024 * 1024:
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        total_bytes -= size
+
+def gui_stage_cache_key(stage, input_paths, report_type=None):
+    """Return the cache key of a screen's stage, or None when its output bypasses the cache."""
+    if not stage_cache_mode.get() or sharded_output_mode.get():
+        return None
+    return stage_cache_key(stage, input_paths, report_type)
+
+def save_stage_result(cache_key, write_output, title, initialfile, extra_files=()):
+    """Save a stage result where the user chooses, going through the stage cache.
+
+    write_output(path) writes the result, or is None to reuse the cached
+    one. With a cache key the result and any extra side files are written
+    into the cache before the save dialog opens, so cancelling the dialog
+    keeps them for the next run. Returns the saved path, or None if the
+    save was cancelled.
+    """
+    if cache_key and write_output:
+        def write_files(entry_dir):
+            write_output(os.path.join(entry_dir, stage_result_file))
+            for extra_file in extra_files:
+                shutil.copyfile(extra_file, os.path.join(entry_dir, os.path.basename(extra_file)))
+        store_stage_cache(cache_key, write_files)
+    save_path = filedialog.asksaveasfilename(
+        defaultextension=".xlsx",
+        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+        title=title,
+        initialfile=initialfile
+    )
+    if not save_path:
+        return None
+    if cache_key:
+        shutil.copyfile(stage_cache_entry(cache_key), save_path)
+    else:
+        write_output(save_path)
+    return save_path
+# endregion
+
+# region Adaptive Planner
+# -----------------------------------------------------------
+# Adaptive Planner Section
+# Estimates the size of each input from the sheet dimension
+# metadata and picks the engine of a stage that fits the memory
+# budget and the number of cores, instead of tuning by hand.
+# -----------------------------------------------------------
+planner_cell_bytes = 250  # Memory held per cell by an in-memory load
+planner_xml_cell_bytes = 40  # Sheet XML per cell, for files without a dimension
+planner_small_rows = 2000  # Rows below which starting worker processes costs more than it saves
+planner_parallel_rows = 20000  # Compare rows from which splitting the employees across cores pays off
+
+def estimate_sheet_size(file_path):
+    """Estimate the (data rows, columns) of the active sheet without reading its rows.
+
+    Uses the dimension metadata when the writer recorded one, otherwise
+    the uncompressed size of the sheet XML and the width of the header row.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        dimension = read_archive_dimension(archive)
+        if dimension and dimension != (1, 1):
+            rows, columns = dimension
+            return max(rows - 1, 0), columns
+        sheet_bytes = archive.getinfo(active_sheet_xml_path(archive)).file_size
+    columns = max(len(read_header_row(file_path)), 1)
+    return sheet_bytes // (columns * planner_xml_cell_bytes), columns
+
+def estimate_table_mb(rows, columns):
+    """Estimate the memory of a table loaded in memory, in MB."""
+    return rows * columns * planner_cell_bytes / (1024 * 1024)
+
+def plan_stage(stage, file_paths, memory_budget_mb, cores=None):
+    """Pick the engine of a stage for its inputs, memory budget and core count.
+
+    stage is a Clean report type, "Transform", "Transfer" or "Compare", and
+    file_paths follow the order of stage_input_requirements. Returns a dict
+    with the chosen "strategy", the engine "settings" that select it, the
+    "reason" and the size estimates it was based on.
+    """
+    cores = cores or os.cpu_count() or 1
+    sizes = [estimate_sheet_size(file_path) for file_path in file_paths]
+    rows = sizes[0][0]
+
+    if stage in ("Deficiency_Recertification", "Policies_Certifications_Vaccines_Licences"):
+        estimated_mb = estimate_table_mb(rows, len(stage_schemas[stage]))
+        strategy, settings = "streaming", {}
+        reason = "these reports are always streamed row by row"
+    elif stage in ("All_Course_Progresses", "Transfer"):
+        columns = sizes[0][1] if stage == "All_Course_Progresses" else len(stage_schemas["Transfer"])
+        estimated_mb = estimate_table_mb(rows, columns)
+        if estimated_mb <= memory_budget_mb:
+            strategy, settings = "in-memory", {"out_of_core_mode": False}
+            reason = "the file fits in the memory budget"
+        else:
+            strategy, settings = "out-of-core", {"out_of_core_mode": True}
+            reason = "the file exceeds the memory budget, so sorted runs are spilled to disk"
+    elif stage == "Transform":
+        estimated_mb = (estimate_table_mb(rows, len(stage_schemas["Transform"]))
+                        + estimate_table_mb(sizes[1][0], 3)
+                        + estimate_table_mb(sizes[2][0], len(stage_schemas["Transform User List"])))
+        if estimated_mb > memory_budget_mb:
+            strategy, settings = "SQLite staging", {"staging_engine_mode": True, "parallel_loading_mode": False}
+            reason = "the three files exceed the memory budget, so they are joined on disk"
+        elif rows < planner_small_rows:
+            strategy, settings = "in-memory scan", {"staging_engine_mode": False, "parallel_loading_mode": False}
+            reason = "the report is too small for worker processes to pay off"
+        elif cores >= 2:
+            strategy, settings = "parallel loading", {"staging_engine_mode": False, "parallel_loading_mode": True}
+            reason = "the files fit in memory and are loaded and indexed in worker processes"
+        else:
+            strategy, settings = "SQLite staging", {"staging_engine_mode": True, "parallel_loading_mode": False}
+            reason = "with one core there is nothing to load in parallel, so the files are joined with indexes on disk"
+    else:
+        compare_mb = estimate_table_mb(*sizes[0])
+        reference_mb = estimate_table_mb(*sizes[1])
+        estimated_mb = compare_mb + reference_mb
+        if estimated_mb > memory_budget_mb:
+            strategy, settings = "SQLite staging", {"staging_engine_mode": True, "parallel_loading_mode": False}
+            reason = "the Reference file does not fit next to the Compare workbook, so it is looked up on disk"
+        elif rows < planner_small_rows:
+            strategy, settings = "in-memory scan", {"staging_engine_mode": False, "parallel_loading_mode": False}
+            reason = "the files are too small for worker processes or staging to pay off"
+        elif cores >= 2:
+            strategy, settings = "indexed", {"staging_engine_mode": False, "parallel_loading_mode": True}
+            reason = "both files fit in memory and the Reference file is loaded in a worker process and indexed by employee"
+        else:
+            strategy, settings = "SQLite staging", {"staging_engine_mode": True, "parallel_loading_mode": False}
+            reason = "with one core the Reference file is indexed on disk instead of in a worker process"
+        # The partitions are built in memory, so only an in-memory Compare is split across cores
+        settings["parallel_compare_mode"] = (not settings["staging_engine_mode"]
+                                             and rows >= planner_parallel_rows and cores >= 2)
+        if settings["parallel_compare_mode"]:
+            strategy += " on all cores"
+            reason += f", and {rows} rows are split across {cores} cores"
+    return {
+        "stage": stage, "strategy": strategy, "settings": settings, "reason": reason,
+        "rows": rows, "estimated_mb": estimated_mb, "memory_budget_mb": memory_budget_mb, "cores": cores,
+    }
+
+def format_stage_plan(plan):
+    """Describe a plan in one line for the operator."""
+    return (f"{plan['stage']}: {plan['strategy']} engine for ~{plan['rows']:,} rows "
+            f"(~{plan['estimated_mb']:,.0f} MB of {plan['memory_budget_mb']:,} MB, "
+            f"{plan['cores']} core{'' if plan['cores'] == 1 else 's'}): {plan['reason']}.")
+
+def plan_gui_stage(stage, file_paths):
+    """Choose and report the engine of a screen's stage, when automatic engine selection is on."""
+    if not auto_plan_mode.get():
+        return
+    if any(is_legacy_excel_file(file_path) for file_path in file_paths):
+        # .xls inputs have no sheet metadata to size, and only the in-memory engine reads them
+        out_of_core_mode.set(False)
+        plan_label.config(text=f"{stage}: in-memory engine, the only one that reads .xls files.")
+        plan_label.update()
+        return
+    plan = plan_stage(stage, file_paths, memory_budget_mb.get())
+    engine_toggles = {
+        "out_of_core_mode": out_of_core_mode,
+        "staging_engine_mode": staging_engine_mode,
+        "parallel_loading_mode": parallel_loading_mode,
+        "parallel_compare_mode": parallel_compare_mode,
+    }
+    for name, value in plan["settings"].items():
+        engine_toggles[name].set(value)
+    plan_label.config(text=format_stage_plan(plan))
+    plan_label.update()
+# endregion
+
+# region SQLite Staging Engine
+# -----------------------------------------------------------
+# SQLite Staging Engine Section
+# Loads the input reports into a local SQLite database with
+# indexes on the matching keys, so Transform and Compare can
+# join them with indexed queries instead of nested scans.
+# -----------------------------------------------------------
+staging_db_path = app_data_path("skyprep_staging.db")
+staging_batch_size = 5000  # Rows inserted per executemany batch
+
+def open_staging_db(db_path):
+    """Open the staging database and create the staged files catalog."""
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS staged_files ("
+        "table_name TEXT PRIMARY KEY, file_path TEXT, file_size INTEGER, "
+        "file_mtime REAL, headers BLOB)"
+    )
+    return connection
+
+def quote_identifier(name):
+    """Quote a table or column name for use in SQL."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def staged_column_names(headers):
+    """Build unique SQL column names from the sheet headers."""
+    column_names = []
+    seen_names = set()
+    for idx, header in enumerate(headers, start=1):
+        name = str(header) if header is not None else f"column_{idx}"
+        while name.lower() in seen_names or name.lower() in ("row_number", "row_data"):
+            name = f"{name}_{idx}"
+        seen_names.add(name.lower())
+        column_names.append(name)
+    return column_names
+
+def sqlite_value(value):
+    """Convert a cell value into a value SQLite can store and compare."""
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+def stage_excel_file(connection, table_name, file_path, index_columns):
+    """Load the active sheet of a workbook into an indexed staging table.
+
+    The table is reused as-is when the same file, with the same size and
+    modification time, was already staged by an earlier run. Index columns
+    are given by header name or by column position.
+    """
+    fingerprint = file_fingerprint(file_path)
+    staged = connection.execute(
+        "SELECT file_path, file_size, file_mtime FROM staged_files WHERE table_name = ?", (table_name,)
+    ).fetchone()
+    if staged == fingerprint:
+        return
+
+    rows = iter_excel_rows(file_path)
+    headers = list(next(rows, ()))
+    column_names = staged_column_names(headers)
+    table = quote_identifier(table_name)
+
+    # Replace the table and its catalog row in one transaction, so a crash
+    # never leaves a catalog fingerprint pointing at a partial table
+    connection.execute("BEGIN")
+    try:
+        connection.execute("DELETE FROM staged_files WHERE table_name = ?", (table_name,))
+        connection.execute(f"DROP TABLE IF EXISTS {table}")
+        connection.execute(
+            f"CREATE TABLE {table} (row_number INTEGER PRIMARY KEY, row_data BLOB"
+            + "".join(f", {quote_identifier(name)}" for name in column_names) + ")"
+        )
+
+        # Keep the original row for exact values and the columns for indexed queries
+        insert_sql = (
+            f"INSERT INTO {table} VALUES (?, ?" + ", ?" * len(column_names) + ")"
+        )
+        padding = (None,) * len(column_names)
+        staged_rows = (
+            (row_number, pickle.dumps(row, protocol=pickle.HIGHEST_PROTOCOL))
+            + tuple(sqlite_value(value) for value in (tuple(row) + padding)[:len(column_names)])
+            for row_number, row in enumerate(rows, start=2)
+        )
+        while True:
+            batch = list(itertools.islice(staged_rows, staging_batch_size))
+            if not batch:
+                break
+            connection.executemany(insert_sql, batch)
+
+        for column in index_columns:
+            if isinstance(column, int):
+                column_idx = column
+            elif column in headers:
+                column_idx = headers.index(column)
+            else:
+                continue
+            if column_idx >= len(column_names):
+                continue
+            index_name = quote_identifier(f"idx_{table_name}_{column_names[column_idx]}")
+            connection.execute(f"CREATE INDEX {index_name} ON {table} ({quote_identifier(column_names[column_idx])})")
+
+        connection.execute(
+            "INSERT OR REPLACE INTO staged_files VALUES (?, ?, ?, ?, ?)",
+            (table_name,) + fingerprint + (pickle.dumps(headers),)
+        )
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+
+def staged_headers(connection, table_name):
+    """Return the original headers of a staged file."""
+    headers = connection.execute(
+        "SELECT headers FROM staged_files WHERE table_name = ?", (table_name,)
+    ).fetchone()[0]
+    return pickle.loads(headers)
+
+def staged_row_count(connection, table_name):
+    """Return the number of data rows of a staged file."""
+    return connection.execute(f"SELECT COUNT(*) FROM {quote_identifier(table_name)}").fetchone()[0]
+
+def staged_column(connection, table_name, header):
+    """Return the quoted SQL column holding a header of a staged file."""
+    headers = staged_headers(connection, table_name)
+    position = header if isinstance(header, int) else headers.index(header)
+    return quote_identifier(staged_column_names(headers)[position])
+
+def query_staged_rows(connection, table_name, key_column, key):
+    """Return the original rows of a staged file whose key column matches, in file order.
+
+    The key column is the quoted SQL column returned by staged_column.
+    """
+    cursor = connection.execute(
+        f"SELECT row_data FROM {quote_identifier(table_name)} "
+        f"WHERE {key_column} IS ? ORDER BY row_number",
+        (sqlite_value(key),)
+    )
+    return [pickle.loads(row_data) for (row_data,) in cursor]
+
+def stage_transform_inputs(db_path, report_path, course_mapping_path, user_list_path):
+    """Stage the cleaned report, the course mapping and the user list for Transform."""
+    connection = open_staging_db(db_path)
+    stage_excel_file(connection, "adp_report", report_path, ["Course Name Description", "Position ID"])
+    stage_excel_file(connection, "course_mapping", course_mapping_path, [0])
+    stage_excel_file(connection, "user_list", user_list_path, ["work_phone", "skyprep_internal_id"])
+    return connection
+
+def stage_compare_reference(db_path, reference_path):
+    """Stage the Reference bulk file for Compare."""
+    connection = open_staging_db(db_path)
+    stage_excel_file(connection, "reference_bulk", reference_path, ["skyprep_internal_id"])
+    return connection
+
+def query_transform_matches(connection, main_header_indices):
+    """Pair each numbered staged report row with its course mapping and user using indexed joins."""
+    user_list_headers = staged_headers(connection, "user_list")
+    user_list_header_indices = {header: idx for idx, header in enumerate(user_list_headers)}
+    course_column = staged_column(connection, "adp_report", main_header_indices["Course Name Description"])
+    position_column = staged_column(connection, "adp_report", main_header_indices["Position ID"])
+    mapping_key_column = staged_column(connection, "course_mapping", 0)
+    work_phone_column = staged_column(connection, "user_list", "work_phone")
+
+    # The first matching row wins, as in the sheet scans
+    cursor = connection.execute(f"""
+        SELECT report.row_number, report.row_data, mapping.row_data, users.row_data
+        FROM adp_report AS report
+        LEFT JOIN course_mapping AS mapping ON mapping.row_number = (
+            SELECT row_number FROM course_mapping
+            WHERE {mapping_key_column} IS report.{course_column}
+            ORDER BY row_number LIMIT 1
+        )
+        LEFT JOIN user_list AS users ON users.row_number = (
+            SELECT row_number FROM user_list
+            WHERE {work_phone_column} IS report.{position_column}
+            ORDER BY row_number LIMIT 1
+        )
+        ORDER BY report.row_number
+    """)
+    for row_number, report_data, mapping_data, user_data in cursor:
+        row = pickle.loads(report_data)
+        if mapping_data is None:
+            course_mapping = (None, None)
+        else:
+            mapping_row = pickle.loads(mapping_data)
+            course_mapping = (mapping_row[1], mapping_row[2])
+        if user_data is None:
+            user = (None, None, None, None)
+        else:
+            user = user_details(pickle.loads(user_data), user_list_header_indices)
+        yield row_number, row, course_mapping, user
+# endregion
+
+# region Sample Preview
+# -----------------------------------------------------------
+# Sample Preview Section
+# Runs a leading or random sample of rows through a stage to
+# show the resulting rows, measure the per-row cost and mapping
+# hit rates, and extrapolate the runtime of a full run.
+# -----------------------------------------------------------
+preview_default_sample_size = 200
+
+def sample_excel_rows(file_path, sample_size, random_sample=False):
+    """Read the headers and a leading or uniformly random sample of data rows.
+
+    Returns the headers, the sampled rows in file order, the total number
+    of data rows, the seconds spent opening the workbook and the seconds
+    spent reading each data row. A random sample picks row numbers up to
+    the row count of the sheet dimension and decodes only those rows,
+    stopping after the last one.
+    """
+    if not random_sample:
+        start_time = time.perf_counter()
+        rows = iter_excel_rows(file_path)
+        headers = list(next(rows, ()))
+        open_seconds = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        sample = list(itertools.islice(rows, sample_size))
+        read_seconds_per_row = (time.perf_counter() - start_time) / max(len(sample), 1)
+        rows.close()
+        total_rows = max(count_excel_rows(file_path), len(sample))
+        return headers, sample, total_rows, open_seconds, read_seconds_per_row
+
+    total_rows = count_excel_rows(file_path)
+    row_numbers = set(random.sample(range(2, total_rows + 2), min(sample_size, total_rows)))
+    start_time = time.perf_counter()
+    headers, rows = open_sheet_rows(file_path, row_numbers=row_numbers)
+    open_seconds = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    sampled_rows = {}
+    for row_number, values in rows:
+        sampled_rows[row_number] = values
+        if len(sampled_rows) == len(row_numbers):
+            rows.close()
+            break
+    sample = [sampled_rows[row_number] for row_number in sorted(sampled_rows)]
+
+    # The rows before the last sampled one are streamed past, so the time is spread over all of them
+    streamed_rows = max(sampled_rows, default=1) - 1
+    read_seconds_per_row = (time.perf_counter() - start_time) / max(streamed_rows, 1)
+    return headers, sample, total_rows, open_seconds, read_seconds_per_row
+
+def first_match_index(file_path, key_column, value_columns):
+    """Index the rows of a lookup file by key, keeping the first match like the sheet scans."""
+    rows = iter_excel_rows(file_path)
+    headers = list(next(rows, ()))
+    return index_first_matches(headers, rows, key_column, value_columns)
+
+def estimate_excel_bytes(headers, rows):
+    """Measure the size of a workbook holding the given rows."""
+    buffer = io.BytesIO()
+    write_rows_to_excel(buffer, headers, rows)
+    return buffer.getbuffer().nbytes
+
+def preview_clean(report_type, headers, sample):
+    """Clean a sample of report rows.
+
+    Returns the output headers, the output rows, the hit rates and the
+    seconds spent on setup.
+    """
+    output_headers, output_rows = clean_rows(report_type, headers, sample)
+    if report_type == "All_Course_Progresses":
+        hit_rates = {"Duplicate rows in sample": 1 - len(output_rows) / max(len(sample), 1)}
+        return output_headers, output_rows, hit_rates, 0
+
+    source_columns = cleaned_report_columns if report_type == "Deficiency_Recertification" else policies_report_columns
+    source_indices = [headers.index(col) for col in source_columns]
+
+    # The last three columns hold the dates in both reports
+    changed_rows = sum(
+        1 for row, output_row in zip(sample, output_rows)
+        if output_row[3:] != [row[idx] for idx in source_indices[3:]]
+    )
+    return cleaned_report_columns, output_rows, {"Rows with adjusted dates": changed_rows / max(len(sample), 1)}, 0
+
+def preview_transform(headers, sample, course_mapping_path, user_list_path):
+    """Transform a sample of cleaned report rows.
+
+    Returns the output headers, the output rows, the hit rates and the
+    seconds spent indexing the course mapping and the user list.
+    """
+    start_time = time.perf_counter()
+    main_header_indices = {header: idx for idx, header in enumerate(headers)}
+    course_index = first_match_index(course_mapping_path, 0, [1, 2])
+    user_index = first_match_index(
+        user_list_path, "work_phone", ["skyprep_internal_id", "email_or_username", "first_name", "last_name"]
+    )
+    setup_seconds = time.perf_counter() - start_time
+
+    output_rows = []
+    counts = {"Transformed Data": 0, "Discarded Data": 0, "Not Found Records": 0}
+    mapped_courses = 0
+    for row in sample:
+        course_mapping = course_index.get(row[main_header_indices.get("Course Name Description")], (None, None))
+        user = user_index.get(row[main_header_indices.get("Position ID")], (None, None, None, None))
+        sheet_name, output_row = transform_row(row, main_header_indices, course_mapping, user)
+        counts[sheet_name] += 1
+        if course_mapping[1] is not None:
+            mapped_courses += 1
+        if sheet_name == "Transformed Data":
+            output_rows.append(output_row)
+
+    sample_size = max(len(sample), 1)
+    kept_rows = max(len(sample) - counts["Discarded Data"], 1)
+    hit_rates = {
+        "Course mapping found": mapped_courses / sample_size,
+        "Discarded courses": counts["Discarded Data"] / sample_size,
+        "User found in user list": counts["Transformed Data"] / kept_rows,
+    }
+    return transformed_headers, output_rows, hit_rates, setup_seconds
+
+def preview_transfer(headers, sample):
+    """Group a sample of transformed rows per employee.
+
+    Returns the output headers, the output rows, the hit rates and the
+    seconds spent on setup.
+    """
+    destination_columns, output_rows = transfer_rows(headers, sample)
+    course_number_idx = headers.index("Course Number")
+    course_slots = {f"Course {i}" for i in range(1, (len(destination_columns) - 5) // 7 + 1)}
+
+    placed_courses = sum(1 for row in sample if row[course_number_idx] in course_slots)
+    return destination_columns, output_rows, {"Courses placed in a course slot": placed_courses / max(len(sample), 1)}, 0
+
+def preview_compare(headers, sample, reference_path):
+    """Compare a sample of generated rows.
+
+    Returns the output headers, the output rows, the hit rates and the
+    seconds spent reading the Reference file.
+    """
+    start_time = time.perf_counter()
+    key_column = "skyprep_internal_id"
+    compare_key_idx = headers.index(key_column)
+    sample_keys = {row[compare_key_idx] for row in sample}
+
+    # Keep only the Reference rows that match the sample
+    rows = iter_excel_rows(reference_path)
+    reference_headers = list(next(rows, ()))
+    reference_key_idx = reference_headers.index(key_column)
+    reference_index = {}
+    for reference_row in rows:
+        if reference_row[reference_key_idx] in sample_keys:
+            reference_index.setdefault(reference_row[reference_key_idx], []).append(reference_row)
+
+    course_columns = build_course_columns(headers, reference_headers, 84)
+    setup_seconds = time.perf_counter() - start_time
+
+    output_rows = []
+    matched_rows = updated_rows = assigned_courses = updated_courses = 0
+    for compare_row in sample:
+        output_row = list(compare_row)
+        reference_rows = reference_index.get(compare_row[compare_key_idx], [])
+        matched_rows += bool(reference_rows)
+        for reference_row in reference_rows:
+            for updates, _ in evaluate_course_updates(compare_row, reference_row, course_columns):
+                assigned_courses += 1
+                updated_courses += bool(updates)
+                for column_idx, value in updates:
+                    output_row[column_idx] = value
+        updated_rows += output_row != list(compare_row)
+        output_rows.append(output_row)
+
+    sample_size = max(len(sample), 1)
+    hit_rates = {
+        "Employees found in Reference": matched_rows / sample_size,
+        "Employees updated": updated_rows / sample_size,
+        "Courses updated": updated_courses / max(assigned_courses, 1),
+    }
+    return headers, output_rows, hit_rates, setup_seconds
+
+def run_stage_preview(stage, file_paths, sample_size=preview_default_sample_size, random_sample=False, report_type=None):
+    """Run a sample of rows through a stage and extrapolate the cost of a full run.
+
+    The stage is "Clean", "Transform", "Transfer" or "Compare", and the
+    first file path is the file whose rows are sampled.
+    """
+    headers, sample, total_rows, open_seconds, read_seconds_per_row = sample_excel_rows(
+        file_paths[0], sample_size, random_sample
+    )
+
+    start_time = time.perf_counter()
+    if stage == "Clean":
+        output_headers, output_rows, hit_rates, setup_seconds = preview_clean(report_type, headers, sample)
+    elif stage == "Transform":
+        output_headers, output_rows, hit_rates, setup_seconds = preview_transform(
+            headers, sample, file_paths[1], file_paths[2]
+        )
+    elif stage == "Transfer":
+        output_headers, output_rows, hit_rates, setup_seconds = preview_transfer(headers, sample)
+    else:
+        output_headers, output_rows, hit_rates, setup_seconds = preview_compare(headers, sample, file_paths[1])
+    process_seconds = time.perf_counter() - start_time - setup_seconds
+
+    # Extrapolate from the sample to the whole file
+    sample_rows = max(len(sample), 1)
+    seconds_per_row = read_seconds_per_row + process_seconds / sample_rows
+    estimated_output_rows = round(len(output_rows) / sample_rows * total_rows)
+    output_bytes = estimate_excel_bytes(output_headers, output_rows)
+    return {
+        "headers": output_headers,
+        "rows": output_rows,
+        "sample_rows": len(sample),
+        "total_rows": total_rows,
+        "seconds_per_row": seconds_per_row,
+        "estimated_seconds": open_seconds + setup_seconds + seconds_per_row * total_rows,
+        "estimated_output_rows": estimated_output_rows,
+        "estimated_output_bytes": output_bytes / max(len(output_rows), 1) * estimated_output_rows,
+        "hit_rates": hit_rates,
+    }
+
+def format_preview_summary(preview):
+    """Describe the measured cost, hit rates and estimates of a preview."""
+    lines = [
+        f"Sample: {preview['sample_rows']} of {preview['total_rows']} rows",
+        f"Cost per row: {preview['seconds_per_row'] * 1000:.2f} ms",
+        f"Estimated full run: {timedelta(seconds=round(preview['estimated_seconds']))}",
+        f"Estimated output: {preview['estimated_output_rows']} rows, "
+        f"{preview['estimated_output_bytes'] / (1024 * 1024):.1f} MB",
+    ]
+    lines += [f"{name}: {rate:.1%}" for name, rate in preview["hit_rates"].items()]
+    return "\n".join(lines)
+
+def show_preview_window(title, preview):
+    """Show the preview summary and the resulting sample rows in a new window."""
+    window = tk.Toplevel(root)
+    window.title(title)
+    window.geometry("800x500")
+
+    tk.Label(window, text=format_preview_summary(preview), justify="left", font=("Arial", 10)).pack(anchor="w", padx=10, pady=10)
+
+    table_frame = tk.Frame(window)
+    table_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+    columns = [f"column_{idx}" for idx in range(len(preview["headers"]))]
+    table = ttk.Treeview(table_frame, columns=columns, show="headings")
+    for column, header in zip(columns, preview["headers"]):
+        table.heading(column, text=str(header))
+        table.column(column, width=120, stretch=False)
+    for row in preview["rows"]:
+        table.insert("", "end", values=["" if value is None else str(value) for value in row])
+
+    x_scrollbar = ttk.Scrollbar(table_frame, orient="horizontal", command=table.xview)
+    y_scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=table.yview)
+    table.configure(xscrollcommand=x_scrollbar.set, yscrollcommand=y_scrollbar.set)
+    y_scrollbar.pack(side="right", fill="y")
+    x_scrollbar.pack(side="bottom", fill="x")
+    table.pack(fill="both", expand=True)
+
+def start_preview_logic(stage):
+    """Preview the stage of the current screen on a sample of its selected file."""
+    if stage == "Clean":
+        file_paths = [clean_file_path]
+    elif stage == "Transform":
+        file_paths = [transform_file_path, course_mapping_file_path, user_list_file_path]
+    elif stage == "Transfer":
+        file_paths = [transfer_file_path]
+    else:
+        file_paths = [compare_file_path, reference_file_path]
+    if not all(file_paths):
+        messagebox.showerror("Error", "Please upload all required files.")
+        return
+
+    try:
+        preview = run_stage_preview(
+            stage, file_paths, sample_size=preview_sample_size.get(),
+            random_sample=preview_random_sample.get(), report_type=selected_report.get()
+        )
+        show_preview_window(f"{stage} Preview", preview)
+    except Exception as e:
+        messagebox.showerror("Error", f"An error occurred: {e}")
+# endregion
+
+# region Sharded Output
+# -----------------------------------------------------------
+# Sharded Output Section
+# Splits the bulk update outputs into several workbooks that
+# stay within the SkyPrep importer limits, repeats the header
+# in every shard and records the shards in a manifest file.
+# -----------------------------------------------------------
+default_shard_max_rows = 5000  # Data rows allowed in one shard
+default_shard_max_mb = 0  # Estimated sheet size allowed in one shard, 0 for no limit
+shard_cell_overhead_bytes = 30  # Sheet XML written around each cell value
+
+def estimate_sheet_row_bytes(row):
+    """Estimate the uncompressed sheet XML written for one row."""
+    return sum(len(str(value)) + shard_cell_overhead_bytes for value in row if value is not None)
+
+def split_into_shards(rows, max_rows=None, max_bytes=None):
+    """Group rows into consecutive shards capped by row count and estimated size."""
+    shard = []
+    shard_bytes = 0
+    for row in rows:
+        row_bytes = estimate_sheet_row_bytes(row)
+        if shard and ((max_rows and len(shard) >= max_rows) or (max_bytes and shard_bytes + row_bytes > max_bytes)):
+            yield shard
+            shard = []
+            shard_bytes = 0
+        shard.append(row)
+        shard_bytes += row_bytes
+    if shard:
+        yield shard
+
+def write_shard(shard_path, headers, rows):
+    """Write one shard workbook and return its size and SHA-256 checksum."""
+    write_rows_to_excel(shard_path, headers, rows)
+    checksum = hashlib.sha256()
+    with open(shard_path, "rb") as shard_file:
+        for chunk in iter(lambda: shard_file.read(1024 * 1024), b""):
+            checksum.update(chunk)
+    return os.path.getsize(shard_path), checksum.hexdigest()
+
+def write_sharded_excel(output_path, headers, rows, max_rows=None, max_mb=None, max_workers=None):
+    """Stream rows into numbered shard workbooks next to output_path.
+
+    Shards are written by a pool of worker processes while the next
+    shards are collected, holding at most two shards per worker in
+    memory. Returns the path of the JSON manifest and its contents.
+    """
+    if not max_rows and not max_mb:
+        raise ValueError("Sharded output needs a row limit or a size limit.")
+    stem, extension = os.path.splitext(output_path)
+    extension = extension or ".xlsx"
+    max_bytes = int(max_mb * 1024 * 1024) if max_mb else None
+    max_workers = max_workers or os.cpu_count() or 1
+    headers = list(headers)
+    shards = []
+    pending = {}
+    total_rows = 0
+
+    def record_finished(futures):
+        for future in futures:
+            shard = pending.pop(future)
+            shard["bytes"], shard["sha256"] = future.result()
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for number, shard_rows in enumerate(split_into_shards(rows, max_rows, max_bytes), start=1):
+            # Wait for a worker before collecting more shards than the pool can take
+            while len(pending) >= 2 * max_workers:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                record_finished(done)
+            shard_path = f"{stem}_part{number:03d}{extension}"
+            shard = {
+                "file": os.path.basename(shard_path),
+                "rows": len(shard_rows),
+                "first_row": total_rows + 1,
+                "last_row": total_rows + len(shard_rows),
+            }
+            shards.append(shard)
+            total_rows += len(shard_rows)
+            pending[executor.submit(write_shard, shard_path, headers, shard_rows)] = shard
+        record_finished(list(concurrent.futures.as_completed(list(pending))))
+
+    manifest = {
+        "output": os.path.basename(output_path),
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "max_rows": max_rows or None,
+        "max_mb": max_mb or None,
+        "columns": len(headers),
+        "total_rows": total_rows,
+        "shards": shards,
+    }
+    manifest_path = f"{stem}_manifest.json"
+    with open(manifest_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return manifest_path, manifest
+
+def save_sharded_output(output_file_path, headers, rows):
+    """Write an output as shards with the limits chosen on screen and report the result."""
+    manifest_path, manifest = write_sharded_excel(
+        output_file_path, headers, rows, max_rows=shard_max_rows.get(), max_mb=shard_max_mb.get()
+    )
+    messagebox.showinfo(
+        "Success",
+        f"{manifest['total_rows']} rows saved in {len(manifest['shards'])} shard files.\nManifest: {manifest_path}"
+    )
+# endregion
+
+# region Pipeline API
+# -----------------------------------------------------------
+# Pipeline API Section
+# Chains Clean, Transform, Transfer and Compare in memory so a
+# full migration cycle only writes its final output. Tables are
+# passed between the stages as (headers, rows) pairs.
+# -----------------------------------------------------------
+pipeline_stages = ["Clean", "Transform", "Transfer", "Compare"]
+
+def read_table(file_path):
+    """Read the active sheet of a workbook as a (headers, rows) table."""
+    headers, rows = open_sheet_rows(file_path)
+    return list(headers), [list(row) for _, row in rows]
+
+def as_table(table):
+    """Accept either a (headers, rows) table or the path of a workbook."""
+    if isinstance(table, (str, os.PathLike)):
+        return read_table(table)
+    headers, rows = table
+    return list(headers), rows
+
+def reusable_table(table):
+    """Return a table whose rows can be read more than once, such as for a cache key and then by a stage."""
+    if table is None or isinstance(table, (str, os.PathLike)):
+        return table
+    headers, rows = table
+    return list(headers), rows if isinstance(rows, list) else list(rows)
+
+def handoff_rows(rows):
+    """Blank out empty strings and NaN the way saving and reloading a workbook would."""
+    return [
+        [None if value == "" or (isinstance(value, float) and value != value) else value for value in row]
+        for row in rows
+    ]
+
+def index_first_matches(headers, rows, key_column, value_columns):
+    """Index table rows by key, keeping the first match like the sheet scans."""
+    key_idx = key_column if isinstance(key_column, int) else headers.index(key_column)
+    value_indices = [column if isinstance(column, int) else headers.index(column) for column in value_columns]
+    index = {}
+    for row in rows:
+        if row[key_idx] not in index:
+            index[row[key_idx]] = tuple(row[idx] for idx in value_indices)
+    return index
+
+def transform_lookup_indexes(course_mapping, user_list):
+    """Index a course mapping and user list for transform_rows, returning (course_index, user_index)."""
+    course_headers, course_rows = as_table(course_mapping)
+    user_headers, user_rows = as_table(user_list)
+    return (
+        index_first_matches(course_headers, course_rows, 0, [1, 2]),
+        index_first_matches(user_headers, user_rows, "work_phone",
+                            ["skyprep_internal_id", "email_or_username", "first_name", "last_name"]),
+    )
+
+def clean_rows(report_type, headers, rows):
+    """Clean report rows in memory, returning the output headers and rows."""
+    if report_type == "All_Course_Progresses":
+        data_frame_cleaned = remove_duplicate_course_progresses(compact_data_frame(pd.DataFrame(rows, columns=headers)))
+        output_rows = data_frame_cleaned.astype(object).where(data_frame_cleaned.notna(), None).values.tolist()
+        return list(data_frame_cleaned.columns), output_rows
+    if report_type == "Deficiency_Recertification":
+        source_indices = [headers.index(col) for col in cleaned_report_columns]
+        return cleaned_report_columns, [clean_deficiency_row(row, source_indices) for row in rows]
+    if report_type == "Policies_Certifications_Vaccines_Licences":
+        source_indices = [headers.index(col) for col in policies_report_columns]
+        return cleaned_report_columns, [clean_policies_row(row, source_indices) for row in rows]
+    raise ValueError(f"Unknown report type: {report_type}")
+
+def transform_rows(headers, rows, course_index, user_index):
+    """Transform cleaned report rows with indexed course mapping and user list lookups.
+
+    Returns the rows of the Transformed Data, Discarded Data and Not Found
+    Records sheets, keeping one Not Found row per Position ID.
+    """
+    missing_headers = [header for header in main_to_transformed_mapping if header not in headers]
+    if missing_headers:
+        raise ValueError(f"Missing required columns in main file: {', '.join(missing_headers)}")
+    main_header_indices = {header: idx for idx, header in enumerate(headers)}
+    sheets = {"Transformed Data": [], "Discarded Data": [], "Not Found Records": []}
+    existing_position_ids = set()
+    for row in rows:
+        course_mapping = course_index.get(row[main_header_indices["Course Name Description"]], (None, None))
+        user = user_index.get(row[main_header_indices["Position ID"]], (None, None, None, None))
+        sheet_name, output_row = transform_row(row, main_header_indices, course_mapping, user)
+        if sheet_name == "Not Found Records":
+            position_id = row[main_header_indices["Position ID"]]
+            if position_id in existing_position_ids:
+                continue
+            existing_position_ids.add(position_id)
+        sheets[sheet_name].append(output_row)
+    return sheets
+
+def transfer_rows(headers, rows):
+    """Group transformed rows per employee in memory, returning the destination headers and rows."""
+    destination_columns = generate_destination_columns()
+    skyprep_idx = headers.index("SkyPrep ID")
+
+    # Employees without a SkyPrep ID are dropped, as in pandas groupby
+    groups = {}
+    for row in rows:
+        if row[skyprep_idx] is not None:
+            groups.setdefault(row[skyprep_idx], []).append(dict(zip(headers, row)))
+    output_rows = []
+    for employee in sorted(groups, key=ascending_sort_key):
+        row = build_transfer_row(employee, groups[employee], destination_columns)
+        output_rows.append([row[col] for col in destination_columns])
+    return destination_columns, output_rows
+
+def compare_rows(headers, rows, reference_headers, reference_rows, max_courses=84):
+    """Apply the Compare rules to a table in memory.
+
+    Returns the updated rows and the update log lines, formatted as in
+    update_log.txt without the timestamp.
+    """
+    key_column = "skyprep_internal_id"
+    compare_key_idx = headers.index(key_column)
+    reference_key_idx = reference_headers.index(key_column)
+    reference_index = index_rows_by_key(reference_rows, reference_key_idx)
+    course_columns = build_course_columns(headers, reference_headers, max_courses)
+
+    output_rows = []
+    update_log = []
+    for compare_row_idx, compare_row in enumerate(rows, start=2):
+        output_row = list(compare_row)
+        reference_matches = reference_index.get(compare_row[compare_key_idx], [])
+        for updates, message in compare_course_updates(
+            compare_row, compare_row_idx, compare_key_idx, reference_matches, course_columns
+        ):
+            for column_idx, value in updates:
+                output_row[column_idx] = value
+            update_log.append(message)
+        output_rows.append(output_row)
+    return output_rows, update_log
+
+def run_pipeline(table, stages=pipeline_stages, report_type=None, course_mapping=None, user_list=None,
+                 reference=None, output_path=None, cache_dir=None, lookup_indexes=None):
+    """Run a table through the chosen stages in memory, serializing only the final result.
+
+    Tables are (headers, rows) pairs or workbook paths. Each stage hands
+    its rows to the next as if they had been saved and reloaded. With a
+    cache_dir, each stage result is memoized under a key chained from the
+    previous stage, so a re-run only recomputes the stages whose inputs
+    changed. lookup_indexes are prebuilt transform_lookup_indexes of the
+    course mapping and user list, to skip parsing them again. Returns a
+    dict with the final "table", the "Discarded Data" and "Not Found
+    Records" tables of Transform and the Compare "update_log".
+    """
+    unknown_stages = [stage for stage in stages if stage not in pipeline_stages]
+    if unknown_stages:
+        raise ValueError(f"Unknown pipeline stages: {', '.join(unknown_stages)}")
+    if "Transform" in stages and not (course_mapping and user_list):
+        raise ValueError("Transform needs a course mapping and a user list.")
+    if "Compare" in stages and not reference:
+        raise ValueError("Compare needs a Reference file.")
+
+    results = {}
+    cache_key = None
+    if cache_dir:
+        # The lookup tables are hashed for the cache keys before their stage reads them
+        course_mapping, user_list, reference = (reusable_table(t) for t in (course_mapping, user_list, reference))
+    if cache_dir and isinstance(table, (str, os.PathLike)):
+        # Read the workbook only once a stage misses the cache
+        headers = rows = None
+        cache_key = file_content_hash(table)
+    elif cache_dir:
+        headers, rows = reusable_table(table)
+        cache_key = table_content_hash((headers, rows))
+    else:
+        headers, rows = as_table(table)
+    for stage in stages:
+        cached_path = None
+        if cache_dir:
+            stage_inputs = {"Transform": [course_mapping, user_list], "Compare": [reference]}.get(stage, [])
+            cache_key = stage_cache_key(stage, stage_inputs, report_type if stage == "Clean" else None, cache_key)
+            cached_path = stage_cache_entry(cache_key, "result.pkl", cache_dir)
+        if not cached_path and headers is None:
+            headers, rows = as_table(table)
+        known_results = set(results)
+
+        if cached_path:
+            with open(cached_path, "rb") as cached_file:
+                headers, rows, stage_results = pickle.load(cached_file)
+            results.update(stage_results)
+        elif stage == "Clean":
+            headers, rows = clean_rows(report_type, headers, rows)
+        elif stage == "Transform":
+            course_index, user_index = lookup_indexes or transform_lookup_indexes(course_mapping, user_list)
+            sheets = transform_rows(headers, rows, course_index, user_index)
+            results["Discarded Data"] = (headers, handoff_rows(sheets["Discarded Data"]))
+            results["Not Found Records"] = (no_records_headers, handoff_rows(sheets["Not Found Records"]))
+            headers, rows = transformed_headers, sheets["Transformed Data"]
+        elif stage == "Transfer":
+            headers, rows = transfer_rows(headers, rows)
+        else:
+            reference_headers, reference_rows = as_table(reference)
+            rows, results["update_log"] = compare_rows(headers, rows, reference_headers, reference_rows)
+        rows = handoff_rows(rows)
+
+        if cache_dir and not cached_path:
+            stage_results = {name: value for name, value in results.items() if name not in known_results}
+            store_stage_cache(cache_key, lambda entry_dir: write_pickle(
+                os.path.join(entry_dir, "result.pkl"), (headers, rows, stage_results)
+            ), cache_dir)
+
+    results["table"] = (headers, rows)
+    if output_path:
+        write_rows_to_excel(output_path, headers, rows)
+    return results
+# endregion
+
+# region Watch Folder Service
+# -----------------------------------------------------------
+# Watch Folder Service Section
+# Polls a drop folder for new ADP exports and SkyPrep bulk
+# downloads and runs the matching stages on each one, keeping
+# the course mapping and user list indexes in memory between
+# jobs and rebuilding them only when those files change.
+# -----------------------------------------------------------
+watch_poll_interval = 5  # Seconds between scans of the drop folder
+
+# The service logs apart from the root logger, which Compare points at update_log.txt
+watch_logger = logging.getLogger("SkyPrep_Migration.watch")
+
+def configure_watch_logging(log_file=None, level="INFO"):
+    """Send the service messages to a log file, or to standard error without one."""
+    handler = logging.FileHandler(log_file) if log_file else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    watch_logger.addHandler(handler)
+    watch_logger.setLevel(level)
+    watch_logger.propagate = False
+
+def classify_watch_file(file_path):
+    """Return the kind of a dropped workbook from its header row, or None if it is not recognised.
+
+    SkyPrep bulk downloads carry skyprep_internal_id and course columns,
+    transformed course progresses go to Clean and Transfer, and the ADP
+    Deficiency and Policies reports go to Clean and Transform.
+    """
+    headers = set(read_header_row(file_path))
+    if "skyprep_internal_id" in headers and any(course_group_number(header) for header in headers):
+        return "SkyPrep bulk download"
+    if set(stage_schemas["Transfer"]) <= headers:
+        return "All_Course_Progresses"
+    if set(policies_report_columns) <= headers:
+        return "Policies_Certifications_Vaccines_Licences"
+    if set(cleaned_report_columns) <= headers:
+        return "Deficiency_Recertification"
+    return None
+
+def scan_watch_folder(watch_dir, last_scan, processed):
+    """Return the new workbooks that did not change since the last scan, and the fingerprints of this scan.
+
+    A file is only picked up once its size and modification time are the
+    same in two scans in a row, so files still being copied are left alone.
+    Files that disappear or cannot be read during the scan are skipped
+    until a later scan.
+    """
+    this_scan = {}
+    ready_paths = []
+    for entry in sorted(os.scandir(watch_dir), key=lambda entry: entry.name):
+        if not entry.name.lower().endswith(".xlsx") or entry.name.startswith("~$"):
+            continue
+        try:
+            if not entry.is_file():
+                continue
+            fingerprint = file_fingerprint(entry.path)
+        except OSError:
+            continue
+        this_scan[entry.path] = fingerprint
+        if last_scan.get(entry.path) == fingerprint and fingerprint not in processed:
+            ready_paths.append(entry.path)
+    return ready_paths, this_scan
+
+def refresh_lookup_indexes(state, course_mapping_path, user_list_path):
+    """Return the warm course mapping and user list indexes, rebuilding them only if either file changed."""
+    fingerprints = (file_fingerprint(course_mapping_path), file_fingerprint(user_list_path))
+    if state.get("lookup_fingerprints") != fingerprints:
+        state["lookup_indexes"] = transform_lookup_indexes(course_mapping_path, user_list_path)
+        state["lookup_fingerprints"] = fingerprints
+        watch_logger.info("Indexed the course mapping and user list")
+    return state["lookup_indexes"]
+
+def check_watch_inputs(stage, file_paths):
+    """Probe the inputs of a stage, logging every problem, and return whether they can be used."""
+    problems = probe_stage_inputs(stage, file_paths)
+    for problem in problems:
+        watch_logger.warning(f"{stage} skipped: {problem}")
+    return not problems
+
+def run_watch_compare(state, output_dir, cache_dir):
+    """Compare the latest bulk update against the latest SkyPrep bulk download, once both exist."""
+    if not (state.get("bulk_update") and state.get("bulk_download")):
+        return
+    if not check_watch_inputs("Compare", [state["bulk_update"], state["bulk_download"]]):
+        return
+    stem = os.path.splitext(os.path.basename(state["bulk_download"]))[0]
+    results = run_pipeline(state["bulk_update"], ["Compare"], reference=state["bulk_download"], cache_dir=cache_dir)
+    output_path = os.path.join(output_dir, f"{stem}_Final_Bulk_Update.xlsx")
+    write_rows_to_excel(output_path, *results["table"])
+    log_path = os.path.join(output_dir, f"{stem}_update_log.txt")
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with open(log_path, "w") as log:
+        log.write(",".join(update_log_columns) + "\n")
+        for message in results["update_log"]:
+            log.write(f"{message},{timestamp}\n")
+    watch_logger.info(f"Compare: {len(results['update_log'])} updates saved to {output_path}")
+
+def process_watch_file(file_path, state, course_mapping_path, user_list_path, output_dir, cache_dir):
+    """Run the stages matching one dropped workbook and save their results in the output folder."""
+    kind = classify_watch_file(file_path)
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    if kind is None:
+        watch_logger.warning(f"Ignored {file_path}: not an ADP export or SkyPrep bulk download")
+    elif kind == "SkyPrep bulk download":
+        watch_logger.info(f"SkyPrep bulk download: {file_path}")
+        state["bulk_download"] = file_path
+        run_watch_compare(state, output_dir, cache_dir)
+    elif kind == "All_Course_Progresses":
+        if not check_watch_inputs(kind, [file_path]):
+            return
+        results = run_pipeline(file_path, ["Clean", "Transfer"], report_type=kind, cache_dir=cache_dir)
+        output_path = os.path.join(output_dir, f"{stem}_Bulk_Update.xlsx")
+        write_rows_to_excel(output_path, *results["table"])
+        watch_logger.info(f"Clean and Transfer: {len(results['table'][1])} employees saved to {output_path}")
+        state["bulk_update"] = output_path
+        run_watch_compare(state, output_dir, cache_dir)
+    elif not (course_mapping_path and user_list_path):
+        watch_logger.warning(f"Transform skipped for {file_path}: no course mapping and user list were given")
+    else:
+        if not (check_watch_inputs(kind, [file_path])
+                and check_watch_inputs("Transform", [file_path, course_mapping_path, user_list_path])):
+            return
+        results = run_pipeline(
+            file_path, ["Clean", "Transform"], report_type=kind,
+            course_mapping=course_mapping_path, user_list=user_list_path, cache_dir=cache_dir,
+            lookup_indexes=refresh_lookup_indexes(state, course_mapping_path, user_list_path)
+        )
+        output_path = os.path.join(output_dir, f"{stem}_Transformed.xlsx")
+        write_tables_to_excel(output_path, {
+            "Transformed Data": results["table"],
+            "Discarded Data": results["Discarded Data"],
+            "Not Found Records": results["Not Found Records"],
+        })
+        watch_logger.info(f"Clean and Transform: {len(results['table'][1])} courses saved to {output_path}")
+
+def watch_folder(watch_dir, course_mapping_path=None, user_list_path=None, output_dir=None,
+                 interval=watch_poll_interval, cache_dir=stage_cache_dir, max_scans=None):
+    """Poll the drop folder and process each new workbook until interrupted, or for max_scans scans."""
+    output_dir = output_dir or os.path.join(watch_dir, "output")
+    if os.path.normcase(os.path.abspath(output_dir)) == os.path.normcase(os.path.abspath(watch_dir)):
+        # The results would be picked up again as new drops
+        raise ValueError("The output folder must not be the watched folder.")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Pay the import and reference parsing costs once, before the first file arrives
+    preload_lazy_modules()
+    state = {}
+    if course_mapping_path and user_list_path:
+        refresh_lookup_indexes(state, course_mapping_path, user_list_path)
+    watch_logger.info(f"Watching {watch_dir}, saving results to {output_dir}")
+    if cache_dir:
+        watch_logger.info(f"Caching stage results in {cache_dir} (--no-cache to turn off)")
+
+    last_scan = {}
+    processed = set()
+    scans = 0
+    while max_scans is None or scans < max_scans:
+        ready_paths, last_scan = scan_watch_folder(watch_dir, last_scan, processed)
+        for file_path in ready_paths:
+            processed.add(last_scan[file_path])
+            try:
+                process_watch_file(file_path, state, course_mapping_path, user_list_path, output_dir, cache_dir)
+            except Exception as e:
+                watch_logger.exception(f"Error processing {file_path}: {e}")
+        scans += 1
+        if max_scans is None or scans < max_scans:
+            time.sleep(interval)
+
+def watch_folder_main(arguments):
+    """Command line entry point of the watch folder service, returning the exit code."""
+    parser = argparse.ArgumentParser(
+        prog="SkyPrep_Migration.py",
+        description="Watch a drop folder for ADP exports and SkyPrep bulk downloads and run the matching stages."
+    )
+    parser.add_argument("--watch", required=True, metavar="FOLDER", help="drop folder to watch")
+    parser.add_argument("--course-mapping", help="course mapping workbook used by Transform")
+    parser.add_argument("--user-list", help="user list workbook used by Transform")
+    parser.add_argument("--output", help="folder for the results, by default an output folder inside the drop folder")
+    parser.add_argument("--interval", type=float, default=watch_poll_interval, help="seconds between scans")
+    parser.add_argument("--cache-dir", default=stage_cache_dir, help="stage result cache folder")
+    parser.add_argument("--no-cache", action="store_true", help="always recompute, without the stage result cache")
+    parser.add_argument("--log-file", help="append the service log to this file instead of standard error")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="lowest level of the messages logged")
+    options = parser.parse_args(arguments)
+    configure_watch_logging(options.log_file, options.log_level)
+    try:
+        watch_folder(
+            options.watch, options.course_mapping, options.user_list, options.output,
+            options.interval, None if options.no_cache else options.cache_dir
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        watch_logger.info("Stopped")
+    return 0
+# endregion
+
+# region Main Window
+# -----------------------------------------------------------
+# Main Window Section
+# Sets up the main GUI window, including navigation buttons,
+# layout configuration and frame management.
+# -----------------------------------------------------------
+
+# Engine toggles that the automatic engine selection overrides
+engine_option_buttons = []
+
+def update_engine_option_states():
+    """Lock the engine toggles while the engine is chosen automatically."""
+    state = "disabled" if auto_plan_mode.get() else "normal"
+    for button in engine_option_buttons:
+        button.config(state=state)
+
+def add_engine_option(frame, text, variable, **pack_options):
+    """Add an engine toggle to a screen, registered to be locked under automatic engine selection."""
+    button = tk.Checkbutton(frame, text=text, variable=variable, bg="#F5F5F5", font=("Arial", 10))
+    button.pack(**pack_options)
+    engine_option_buttons.append(button)
+
+def add_out_of_core_options(frame):
+    """Add the out-of-core mode toggle and memory budget to a screen, returning their frame."""
+    options_frame = tk.Frame(frame, bg="#F5F5F5")
+    options_frame.pack(pady=5)
+    add_engine_option(options_frame, "Out-of-core mode (large files)", out_of_core_mode, side="left")
+    tk.Label(options_frame, text="Memory budget (MB):", bg="#F5F5F5", font=("Arial", 10)).pack(side="left", padx=(10, 0))
+    tk.Spinbox(options_frame, from_=64, to=65536, increment=64, textvariable=memory_budget_mb, width=7).pack(side="left")
+    return options_frame
+
+def update_clean_out_of_core_options(options_frame):
+    """Show the out-of-core options on the Clean screen only for the report they apply to."""
+    if selected_report.get() == "All_Course_Progresses":
+        options_frame.pack(pady=5)
+    else:
+        options_frame.pack_forget()
+
+def add_preview_options(frame, stage):
+    """Add the sample preview button and settings to a screen."""
+    options_frame = tk.Frame(frame, bg="#F5F5F5")
+    options_frame.pack(pady=5)
+    tk.Label(options_frame, text="Sample rows:", bg="#F5F5F5", font=("Arial", 10)).pack(side="left")
+    tk.Spinbox(options_frame, from_=10, to=100000, increment=10, textvariable=preview_sample_size, width=7).pack(side="left")
+    tk.Checkbutton(
+        options_frame, text="Random sample", variable=preview_random_sample, bg="#F5F5F5", font=("Arial", 10)
+    ).pack(side="left", padx=(10, 0))
+    tk.Button(
+        options_frame, text="Preview Sample", font=("Arial", 10), command=lambda: start_preview_logic(stage)
+    ).pack(side="left", padx=(10, 0))
+
+def add_staging_engine_option(frame):
+    """Add the SQLite staging engine toggle to a screen."""
+    add_engine_option(frame, "Use SQLite staging engine (indexed joins)", staging_engine_mode, pady=5)
+
+def add_sharded_output_options(frame):
+    """Add the sharded output toggle and shard limits to a screen."""
+    options_frame = tk.Frame(frame, bg="#F5F5F5")
+    options_frame.pack(pady=5)
+    tk.Checkbutton(
+        options_frame, text="Split output into shards", variable=sharded_output_mode,
+        bg="#F5F5F5", font=("Arial", 10)
+    ).pack(side="left")
+    tk.Label(options_frame, text="Rows per shard:", bg="#F5F5F5", font=("Arial", 10)).pack(side="left", padx=(10, 0))
+    tk.Spinbox(options_frame, from_=0, to=1000000, increment=500, textvariable=shard_max_rows, width=7).pack(side="left")
+    tk.Label(options_frame, text="MB per shard:", bg="#F5F5F5", font=("Arial", 10)).pack(side="left", padx=(10, 0))
+    tk.Spinbox(options_frame, from_=0, to=4096, increment=5, textvariable=shard_max_mb, width=5).pack(side="left")
+
+def add_diff_output_options(frame):
+    """Add the diff-only output and patch file toggles to a screen."""
+    options_frame = tk.Frame(frame, bg="#F5F5F5")
+    options_frame.pack(pady=5)
+    tk.Checkbutton(
+        options_frame, text="Save only changed employees", variable=diff_output_mode,
+        bg="#F5F5F5", font=("Arial", 10)
+    ).pack(side="left")
+    tk.Checkbutton(
+        options_frame, text="Also save JSON patch", variable=diff_patch_file,
+        bg="#F5F5F5", font=("Arial", 10)
+    ).pack(side="left", padx=(10, 0))
+
+def add_parallel_loading_option(frame):
+    """Add the parallel input loading toggle to a screen."""
+    add_engine_option(frame, "Load input files in parallel", parallel_loading_mode, pady=5)
+
+def add_parallel_compare_option(frame):
+    """Add the multi-process Compare toggle to a screen."""
+    add_engine_option(frame, "Run Compare on all cores", parallel_compare_mode, pady=5)
+
+def add_auto_plan_option(frame, with_budget=False):
+    """Add the automatic engine selection toggle to a screen, with the memory budget if the screen has none."""
+    options_frame = tk.Frame(frame, bg="#F5F5F5")
+    options_frame.pack(pady=5)
+    tk.Checkbutton(
+        options_frame, text="Choose engine automatically", variable=auto_plan_mode,
+        bg="#F5F5F5", font=("Arial", 10)
+    ).pack(side="left")
+    if with_budget:
+        tk.Label(options_frame, text="Memory budget (MB):", bg="#F5F5F5", font=("Arial", 10)).pack(side="left", padx=(10, 0))
+        tk.Spinbox(options_frame, from_=64, to=65536, increment=64, textvariable=memory_budget_mb, width=7).pack(side="left")
+
+def add_stage_cache_option(frame):
+    """Add the stage result cache toggle to a screen, naming the folder where the results are kept."""
+    tk.Checkbutton(
+        frame, text=f"Reuse cached results for unchanged inputs (keeps a copy of each result in {stage_cache_dir})",
+        variable=stage_cache_mode, bg="#F5F5F5", font=("Arial", 10), wraplength=500
+    ).pack(pady=5)
+
+# Bring the selected frame to the front
+def show_frame(frame):
+    frame.tkraise()
+
+# Change button color on hover to a darker version
+def on_enter(e):    
+    idx = button_widgets.index(e.widget)
+    original_color = buttons[idx][1]
+    # Darken the color slightly
+    darker_color = "#%02x%02x%02x" % tuple(max(0, int(original_color[i:i+2], 16) - 30) for i in (1, 3, 5))
+    e.widget['bg'] = darker_color
+
+# Revert button color when hover ends
+def on_leave(e):    
+    idx = button_widgets.index(e.widget)
+    e.widget['bg'] = buttons[idx][1]  # Original color
+
+# Function to dynamically resize buttons with spacing and padding
+def resize_buttons():    
+    frame_width = menu_frame.winfo_width()
+    button_width = frame_width - 2 * padding  # Button width matches the menu frame width with padding
+    button_height = 60  # Fixed height for all buttons
+
+    for idx, button in enumerate(button_widgets):
+        button.place(
+            x=padding,  # Align with padding
+            y=padding + idx * (button_height + spacing),  # Space buttons vertically
+            width=button_width,
+            height=button_height,
+        )
+
+def fit_window_to_screens(screen_frames):
+    """Grow the window to fit the largest screen, since placed frames do not resize it themselves."""
+    root.update_idletasks()
+    width = menu_frame.winfo_reqwidth() + max(frame.winfo_reqwidth() for frame in screen_frames)
+    height = max(frame.winfo_reqheight() for frame in screen_frames) + bottom_bar.winfo_reqheight()
+    width = min(max(width, 600), root.winfo_screenwidth())
+    height = min(max(height, 400), root.winfo_screenheight() - 80)  # Leave room for the taskbar
+    root.geometry(f"{width}x{height}")
+    root.minsize(width, height)
+
+def main():
+    """Build the main window and run the application."""
+    global root, bottom_bar, menu_frame
+    global file_label, transform_file_label, course_mapping_file_label, user_list_file_label
+    global transfer_file_label, compare_file_label, reference_file_label
+    global selected_report, out_of_core_mode, memory_budget_mb, staging_engine_mode, parallel_loading_mode
+    global preview_sample_size, preview_random_sample
+    global sharded_output_mode, shard_max_rows, shard_max_mb, diff_output_mode, diff_patch_file
+    global parallel_compare_mode, stage_cache_mode, auto_plan_mode, plan_label
+    global buttons, button_widgets, padding, spacing
+
+    root = tk.Tk()
+    root.title("SkyPrep Migration Tool")
+    root.geometry("600x400")
+    root.minsize(600, 400)  # Set minimum size to prevent distortion
+    root.configure(bg="#2E2E2E")  # Background color
+
+    # Set favicon path for logo at the top left corner of the frame
+    icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "favicon.ico")
+    if os.path.exists(icon_path):
+        root.iconbitmap(icon_path)
+
+    # Main container frames
+    main_frame = tk.Frame(root)
+    main_frame.pack(fill="both", expand=True)
+
+    # Left menu frame
+    menu_frame = tk.Frame(main_frame, width=150, bg="#3C3F41", relief="raised")
+    menu_frame.pack(side="left", fill="y")
+
+    # Right content frame
+    content_frame = tk.Frame(main_frame, bg="#F5F5F5")
+    content_frame.pack(side="right", expand=True, fill="both")
+
+    # Bottom bar
+    bottom_bar = tk.Frame(root, bg="#2E2E2E", height=50)
+    bottom_bar.pack(side="bottom", fill="x")
+
+    # Footer label with dynamic text
+    footer_label = tk.Label(
+        bottom_bar,
+        text=f"© Voyago | {datetime.now().strftime('%Y-%m-%d')}",
+        bg="#2E2E2E",
+        fg="white",
+        font=("Arial", 10),
+    )
+    footer_label.pack(side="right", padx=10)
+
+    # Engine chosen by the adaptive planner for the last run
+    plan_label = tk.Label(bottom_bar, text="", bg="#2E2E2E", fg="white", font=("Arial", 9), wraplength=600, justify="left")
+    plan_label.pack(side="left", padx=10)
+
+    # Define frames for each screen in the content area
+    clean_frame = tk.Frame(content_frame, bg="#F5F5F5")
+    transform_frame = tk.Frame(content_frame, bg="#F5F5F5")
+    transfer_frame = tk.Frame(content_frame, bg="#F5F5F5")
+    compare_frame = tk.Frame(content_frame, bg="#F5F5F5")
+
+    # Place all frames on the same stack
+    for frame in (clean_frame, transform_frame, transfer_frame, compare_frame):
+        frame.place(relwidth=1, relheight=1)
+
+    # region Clean Screen widgets
+    # Add widgets to the Clean Screen
+    tk.Label(clean_frame, text="Clean Report", bg="#F5F5F5", font=("Arial", 16)).pack(pady=10)
+
+    label_select_report = tk.Label(clean_frame, text="Select Report to Clean", font=("Arial", 12), bg="#F5F5F5")
+    label_select_report.pack(pady=5)
+
+    selected_report = tk.StringVar(value="Deficiency_Recertification")  # Default report selection
+
+    radio_deficiency = tk.Radiobutton(
+        clean_frame, text="ADP Deficiency_Recertification Report", variable=selected_report,
+        value="Deficiency_Recertification", bg="#F5F5F5", font=("Arial", 10)
+    )
+    radio_deficiency.pack(anchor="w", padx=(50, 0), pady=(10, 0))
+
+    radio_policies = tk.Radiobutton(
+        clean_frame, text="ADP Policies_Certifications_Vaccines_Licences Report", variable=selected_report,
+        value="Policies_Certifications_Vaccines_Licences", bg="#F5F5F5", font=("Arial", 10)
+    )
+    radio_policies.pack(anchor="w", padx=(50, 0), pady=(0, 0))
+
+    radio_courses = tk.Radiobutton(
+        clean_frame, text="ADP All_Course_Progresses Report", variable=selected_report,
+        value="All_Course_Progresses", bg="#F5F5F5", font=("Arial", 10)
+    )
+    radio_courses.pack(anchor="w", padx=(50, 0), pady=(0, 10))
+
+    # Out-of-core mode settings shared by the Clean and Transfer screens
+    out_of_core_mode = tk.BooleanVar(value=False)
+    memory_budget_mb = tk.IntVar(value=default_memory_budget_mb)
+
+    # Only the All_Course_Progresses report has an out-of-core path
+    clean_out_of_core_slot = tk.Frame(clean_frame, bg="#F5F5F5")
+    clean_out_of_core_slot.pack()
+    clean_out_of_core_options = add_out_of_core_options(clean_out_of_core_slot)
+    selected_report.trace_add("write", lambda *args: update_clean_out_of_core_options(clean_out_of_core_options))
+    update_clean_out_of_core_options(clean_out_of_core_options)
+
+    # Automatic engine selection and stage result cache settings shared by all screens
+    auto_plan_mode = tk.BooleanVar(value=True)
+    stage_cache_mode = tk.BooleanVar(value=False)
+    auto_plan_mode.trace_add("write", lambda *args: update_engine_option_states())
+
+    add_auto_plan_option(clean_frame)
+
+    add_stage_cache_option(clean_frame)
+
+    # Sample preview settings shared by all screens
+    preview_sample_size = tk.IntVar(value=preview_default_sample_size)
+    preview_random_sample = tk.BooleanVar(value=False)
+
+    clean_browse_button = tk.Button(clean_frame, text="Select Report", font=("Arial", 12),
+                                    width=25, height=1, command=select_clean_file)
+    clean_browse_button.pack(pady=5)
+
+    file_label = tk.Label(clean_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
+    file_label.pack(pady=5)
+
+    add_preview_options(clean_frame, "Clean")
+
+    start_button = tk.Button(clean_frame, text="Start Clean", font=("Arial", 14),
+                             width=20, height=2, command=start_clean_logic)
+    start_button.pack(pady=10)
+    # endregion
+
+    # region Transform Screen widgets
+    # Add widgets to the Transform Screen
+    tk.Label(transform_frame, text="Transform Report", bg="#F5F5F5", font=("Arial", 16)).pack(pady=10)
+
+    transform_browse_button = tk.Button(transform_frame, text="Select Cleaned Report", font=("Arial", 12),
+                                               width=25, height=1, command=select_transform_file)
+    transform_browse_button.pack(pady=5)
+
+    transform_file_label = tk.Label(transform_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
+    transform_file_label.pack(pady=5)
+
+    transform_course_mapping_button = tk.Button(transform_frame, text="Add Course Mapping", font=("Arial", 12),
+                                                width=25, height=1, command=select_course_mapping_file)
+    transform_course_mapping_button.pack(pady=5)
+
+    course_mapping_file_label = tk.Label(transform_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
+    course_mapping_file_label.pack(pady=5)
+
+    transform_user_list_button = tk.Button(transform_frame, text="Add User List", font=("Arial", 12),
+                                           width=25, height=1, command=select_user_list_file)
+    transform_user_list_button.pack(pady=5)
+
+    user_list_file_label = tk.Label(transform_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
+    user_list_file_label.pack(pady=5)
+
+    # SQLite staging engine and parallel loading settings shared by the Transform and Compare screens
+    staging_engine_mode = tk.BooleanVar(value=False)
+    parallel_loading_mode = tk.BooleanVar(value=False)
+
+    add_staging_engine_option(transform_frame)
+    add_parallel_loading_option(transform_frame)
+    add_auto_plan_option(transform_frame, with_budget=True)
+    add_stage_cache_option(transform_frame)
+    add_preview_options(transform_frame, "Transform")
+
+    start_transform_button = tk.Button(transform_frame, text="Start Transform", font=("Arial", 14),
+                                       width=20, height=2, command=start_transform_logic)
+    start_transform_button.pack(pady=10)
+    # endregion
+
+    # region Transfer Screen widgets
+    # Add widgets to the Transfer Screen
+    tk.Label(transfer_frame, text="Transfer Report", bg="#F5F5F5", font=("Arial", 16)).pack(pady=30)
+
+    transfer_browse_button = tk.Button(transfer_frame, text="Select Output Report", font=("Arial", 12),
+                                       width=25, height=1, command=select_transfer_file)
+    transfer_browse_button.pack(pady=5)
+
+    transfer_file_label = tk.Label(transfer_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
+    transfer_file_label.pack(pady=5)
+
+    add_out_of_core_options(transfer_frame)
+
+    # Sharded output settings shared by the Transfer and Compare screens
+    sharded_output_mode = tk.BooleanVar(value=False)
+    shard_max_rows = tk.IntVar(value=default_shard_max_rows)
+    shard_max_mb = tk.IntVar(value=default_shard_max_mb)
+
+    add_sharded_output_options(transfer_frame)
+    add_auto_plan_option(transfer_frame)
+    add_stage_cache_option(transfer_frame)
+    add_preview_options(transfer_frame, "Transfer")
+
+    start_transfer_button = tk.Button(transfer_frame, text="Start Transfer", font=("Arial", 14),
+                                      width=20, height=2, command=start_transfer_logic)
+    start_transfer_button.pack(pady=30)
+    # endregion
+
+    # region Compare Screen widgets
+    # Add widgets to the Compare Screen
+    tk.Label(compare_frame, text="Compare Reports", bg="#F5F5F5", font=("Arial", 16)).pack(pady=20)
+
+    compare_browse_button = tk.Button(compare_frame, text="Select Generated Report", font=("Arial", 12),
+                                      width=25, height=1, command=select_compare_file)
+    compare_browse_button.pack(pady=5)
+
+    compare_file_label = tk.Label(compare_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
+    compare_file_label.pack(pady=5)
+
+    reference_browse_button = tk.Button(compare_frame, text="Select Reference Report", font=("Arial", 12),
+                                        width=25, height=1, command=select_reference_file)
+    reference_browse_button.pack(pady=5)
+
+    reference_file_label = tk.Label(compare_frame, text="No file selected", bg="#F5F5F5", font=("Arial", 10), wraplength=400)
+    reference_file_label.pack(pady=5)
+
+    add_staging_engine_option(compare_frame)
+    add_parallel_loading_option(compare_frame)
+
+    # Multi-process setting of the Compare screen
+    parallel_compare_mode = tk.BooleanVar(value=False)
+
+    add_parallel_compare_option(compare_frame)
+    add_sharded_output_options(compare_frame)
+
+    # Diff-only output settings of the Compare screen
+    diff_output_mode = tk.BooleanVar(value=False)
+    diff_patch_file = tk.BooleanVar(value=False)
+
+    add_diff_output_options(compare_frame)
+    add_auto_plan_option(compare_frame, with_budget=True)
+    add_stage_cache_option(compare_frame)
+    add_preview_options(compare_frame, "Compare")
+
+    start_compare_button = tk.Button(compare_frame, text="Start Compare", font=("Arial", 14),
+                                     width=20, height=2, command=start_compare_logic)
+    start_compare_button.pack(pady=30)
+
+    update_engine_option_states()
+    fit_window_to_screens((clean_frame, transform_frame, transfer_frame, compare_frame))
+    # endregion
+
+    # Define button properties
+    buttons = [(text, "#E90000", frame) for text, frame in [
+        ("Clean", clean_frame),
+        ("Transform", transform_frame),
+        ("Transfer", transfer_frame),
+        ("Compare", compare_frame),
+    ]]
+    button_widgets = []
+    padding = 20  # Padding around the buttons
+    spacing = 30  # Space between buttons
+
+    # Add buttons to the menu frame with hover effects
+    for text, color, frame in buttons:
+        btn = tk.Button(
+            menu_frame,
+            text=text,
+            bg=color,
+            fg="white",
+            font=("Arial", 12, "bold"),
+            relief="raised",
+            borderwidth=2,
+            command=lambda f=frame: show_frame(f),
+        )
+        btn.bind("<Enter>", on_enter)
+        btn.bind("<Leave>", on_leave)
+        button_widgets.append(btn)
+
+    # Bind the resize event to dynamically adjust button size, padding and spacing
+    menu_frame.bind("<Configure>", lambda e: resize_buttons())
+
+    # Show the first screen by default
+    show_frame(clean_frame)
+
+    # Run the application
+    root.mainloop()
+
+if __name__ == "__main__":
+    # Needed for the shard writer processes of a frozen Windows build
+    multiprocessing.freeze_support()
+    if "--watch" in sys.argv[1:]:
+        sys.exit(watch_folder_main(sys.argv[1:]))
+    main()
+
+# endregion
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make SkyPrep_Migration.py importable from the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,515 @@
+"""
+Frozen copy of the per-row logic of the original SkyPrep Migration Tool
+(Version 1.0, 2024-12-20), used as the oracle of the regression gate.
+
+The stage bodies are copied from the first release of
+SkyPrep_Migration.py with only the GUI removed: no progress bar, the
+file dialogs replaced by paths, the output workbooks returned as
+(headers, rows) tables, and the Compare log lines collected in a list
+instead of the logging module. Do not refactor this file or make it
+call into SkyPrep_Migration.py, or the gate stops checking anything.
+"""
+import openpyxl
+import pandas as pd
+from datetime import datetime
+
+
+def sheet_table(sheet):
+    """Return the header row and the data rows of a sheet."""
+    rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+    return rows[0], rows[1:]
+
+
+def clean_course_progresses(clean_file_path):
+    """Clean the All_Course_Progresses report."""
+    # Handle Duplicate Removal logic
+    data_frame = pd.read_excel(clean_file_path)
+    data_frame["Email_Course"] = data_frame["Email"] + " | " + data_frame["Course Name"]
+    data_frame = data_frame.sort_values(by=["Email_Course", "Start Date", "Completion Date", "Expiration Date"], ascending=[True, False, False, False])
+    data_frame_cleaned = data_frame.drop_duplicates(subset=["Email_Course"], keep="first")
+    data_frame_cleaned = data_frame_cleaned.drop(columns=["Email_Course"])
+    rows = data_frame_cleaned.astype(object).where(data_frame_cleaned.notna(), None).values.tolist()
+    return {"Cleaned": (list(data_frame_cleaned.columns), rows)}
+
+
+def clean_deficiency(clean_file_path):
+    """Clean the Deficiency_Recertification report."""
+    # Handle Deficiency Recertification logic
+    wb = openpyxl.load_workbook(clean_file_path)
+    sheet = wb.active
+    new_wb = openpyxl.Workbook()
+    new_sheet = new_wb.active
+
+    required_columns = [
+        "Position ID", "Payroll Name", "Course Name Description",
+        "Start Date", "Recertification Date", "Acquired Date",
+    ]
+    headers = [cell.value for cell in sheet[1]]
+    required_indices = [headers.index(col) for col in required_columns]
+
+    new_sheet.append(required_columns)
+
+    for idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=1):
+        row_list = list(row)
+        filtered_row = [row_list[idx] for idx in required_indices]
+
+        start_date = filtered_row[required_columns.index("Start Date")]
+        recertification_date = filtered_row[required_columns.index("Recertification Date")]
+        acquired_date = filtered_row[required_columns.index("Acquired Date")]
+
+        if start_date and not recertification_date and not acquired_date:
+            pass
+        elif start_date and acquired_date and not recertification_date:
+            filtered_row[required_columns.index("Recertification Date")] = None
+            filtered_row[required_columns.index("Acquired Date")] = None
+        elif start_date and recertification_date:
+            if recertification_date > start_date:
+                filtered_row[required_columns.index("Acquired Date")] = start_date
+            elif recertification_date == start_date:
+                filtered_row[required_columns.index("Recertification Date")] = None
+                filtered_row[required_columns.index("Acquired Date")] = None
+            elif recertification_date < start_date:
+                filtered_row[required_columns.index("Recertification Date")] = None
+                filtered_row[required_columns.index("Acquired Date")] = None
+
+        new_sheet.append(filtered_row)
+    return {"Cleaned": sheet_table(new_sheet)}
+
+
+def clean_policies(clean_file_path):
+    """Clean the Policies_Certifications_Vaccines_Licences report."""
+    # Handle Policies, Certifications, Vaccines and Licenses logic
+    wb = openpyxl.load_workbook(clean_file_path)
+    sheet = wb.active
+    new_wb = openpyxl.Workbook()
+    new_sheet = new_wb.active
+
+    existing_columns = [
+        "Position ID", "Payroll Name", "License/Certification Description",
+        "Effective Date", "Expiration Date", "Hire Date",
+    ]
+    required_columns = [
+        "Position ID", "Payroll Name", "Course Name Description",
+        "Start Date", "Recertification Date", "Acquired Date",
+    ]
+    new_sheet.append(required_columns)
+
+    existing_headers = [cell.value for cell in sheet[1]]
+    existing_indices = [existing_headers.index(col) for col in existing_columns]
+
+    for idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=1):
+        row_list = list(row)
+        filtered_row = [row_list[idx] for idx in existing_indices]
+
+        position_id = filtered_row[existing_columns.index("Position ID")]
+        payroll_name = filtered_row[existing_columns.index("Payroll Name")]
+        course_name_description = filtered_row[existing_columns.index("License/Certification Description")]
+
+        start_date = filtered_row[existing_columns.index("Effective Date")]
+        recertification_date = filtered_row[existing_columns.index("Expiration Date")]
+        hire_date = filtered_row[existing_columns.index("Hire Date")]
+
+        if start_date == None:
+            if recertification_date == None:
+                start_date = hire_date
+                acquired_date = None
+            else:
+                start_date = hire_date
+                acquired_date = start_date
+        else:
+            acquired_date = start_date
+            if recertification_date == None:
+                recertification_date = datetime(2050, 1, 1)
+
+        if recertification_date == hire_date:
+            acquired_date == None
+            recertification_date == None
+
+        # Prepare the row for the new sheet
+        transformed_row = [
+            position_id or "", payroll_name or "", course_name_description or "",
+            start_date or "", recertification_date or "", acquired_date or ""
+        ]
+        new_sheet.append(transformed_row)
+    return {"Cleaned": sheet_table(new_sheet)}
+
+
+def transform(transform_file_path, course_mapping_file_path, user_list_file_path):
+    """Transform the cleaned report with the course mapping and user list."""
+    # Open the main Excel file
+    main_wb = openpyxl.load_workbook(transform_file_path)
+    main_sheet = main_wb.active
+
+    # Open the course mapping Excel file
+    course_mapping_wb = openpyxl.load_workbook(course_mapping_file_path)
+    course_mapping_sheet = course_mapping_wb.active
+
+    # Open the user list Excel file
+    user_list_wb = openpyxl.load_workbook(user_list_file_path)
+    user_list_sheet = user_list_wb.active
+
+    # Create a new workbook for the transformed data
+    transformed_wb = openpyxl.Workbook()
+    transformed_sheet = transformed_wb.active
+    transformed_sheet.title = "Transformed Data"
+
+    # Create a separate sheet for "Discarded Data"
+    discarded_sheet = transformed_wb.create_sheet(title="Discarded Data")
+
+    # Create a separate sheet for rows with "Login Status: Not found"
+    not_found_sheet = transformed_wb.create_sheet(title="Not Found Records")
+
+    # Define the mapping for headers between the main file and transformed sheet
+    main_to_transformed_mapping = {
+        "Position ID": "Work phone",
+        "Course Name Description": "Course Name",
+        "Start Date": "Start Date",
+        "Recertification Date": "Expiration Date",
+        "Acquired Date": "Completion Date",
+    }
+
+    # Define additional static fields for the transformed sheet
+    additional_fields = {
+        "Login Status": lambda email: "Active" if email else "Not found",
+        "Course Progress Status": lambda recertification_date: "passed" if recertification_date else "not-started",
+        "Deadline Date": lambda: "",  # Always blank
+    }
+
+    # Write the headers to the transformed sheet
+    transformed_headers = [
+        "SkyPrep ID", "First name", "Last name", "Email",
+        "Work phone", "Course Number", "Course Name",
+        "Login Status", "Course Progress Status",
+        "Start Date", "Completion Date",
+        "Deadline Date", "Expiration Date"
+    ]
+    transformed_sheet.append(transformed_headers)
+
+    # Extract headers from the main file
+    main_headers = [cell.value for cell in main_sheet[1]]
+
+    # Map main headers to their indices
+    main_header_indices = {header: idx for idx, header in enumerate(main_headers)}
+
+    # Ensure all required headers are present in the main file
+    missing_headers = [
+        header for header in main_to_transformed_mapping.keys()
+        if header not in main_header_indices
+    ]
+    if missing_headers:
+        raise ValueError(f"Missing required columns in main file: {', '.join(missing_headers)}")
+
+    # Write the headers to the Not Found Records sheet
+    no_records_headers = ["Position ID", "Payroll Name", "Login Status"]
+    not_found_sheet.append(no_records_headers)
+
+    # Write headers from the original source file to the "Discarded Data" sheet
+    discarded_headers = main_headers  # Same headers as the headers from main file
+    discarded_sheet.append(discarded_headers)
+
+    # Create a set to track unique position IDs in the Not Found Records sheet
+    existing_position_ids = set()
+
+    # Extract headers from the user list file
+    user_list_headers = [cell.value for cell in user_list_sheet[1]]
+
+    # Map user list headers to their indices
+    user_list_header_indices = {header: idx for idx, header in enumerate(user_list_headers)}
+
+    # Process rows in the main file
+    for idx, row in enumerate(main_sheet.iter_rows(min_row=2, values_only=True), start=1):
+        # Extract data from the main sheet
+        position_id = row[main_header_indices.get("Position ID")]
+        payroll_name = row[main_header_indices.get("Payroll Name")]
+        course_name_description = row[main_header_indices.get("Course Name Description")]
+        start_date = row[main_header_indices.get("Start Date")]
+        recertification_date = row[main_header_indices.get("Recertification Date")]
+        acquired_date = row[main_header_indices.get("Acquired Date")]
+
+        # Perform course mapping
+        course_number_skyprep = None
+        course_name_skyprep = None
+        for mapping_row in course_mapping_sheet.iter_rows(min_row=2, values_only=True):
+            if mapping_row[0] == course_name_description:
+                course_number_skyprep = mapping_row[1]
+                course_name_skyprep = mapping_row[2]
+                break
+
+        # If course is marked as "Discard", store it in the Discarded Data sheet
+        if course_name_skyprep == "Discard":
+            discarded_sheet.append(list(row))
+            continue
+
+        # Check if course mapping not found
+        elif course_name_skyprep == None:
+            course_name_skyprep = "Course Mapping Not Found"
+
+        # Perform user mapping
+        skyprep = email = first_name = last_name = None
+        for user_row in user_list_sheet.iter_rows(min_row=2, values_only=True):
+            if user_row[user_list_header_indices["work_phone"]] == position_id:
+                skyprep = user_row[user_list_header_indices["skyprep_internal_id"]]
+                email = user_row[user_list_header_indices["email_or_username"]]
+                first_name = user_row[user_list_header_indices["first_name"]]
+                last_name = user_row[user_list_header_indices["last_name"]]
+                break
+
+        # Determine additional fields
+        login_status = additional_fields["Login Status"](email)
+        course_progress_status = additional_fields["Course Progress Status"](recertification_date)
+        deadline_date = additional_fields["Deadline Date"]()
+
+        # Remove start date if course progress status is not started
+        if course_progress_status == "not-started":
+            start_date = None
+
+        # Append to the appropriate sheet
+        if login_status == "Not found":
+            # Prepare the row for the records not found sheet
+            no_records_row = [position_id or "", payroll_name or "", login_status]
+            # Check if the position_id already exists in the set
+            if position_id not in existing_position_ids:
+                not_found_sheet.append(no_records_row)
+                existing_position_ids.add(position_id)  # Add to the set after appending
+        else:
+            # Prepare the row for the transformed sheet
+            transformed_row = [
+                skyprep or "", first_name or "", last_name or "",
+                email or "", position_id or "",
+                course_number_skyprep or "", course_name_skyprep or "",
+                login_status, course_progress_status,
+                start_date or "", acquired_date or "",
+                deadline_date, recertification_date or ""
+            ]
+            transformed_sheet.append(transformed_row)
+    return {
+        "Transformed Data": sheet_table(transformed_sheet),
+        "Discarded Data": sheet_table(discarded_sheet),
+        "Not Found Records": sheet_table(not_found_sheet),
+    }
+
+
+def generate_destination_columns(max_courses=84):
+    """Dynamically generate destination columns."""
+    columns = ['skyprep_internal_id', 'first_name', 'last_name', 'email_or_username', 'work_phone']
+    for i in range(1, max_courses + 1):
+        columns.extend([
+            f'course {i}', f'course {i} status', f'course {i} date started', f'course {i} date finished',
+            f'course {i} access date', f'course {i} deadline date', f'course {i} expiration date'
+        ])
+    return columns
+
+
+def transfer(transfer_file_path):
+    """Transfer the transformed data into the bulk update format."""
+    # Load the source file
+    source_data_frame = pd.read_excel(transfer_file_path)
+
+    # Generate destination columns dynamically
+    destination_columns = generate_destination_columns()
+
+    # Initialize a list to collect rows
+    rows_list = []
+
+    grouped = source_data_frame.groupby('SkyPrep ID')
+
+    for idx, (employee, group) in enumerate(grouped, start=1):
+        row = {col: '' for col in destination_columns}
+        row['skyprep_internal_id'] = employee
+        row['first_name'] = group['First name'].iloc[0]
+        row['last_name'] = group['Last name'].iloc[0]
+        row['email_or_username'] = group['Email'].iloc[0]
+        row['work_phone'] = group['Work phone'].iloc[0]
+
+        for _, course in group.iterrows():
+            course_number = course['Course Number']
+            course_name = course['Course Name']
+            course_progress_status = course['Course Progress Status']
+            start_date = course['Start Date']
+            completion_date = course['Completion Date']
+            expiration_date = course['Expiration Date']
+
+            for i in range(1, (len(destination_columns) - 5) // 7 + 1): #Static Columns=5, Dynamic Columns=7
+                target_course_column = f'course {i}'
+                if target_course_column in destination_columns and course_number == f'Course {i}':
+                    row[target_course_column] = course_name
+                    row[f'course {i} status'] = course_progress_status
+                    row[f'course {i} date started'] = start_date
+                    row[f'course {i} date finished'] = completion_date
+                    row[f'course {i} expiration date'] = expiration_date
+                    break
+
+        # Add the row to the list
+        rows_list.append(row)
+
+    # After processing all rows, create the final DataFrame
+    output_data_frame = pd.DataFrame(rows_list, columns=destination_columns)
+    rows = output_data_frame.astype(object).where(output_data_frame.notna(), None).values.tolist()
+    return {"Transferred": (destination_columns, rows)}
+
+
+def compare(compare_file_path, reference_file_path):
+    """Compare the generated bulk file with the SkyPrep download, returning the updated file and log."""
+    update_log = []
+
+    # Load the Compare and Reference workbooks
+    compare_wb = openpyxl.load_workbook(compare_file_path)
+    reference_wb = openpyxl.load_workbook(reference_file_path)
+
+    # Assume the first sheet is the active one in both files
+    compare_sheet = compare_wb.active
+    reference_sheet = reference_wb.active
+
+    # Get the headers from both sheets
+    compare_headers = [cell.value for cell in compare_sheet[1]]
+    reference_headers = [cell.value for cell in reference_sheet[1]]
+
+    # Define the key column for matching rows and declare the total number of courses
+    key_column = "skyprep_internal_id"
+    max_courses = 84
+
+    # Find the index of the key column in both sheets
+    compare_key_idx = compare_headers.index(key_column)
+    reference_key_idx = reference_headers.index(key_column)
+
+    # Loop through each row in the Compare sheet (starting from the second row)
+    for compare_row_idx, compare_row in enumerate(compare_sheet.iter_rows(min_row=2, values_only=True), start=2):
+        compare_key = compare_row[compare_key_idx]
+        compare_last_name = compare_row[2]
+        compare_first_name = compare_row[1]
+
+        # Search for the matching key in the Reference sheet
+        for reference_row in reference_sheet.iter_rows(min_row=2, values_only=True):
+            if reference_row[reference_key_idx] == compare_key:
+
+                # Match found - loop through all the courses
+                for i in range(1, (max_courses + 1)):
+                    # Define course column group names dynamically
+                    column_names = [
+                        f"course {i}",
+                        f"course {i} status",
+                        f"course {i} date started",
+                        f"course {i} date finished",
+                        f"course {i} deadline date",
+                        f"course {i} expiration date",
+                    ]
+
+                    # Check if these columns exist in both sheets
+                    if all(col in compare_headers and col in reference_headers for col in column_names):
+                        # Get column indices dynamically
+                        compare_indices = {name: compare_headers.index(name) for name in column_names}
+                        reference_indices = {name: reference_headers.index(name) for name in column_names}
+
+                        # Extract values from Compare and Reference rows
+                        compare_values = {name: compare_row[idx] for name, idx in compare_indices.items()}
+                        reference_values = {name: reference_row[idx] for name, idx in reference_indices.items()}
+
+                        # Get course status
+                        compare_course_status = compare_values[f"course {i} status"]
+                        reference_course_status = reference_values[f"course {i} status"]
+
+                        # Get course dates
+                        compare_date_started = compare_values[f"course {i} date started"]
+                        compare_date_finished = compare_values[f"course {i} date finished"]
+                        compare_expiration_date = compare_values[f"course {i} expiration date"]
+
+                        reference_date_started = reference_values[f"course {i} date started"]
+                        reference_date_finished = reference_values[f"course {i} date finished"]
+                        reference_deadline_date = reference_values[f"course {i} deadline date"]
+                        reference_expiration_date = reference_values[f"course {i} expiration date"]
+
+                        # Variables for logging purpose only
+                        adp_course_status = compare_course_status
+                        adp_date_started = compare_date_started
+                        adp_date_finished = compare_date_finished
+                        adp_expiration_date = compare_expiration_date
+
+                        skyprep_course_status = reference_course_status
+                        skyprep_date_started = reference_date_started
+                        skyprep_date_finished = reference_date_finished
+                        skyprep_expiration_date = reference_expiration_date
+
+                        # Skip this course if course {i} in the Compare file is None
+                        if compare_values[f"course {i}"] is not None:
+
+                            # Initialize update needed as false
+                            update_needed = False
+
+                            # Condition 1: If course status is 'passed' in the compare sheet
+                            if compare_course_status == "passed":
+                                if reference_course_status == "passed":
+                                    if (reference_date_started is None) and (reference_date_finished is not None):
+                                        reference_date_started = reference_date_finished
+                                    elif (reference_date_started is not None) and (reference_date_finished is None):
+                                        reference_date_finished = reference_date_started
+                                    elif (reference_date_started is None) and (reference_date_finished is None):
+                                        reference_date_started = compare_date_started
+                                        reference_date_finished = compare_date_finished
+                                        reference_expiration_date = compare_expiration_date
+
+                                    if reference_expiration_date is None:
+                                        if compare_expiration_date.strftime("%Y") == "2050":
+                                            reference_expiration_date = compare_expiration_date
+                                        else:
+                                            reference_expiration_date = reference_date_finished + (compare_expiration_date - compare_date_finished)
+
+                                    if reference_date_started.strftime("%Y-%m-%d") == compare_date_started.strftime("%Y-%d-%m"):
+                                        update_needed = False
+                                    elif reference_date_finished > compare_date_finished:
+                                        compare_values[f"course {i} date started"] = reference_date_started
+                                        compare_values[f"course {i} date finished"] = reference_date_finished
+                                        compare_values[f"course {i} expiration date"] = reference_expiration_date
+
+                                        update_needed = True
+                                else:
+                                    update_needed = False
+
+                            # Condition 2: If course status is 'not-started' in the compare sheet
+                            elif compare_course_status == "not-started":
+                                if (reference_course_status == "passed"):
+                                    if reference_date_started is None and reference_date_finished is not None:
+                                        reference_date_started = reference_date_finished
+                                    elif reference_date_started is not None and reference_date_finished is None:
+                                        reference_date_finished = reference_date_started
+
+                                    compare_values[f"course {i} status"] = reference_course_status
+                                    compare_values[f"course {i} date started"] = reference_date_started
+                                    compare_values[f"course {i} date finished"] = reference_date_finished
+                                    compare_values[f"course {i} expiration date"] = reference_expiration_date
+
+                                    update_needed = True
+
+                                elif (reference_course_status == "in-progress"):
+                                    compare_values[f"course {i} status"] = reference_course_status
+                                    compare_values[f"course {i} date started"] = reference_date_started
+                                    compare_values[f"course {i} deadline date"] = reference_deadline_date
+
+                                    update_needed = True
+
+                                else:
+                                    update_needed = False
+
+                            if update_needed == True:
+                                # Update Compare Sheet
+                                for key in ["status", "date started", "date finished", "deadline date", "expiration date"]:
+                                    col_name = f"course {i} {key}"
+                                    compare_sheet.cell(row=compare_row_idx, column=compare_indices[col_name] + 1).value = compare_values[col_name]
+
+                            # Log the update
+                            update_log.append(
+                                f"{compare_key},{compare_last_name},{compare_first_name},"
+                                f"Course {i},{compare_values[f'course {i}']},"
+                                f"{compare_values[f'course {i} status']},"
+                                f"{compare_values[f'course {i} date started']},"
+                                f"{compare_values[f'course {i} date finished']},"
+                                f"{compare_values[f'course {i} expiration date']},"
+                                f"{skyprep_course_status},{skyprep_date_started},"
+                                f"{skyprep_date_finished},{skyprep_expiration_date},"
+                                f"{adp_course_status},{adp_date_started},"
+                                f"{adp_date_finished},{adp_expiration_date},"
+                                f"{compare_row_idx}"
+                            )
+    return {
+        "Compare": sheet_table(compare_sheet),
+        "Update Log": (["Update"], [[message] for message in update_log]),
+    }
@@ -0,0 +1,533 @@
+"""
+Differential correctness and throughput regression gate.
+
+Runs the frozen legacy logic of every stage (legacy_baseline.py) and
+every engine of SkyPrep_Migration.py on the same generated inputs,
+diffs their outputs cell by cell and checks throughput against
+recorded baselines. The GUI engines drive the real start_*_logic
+functions of each screen with a headless stand-in for Tk and read back
+the files they save, so the sharded, diff-only and column-projected
+output paths are checked as the operator gets them.
+
+Run with: python tests/regression_gate.py [--record-baselines]
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timedelta
+
+import openpyxl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import SkyPrep_Migration as sk  # noqa: E402
+import legacy_baseline  # noqa: E402
+
+regression_baselines_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regression_baselines.json")
+regression_throughput_tolerance = 0.25  # Allowed drop below the recorded rows per second
+regression_max_differences = 20  # Differences listed per output before stopping
+regression_shard_rows = 40  # Rows per shard file of the sharded output engines
+
+# region Generated Inputs
+def write_workbook(file_path, headers, rows):
+    """Write a header row and data rows into a new workbook."""
+    wb = openpyxl.Workbook(write_only=True)
+    sheet = wb.create_sheet()
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    wb.save(file_path)
+
+def generate_regression_inputs(directory, employees=200, seed=1):
+    """Write a deterministic set of inputs for every stage and return their paths by name."""
+    rng = random.Random(seed)
+    paths = {
+        name: os.path.join(directory, f"{name}.xlsx")
+        for name in ("report", "policies", "course_mapping", "user_list", "course_progresses", "compare", "reference")
+    }
+
+    def some_date():
+        return datetime(2018, 1, 1) + timedelta(days=rng.randint(0, 2500))
+
+    # ADP report with the cleaned columns, also used as the Transform main file
+    adp_courses = [f"ADP Course {i}" for i in range(1, 21)]
+    report_rows = []
+    for employee in range(1, employees + 1):
+        for course in rng.sample(adp_courses, rng.randint(1, 5)):
+            start_date = some_date()
+            recertification_date = rng.choice([None, start_date + timedelta(days=365), start_date - timedelta(days=30), start_date])
+            report_rows.append([
+                f"P{employee:05d}", f"Employee {employee}", course, start_date,
+                recertification_date, rng.choice([None, start_date]), rng.choice(["Operations", "Admin", None]),
+            ])
+    write_workbook(paths["report"], sk.cleaned_report_columns + ["Department"], report_rows)
+
+    # Policies report with missing effective, expiration and hire dates, and expirations on the hire date
+    policies_rows = []
+    for employee in range(1, employees + 1):
+        hire_date = rng.choice([some_date(), None])
+        for licence in rng.sample(range(1, 11), rng.randint(1, 3)):
+            effective_date = rng.choice([None, some_date()])
+            expiration_date = rng.choice([None, some_date(), hire_date])
+            policies_rows.append([
+                rng.choice(["Operations", None]), f"P{employee:05d}", f"Employee {employee}" if rng.random() > 0.05 else None,
+                f"Licence {licence}", effective_date, expiration_date, hire_date,
+            ])
+    write_workbook(paths["policies"], ["Department"] + sk.policies_report_columns, policies_rows)
+
+    # Course mapping with discarded, duplicated and unmapped courses
+    mapping_rows = [
+        [course, f"Course {idx % 15 + 1}", "Discard" if idx % 7 == 3 else f"SkyPrep Course {idx}"]
+        for idx, course in enumerate(adp_courses[:18])
+    ]
+    mapping_rows.append([adp_courses[1], "Course 99", "Duplicate mapping"])
+    write_workbook(paths["course_mapping"], ["Course Name Description", "Course Number", "Course Name"], mapping_rows)
+
+    # User list missing some employees and emails, with a duplicated work phone
+    user_rows = [
+        [10000 + employee, f"First{employee}", f"Last{employee}",
+         f"user{employee}@example.com" if rng.random() > 0.05 else None, f"P{employee:05d}"]
+        for employee in range(1, employees + 1) if rng.random() < 0.9
+    ]
+    user_rows.append([99999, "Duplicate", "User", "duplicate@example.com", "P00001"])
+    write_workbook(
+        paths["user_list"], ["skyprep_internal_id", "first_name", "last_name", "email_or_username", "work_phone"], user_rows
+    )
+
+    # Course progresses with duplicate courses per employee and courses beyond the last slot
+    progress_rows = []
+    for employee in range(1, employees + 1):
+        skyprep_id = 10000 + employee if rng.random() > 0.03 else None
+        email = f"user{employee}@example.com" if rng.random() > 0.02 else None
+        for course in rng.sample(range(1, 91), rng.randint(1, 8)) * rng.choice([1, 1, 2]):
+            start_date = some_date()
+            passed = rng.random() < 0.7
+            progress_rows.append([
+                skyprep_id, f"First{employee}", f"Last{employee}", email, f"P{employee:05d}",
+                f"Course {course}", f"SkyPrep Course {course}", "Active", "passed" if passed else "not-started",
+                start_date if passed else None, start_date + timedelta(days=3) if passed else None,
+                None, rng.choice([start_date + timedelta(days=365), datetime(2050, 1, 1)]) if passed else None,
+            ])
+    write_workbook(paths["course_progresses"], sk.transformed_headers, progress_rows)
+
+    # Compare and Reference bulk files sharing most employees
+    destination_columns = legacy_baseline.generate_destination_columns()
+
+    def bulk_row(employee, reference):
+        row = [10000 + employee, f"First{employee}", f"Last{employee}", f"user{employee}@example.com", f"P{employee:05d}"]
+        for course in range(1, 85):
+            if rng.random() >= 0.1:
+                row.extend([None] * 7)
+                continue
+            status = rng.choice(["passed", "not-started", "in-progress"])
+            start_date = some_date()
+            finish_date = start_date + timedelta(days=rng.randint(0, 30))
+            expiration_date = rng.choice([finish_date + timedelta(days=365), datetime(2050, 1, 1)])
+            if reference:
+                start_date, finish_date, expiration_date = (rng.choice([value, None]) for value in (start_date, finish_date, expiration_date))
+            elif status != "passed":
+                start_date = finish_date = expiration_date = None
+            row.extend([f"SkyPrep Course {course}", status, start_date, finish_date, None, rng.choice([None, some_date()]), expiration_date])
+        return row
+
+    write_workbook(paths["compare"], destination_columns, [bulk_row(employee, False) for employee in range(1, employees + 1)])
+    reference_employees = [employee for employee in range(1, employees + 1) if rng.random() < 0.9]
+    reference_employees += rng.sample(reference_employees, min(5, len(reference_employees)))
+    rng.shuffle(reference_employees)
+    write_workbook(paths["reference"], destination_columns, [bulk_row(employee, True) for employee in reference_employees])
+    return paths
+# endregion
+
+# region Headless GUI
+class FakeVar:
+    """Stand-in for a Tk variable."""
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+class FakeWidget(dict):
+    """Stand-in for the progress bars, buttons and labels a screen creates."""
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+
+    def pack(self, **kwargs):
+        pass
+
+    def pack_forget(self):
+        pass
+
+    def config(self, **kwargs):
+        pass
+
+    def update(self):
+        pass
+
+# Screen settings of a GUI run, overridden per engine
+gui_default_settings = {
+    "out_of_core_mode": False,
+    "staging_engine_mode": False,
+    "parallel_loading_mode": False,
+    "parallel_compare_mode": False,
+    "sharded_output_mode": False,
+    "shard_max_rows": regression_shard_rows,
+    "shard_max_mb": 0,
+    "diff_output_mode": False,
+    "diff_patch_file": False,
+    "memory_budget_mb": 1,
+    "stage_cache_mode": False,
+    "auto_plan_mode": False,
+    "selected_report": "",
+}
+
+@contextlib.contextmanager
+def headless_gui(work_dir, save_path, file_paths, settings):
+    """Run a screen of the tool without Tk, saving its output to save_path.
+
+    Replaces the Tk widgets, dialogs and variables of the module for the
+    duration of the run and restores them afterwards. Errors the screen
+    would show in a message box are raised as RuntimeError.
+    """
+    errors = []
+    replacements = {
+        "messagebox": types.SimpleNamespace(
+            showerror=lambda title, message: errors.append(message),
+            showinfo=lambda title, message: None,
+            askyesno=lambda title, message: False,
+        ),
+        "filedialog": types.SimpleNamespace(asksaveasfilename=lambda **kwargs: save_path),
+        "ttk": types.SimpleNamespace(Progressbar=FakeWidget),
+        "tk": types.SimpleNamespace(Button=FakeWidget),
+        "bottom_bar": None,
+        "plan_label": FakeWidget(),
+        "staging_db_path": os.path.join(work_dir, "staging.db"),
+        "compare_checkpoint_dir": os.path.join(work_dir, "compare_checkpoints"),
+    }
+    replacements.update({name: FakeVar(value) for name, value in {**gui_default_settings, **settings}.items()})
+    replacements.update(file_paths)
+    missing = object()
+    saved = {name: getattr(sk, name, missing) for name in replacements}
+
+    # Compare configures logging for update_log.txt, which only works on an unconfigured root logger
+    root_logger = logging.getLogger()
+    saved_handlers, saved_level = root_logger.handlers[:], root_logger.level
+    root_logger.handlers = []
+    saved_cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        for name, value in replacements.items():
+            setattr(sk, name, value)
+        yield
+    finally:
+        os.chdir(saved_cwd)
+        for handler in root_logger.handlers:
+            handler.close()
+        root_logger.handlers, root_logger.level = saved_handlers, saved_level
+        for name, value in saved.items():
+            if value is missing:
+                delattr(sk, name)
+            else:
+                setattr(sk, name, value)
+    if errors:
+        raise RuntimeError(errors[0])
+
+def read_workbook_tables(file_path):
+    """Read every sheet of a saved workbook as (headers, rows) tables, in sheet order."""
+    wb = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        tables = []
+        for sheet in wb.worksheets:
+            rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+            headers = rows[0] if rows else []
+            # Read-only sheets without a dimension record drop the trailing empty cells of a row
+            tables.append((headers, [row + [None] * (len(headers) - len(row)) for row in rows[1:]]))
+        return tables
+    finally:
+        wb.close()
+
+def read_gui_output(save_path, sheet_names, sharded=False):
+    """Read back what a screen saved, joining the shard files of a sharded output in manifest order."""
+    if not sharded:
+        return dict(zip(sheet_names, read_workbook_tables(save_path)))
+    with open(f"{os.path.splitext(save_path)[0]}_manifest.json") as manifest_file:
+        manifest = json.load(manifest_file)
+    headers, rows = None, []
+    for shard in manifest["shards"]:
+        (headers, shard_rows), = read_workbook_tables(os.path.join(os.path.dirname(save_path), shard["file"]))
+        rows.extend(shard_rows)
+    return {sheet_names[0]: (headers, rows)}
+
+def read_update_log(work_dir):
+    """Read the update log of a GUI Compare without its timestamps."""
+    with open(os.path.join(work_dir, "update_log.txt")) as log_file:
+        lines = log_file.read().splitlines()[1:]
+    return (["Update"], [[line.rsplit(",", 1)[0]] for line in lines])
+
+def merge_compare_diff(compare_path, diff_table):
+    """Apply a diff-only Compare output to the original Compare file, giving the full updated file."""
+    (headers, rows), = read_workbook_tables(compare_path)
+    key_idx = headers.index("skyprep_internal_id")
+    rows_by_key = {row[key_idx]: row for row in rows}
+    diff_headers, diff_rows = diff_table
+    diff_key_idx = diff_headers.index("skyprep_internal_id")
+    for diff_row in diff_rows:
+        row = rows_by_key[diff_row[diff_key_idx]]
+        for header, value in zip(diff_headers, diff_row):
+            row[headers.index(header)] = value
+    return headers, rows
+
+def gui_clean(report_type, input_name, **settings):
+    """Engine running the Clean screen on one report."""
+    def run(paths, work_dir):
+        save_path = os.path.join(work_dir, "gui_clean.xlsx")
+        settings["selected_report"] = report_type
+        with headless_gui(work_dir, save_path, {"clean_file_path": paths[input_name]}, settings):
+            sk.start_clean_logic()
+        return read_gui_output(save_path, ["Cleaned"])
+    return run
+
+def gui_transform(**settings):
+    """Engine running the Transform screen."""
+    def run(paths, work_dir):
+        save_path = os.path.join(work_dir, "gui_transform.xlsx")
+        file_paths = {
+            "transform_file_path": paths["report"],
+            "course_mapping_file_path": paths["course_mapping"],
+            "user_list_file_path": paths["user_list"],
+        }
+        with headless_gui(work_dir, save_path, file_paths, settings):
+            sk.start_transform_logic()
+        return read_gui_output(save_path, ["Transformed Data", "Discarded Data", "Not Found Records"])
+    return run
+
+def gui_transfer(**settings):
+    """Engine running the Transfer screen."""
+    def run(paths, work_dir):
+        save_path = os.path.join(work_dir, "gui_transfer.xlsx")
+        with headless_gui(work_dir, save_path, {"transfer_file_path": paths["course_progresses"]}, settings):
+            sk.start_transfer_logic()
+        return read_gui_output(save_path, ["Transferred"], settings.get("sharded_output_mode"))
+    return run
+
+def gui_compare(**settings):
+    """Engine running the Compare screen, merging a diff-only output back into the Compare file."""
+    def run(paths, work_dir):
+        save_path = os.path.join(work_dir, "gui_compare.xlsx")
+        file_paths = {"compare_file_path": paths["compare"], "reference_file_path": paths["reference"]}
+        with headless_gui(work_dir, save_path, file_paths, settings):
+            sk.start_compare_logic()
+        output = read_gui_output(save_path, ["Compare"], settings.get("sharded_output_mode"))
+        if settings.get("diff_output_mode"):
+            output["Compare"] = merge_compare_diff(paths["compare"], output["Compare"])
+        output["Update Log"] = read_update_log(work_dir)
+        return output
+    return run
+# endregion
+
+# region Engines
+def legacy_clean_deficiency(paths, work_dir):
+    return legacy_baseline.clean_deficiency(paths["report"])
+
+def legacy_clean_policies(paths, work_dir):
+    return legacy_baseline.clean_policies(paths["policies"])
+
+def legacy_clean_course_progresses(paths, work_dir):
+    return legacy_baseline.clean_course_progresses(paths["course_progresses"])
+
+def legacy_transform(paths, work_dir):
+    return legacy_baseline.transform(paths["report"], paths["course_mapping"], paths["user_list"])
+
+def legacy_transfer(paths, work_dir):
+    return legacy_baseline.transfer(paths["course_progresses"])
+
+def legacy_compare(paths, work_dir):
+    return legacy_baseline.compare(paths["compare"], paths["reference"])
+
+def pipeline_clean(report_type, input_name):
+    """Engine cleaning one report with the in-memory pipeline."""
+    def run(paths, work_dir):
+        return {"Cleaned": sk.run_pipeline(paths[input_name], ["Clean"], report_type=report_type)["table"]}
+    return run
+
+def pipeline_transform(paths, work_dir):
+    """Transform with the in-memory pipeline."""
+    results = sk.run_pipeline(paths["report"], ["Transform"], course_mapping=paths["course_mapping"], user_list=paths["user_list"])
+    return {
+        "Transformed Data": results["table"],
+        "Discarded Data": results["Discarded Data"],
+        "Not Found Records": results["Not Found Records"],
+    }
+
+def pipeline_transfer(paths, work_dir):
+    """Group the courses per employee with the in-memory pipeline."""
+    return {"Transferred": sk.run_pipeline(paths["course_progresses"], ["Transfer"])["table"]}
+
+def pipeline_compare(paths, work_dir):
+    """Compare with the in-memory pipeline."""
+    results = sk.run_pipeline(paths["compare"], ["Compare"], reference=paths["reference"])
+    return {"Compare": results["table"], "Update Log": (["Update"], [[message] for message in results["update_log"]])}
+
+# Stages checked by the gate: (input measured for throughput, engines with the legacy logic first)
+regression_gate_stages = {
+    "Clean Deficiency_Recertification": ("report", {
+        "legacy": legacy_clean_deficiency,
+        "gui": gui_clean("Deficiency_Recertification", "report"),
+        "pipeline": pipeline_clean("Deficiency_Recertification", "report"),
+    }),
+    "Clean Policies_Certifications_Vaccines_Licences": ("policies", {
+        "legacy": legacy_clean_policies,
+        "gui": gui_clean("Policies_Certifications_Vaccines_Licences", "policies"),
+        "pipeline": pipeline_clean("Policies_Certifications_Vaccines_Licences", "policies"),
+    }),
+    "Clean All_Course_Progresses": ("course_progresses", {
+        "legacy": legacy_clean_course_progresses,
+        "gui": gui_clean("All_Course_Progresses", "course_progresses"),
+        "gui out-of-core": gui_clean("All_Course_Progresses", "course_progresses", out_of_core_mode=True),
+        "pipeline": pipeline_clean("All_Course_Progresses", "course_progresses"),
+    }),
+    "Transform": ("report", {
+        "legacy": legacy_transform,
+        "gui": gui_transform(),
+        "gui parallel loading": gui_transform(parallel_loading_mode=True),
+        "gui staging": gui_transform(staging_engine_mode=True),
+        "pipeline": pipeline_transform,
+    }),
+    "Transfer": ("course_progresses", {
+        "legacy": legacy_transfer,
+        "gui": gui_transfer(),
+        "gui sharded": gui_transfer(sharded_output_mode=True),
+        "gui out-of-core": gui_transfer(out_of_core_mode=True),
+        "gui out-of-core sharded": gui_transfer(out_of_core_mode=True, sharded_output_mode=True),
+        "pipeline": pipeline_transfer,
+    }),
+    "Compare": ("compare", {
+        "legacy": legacy_compare,
+        "gui": gui_compare(),
+        "gui parallel loading": gui_compare(parallel_loading_mode=True),
+        "gui staging": gui_compare(staging_engine_mode=True),
+        "gui partitioned": gui_compare(parallel_compare_mode=True, parallel_loading_mode=True),
+        "gui diff-only": gui_compare(diff_output_mode=True),
+        "gui sharded": gui_compare(sharded_output_mode=True),
+        "gui diff-only sharded": gui_compare(diff_output_mode=True, sharded_output_mode=True),
+        "pipeline": pipeline_compare,
+    }),
+}
+# endregion
+
+# region Gate
+def diff_tables(expected, actual, max_differences=regression_max_differences):
+    """Compare two (headers, rows) tables cell by cell, as they would read back from a saved workbook."""
+    expected_headers, expected_rows = list(expected[0]), sk.handoff_rows(expected[1])
+    actual_headers, actual_rows = list(actual[0]), sk.handoff_rows(actual[1])
+    differences = []
+    if expected_headers != actual_headers:
+        differences.append(f"headers differ: expected {expected_headers[:8]}..., got {actual_headers[:8]}...")
+    if len(expected_rows) != len(actual_rows):
+        differences.append(f"expected {len(expected_rows)} rows, got {len(actual_rows)}")
+    for row_number, (expected_row, actual_row) in enumerate(zip(expected_rows, actual_rows), start=2):
+        for column_idx in range(max(len(expected_row), len(actual_row))):
+            expected_value = expected_row[column_idx] if column_idx < len(expected_row) else None
+            actual_value = actual_row[column_idx] if column_idx < len(actual_row) else None
+            if expected_value != actual_value:
+                header = expected_headers[column_idx] if column_idx < len(expected_headers) else column_idx + 1
+                differences.append(f"row {row_number}, column {header}: expected {expected_value!r}, got {actual_value!r}")
+                if len(differences) >= max_differences:
+                    return differences
+    return differences
+
+def run_regression_gate(employees=200, seed=1, baselines_path=regression_baselines_path,
+                        record_baselines=False, tolerance=regression_throughput_tolerance):
+    """Run every engine against the legacy logic on generated inputs.
+
+    Fails when an engine raises, when its output differs from the legacy
+    output in any cell, or when its throughput drops more than the
+    tolerance below the recorded baseline. Baselines are machine
+    specific and are written with record_baselines. Returns the report
+    lines and whether the gate passed.
+    """
+    baselines = {}
+    if os.path.exists(baselines_path) and not record_baselines:
+        with open(baselines_path) as baselines_file:
+            baselines = json.load(baselines_file)
+
+    work_dir = tempfile.mkdtemp(prefix="skyprep_gate_")
+    try:
+        paths = generate_regression_inputs(work_dir, employees, seed)
+        report_lines = []
+        measured = {}
+        passed = True
+        for stage, (input_name, engines) in regression_gate_stages.items():
+            input_rows = sk.count_excel_rows(paths[input_name])
+            expected_output = None
+            for engine_name, engine in engines.items():
+                key = f"{stage} / {engine_name}"
+                problems = []
+                start_time = time.perf_counter()
+                try:
+                    output = engine(paths, work_dir)
+                except Exception as e:
+                    output = None
+                    problems.append(f"raised {type(e).__name__}: {e}")
+                rows_per_second = input_rows / max(time.perf_counter() - start_time, 1e-9)
+
+                if output is not None:
+                    measured[key] = rows_per_second
+                if output is not None and expected_output is None:
+                    expected_output = output
+                elif output is not None:
+                    for output_name, expected_table in expected_output.items():
+                        if output_name not in output:
+                            problems.append(f"{output_name}: output missing")
+                            continue
+                        problems.extend(f"{output_name}: {difference}" for difference in diff_tables(expected_table, output[output_name]))
+                baseline = baselines.get(key)
+                if output is not None and baseline and rows_per_second < baseline * (1 - tolerance):
+                    problems.append(f"throughput {rows_per_second:,.0f} rows/s is below the baseline of {baseline:,.0f} rows/s")
+
+                passed = passed and not problems
+                baseline_text = f", baseline {baseline:,.0f}" if baseline else ""
+                report_lines.append(f"{'FAIL' if problems else 'ok  '} {key}: {rows_per_second:,.0f} rows/s{baseline_text}")
+                report_lines.extend(f"       {problem}" for problem in problems)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if record_baselines:
+        with open(baselines_path, "w") as baselines_file:
+            json.dump(measured, baselines_file, indent=2)
+        report_lines.append(f"Baselines recorded in {baselines_path}")
+    return report_lines, passed
+
+def main(arguments=None):
+    """Command line entry point of the regression gate, returning the exit code."""
+    parser = argparse.ArgumentParser(
+        prog="tests/regression_gate.py",
+        description="Check every stage engine against the legacy logic for identical output and throughput."
+    )
+    parser.add_argument("--employees", type=int, default=200, help="employees in the generated inputs")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the generated inputs")
+    parser.add_argument("--baselines", default=regression_baselines_path, help="baseline throughput file")
+    parser.add_argument("--record-baselines", action="store_true", help="record the measured throughput as the new baselines")
+    parser.add_argument("--tolerance", type=float, default=regression_throughput_tolerance,
+                        help="allowed throughput drop below the baselines, as a fraction")
+    options = parser.parse_args(arguments)
+    report_lines, passed = run_regression_gate(
+        options.employees, options.seed, options.baselines, options.record_baselines, options.tolerance
+    )
+    print("\n".join(report_lines))
+    print("Regression gate passed." if passed else "Regression gate FAILED.")
+    return 0 if passed else 1
+# endregion
+
+if __name__ == "__main__":
+    sys.exit(main())
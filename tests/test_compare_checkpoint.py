@@ -0,0 +1,42 @@
+import os
+
+import SkyPrep_Migration as sk
+from regression_gate import write_workbook
+
+
+def test_checkpoints_are_kept_per_input_pair(tmp_path):
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    compare_path = str(tmp_path / "compare.xlsx")
+    reference_path = str(tmp_path / "reference.xlsx")
+    other_path = str(tmp_path / "other.xlsx")
+    for path in (compare_path, reference_path, other_path):
+        write_workbook(path, ["skyprep_internal_id"], [["1"]])
+
+    checkpoint_path = sk.compare_checkpoint_file(compare_path, reference_path, checkpoint_dir)
+    assert os.path.dirname(checkpoint_path) == checkpoint_dir
+    assert sk.compare_checkpoint_file(compare_path, reference_path, checkpoint_dir) == checkpoint_path
+    assert sk.compare_checkpoint_file(compare_path, other_path, checkpoint_dir) != checkpoint_path
+    assert sk.compare_checkpoint_file(reference_path, compare_path, checkpoint_dir) != checkpoint_path
+
+
+def test_checkpoint_resumes_from_the_journal(tmp_path):
+    compare_path = str(tmp_path / "compare.xlsx")
+    reference_path = str(tmp_path / "reference.xlsx")
+    write_workbook(compare_path, ["skyprep_internal_id"], [["1"], ["2"]])
+    write_workbook(reference_path, ["skyprep_internal_id"], [["1"]])
+    checkpoint_path = sk.compare_checkpoint_file(compare_path, reference_path, str(tmp_path / "checkpoints"))
+
+    checkpoint = sk.new_compare_checkpoint(compare_path, reference_path)
+    sk.save_compare_checkpoint(checkpoint_path, checkpoint)
+    assert sk.load_compare_checkpoint(checkpoint_path, compare_path, reference_path) is None
+
+    sk.append_compare_journal(checkpoint_path, [(2, {(2, 1): "x"}, [("updated", "2024-01-01 00:00:00")])])
+    resumed = sk.load_compare_checkpoint(checkpoint_path, compare_path, reference_path)
+    assert resumed["last_row"] == 2 and resumed["cell_updates"] == {(2, 1): "x"}
+
+    # A changed input starts over
+    write_workbook(reference_path, ["skyprep_internal_id"], [["1"], ["3"]])
+    assert sk.load_compare_checkpoint(checkpoint_path, compare_path, reference_path) is None
+
+    sk.clear_compare_checkpoint(checkpoint_path)
+    assert os.listdir(os.path.dirname(checkpoint_path)) == []
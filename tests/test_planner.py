@@ -0,0 +1,52 @@
+import pytest
+
+import SkyPrep_Migration as sk
+
+
+@pytest.fixture
+def sheet_rows(monkeypatch):
+    """Make every input look like a sheet of the given number of rows and columns."""
+    def set_size(rows, columns=20):
+        monkeypatch.setattr(sk, "estimate_sheet_size", lambda file_path: (rows, columns))
+    return set_size
+
+
+def test_plan_stage_spills_files_over_the_budget(sheet_rows):
+    sheet_rows(1000)
+    assert sk.plan_stage("Transfer", ["a.xlsx"], 4096, cores=4)["settings"] == {"out_of_core_mode": False}
+    assert sk.plan_stage("Transfer", ["a.xlsx"], 1, cores=4)["settings"] == {"out_of_core_mode": True}
+    assert sk.plan_stage("Deficiency_Recertification", ["a.xlsx"], 1, cores=4)["strategy"] == "streaming"
+
+
+def test_plan_stage_transform(sheet_rows):
+    paths = ["report.xlsx", "mapping.xlsx", "users.xlsx"]
+    sheet_rows(sk.planner_small_rows - 1)
+    assert sk.plan_stage("Transform", paths, 4096, cores=4)["strategy"] == "in-memory scan"
+    sheet_rows(sk.planner_small_rows)
+    assert sk.plan_stage("Transform", paths, 4096, cores=4)["settings"] == {
+        "staging_engine_mode": False, "parallel_loading_mode": True,
+    }
+    # Without a second core the lookups are indexed in-process instead
+    assert sk.plan_stage("Transform", paths, 4096, cores=1)["settings"] == {
+        "staging_engine_mode": True, "parallel_loading_mode": False,
+    }
+    assert sk.plan_stage("Transform", paths, 1, cores=4)["strategy"] == "SQLite staging"
+
+
+def test_plan_stage_compare(sheet_rows):
+    paths = ["compare.xlsx", "reference.xlsx"]
+    sheet_rows(sk.planner_small_rows - 1)
+    assert sk.plan_stage("Compare", paths, 4096, cores=4)["settings"] == {
+        "staging_engine_mode": False, "parallel_loading_mode": False, "parallel_compare_mode": False,
+    }
+    sheet_rows(sk.planner_parallel_rows)
+    assert sk.plan_stage("Compare", paths, 65536, cores=4)["settings"] == {
+        "staging_engine_mode": False, "parallel_loading_mode": True, "parallel_compare_mode": True,
+    }
+    assert sk.plan_stage("Compare", paths, 65536, cores=1)["settings"] == {
+        "staging_engine_mode": True, "parallel_loading_mode": False, "parallel_compare_mode": False,
+    }
+    # Over the budget the Reference stays on disk, so it is not partitioned in memory either
+    plan = sk.plan_stage("Compare", paths, 1, cores=4)
+    assert plan["settings"] == {"staging_engine_mode": True, "parallel_loading_mode": False, "parallel_compare_mode": False}
+    assert plan["strategy"] == "SQLite staging"
@@ -0,0 +1,30 @@
+import random
+
+import SkyPrep_Migration as sk
+from regression_gate import write_workbook
+
+
+def test_random_sample_reads_only_the_sampled_rows(tmp_path, monkeypatch):
+    file_path = str(tmp_path / "report.xlsx")
+    rows = [[f"E{idx}", idx, f"Course {idx % 7}"] for idx in range(500)]
+    write_workbook(file_path, ["id", "number", "course"], rows)
+
+    def no_full_scan(file_path):
+        raise AssertionError("a random sample must not stream the whole sheet through openpyxl")
+
+    monkeypatch.setattr(sk, "iter_excel_rows", no_full_scan)
+    random.seed(3)
+    headers, sample, total_rows, _, _ = sk.sample_excel_rows(file_path, 20, random_sample=True)
+    assert headers == ["id", "number", "course"]
+    assert total_rows == 500 and len(sample) == 20
+    # The sample is a set of distinct rows of the file, in file order
+    positions = [int(row[0][1:]) for row in sample]
+    assert positions == sorted(set(positions))
+    assert [list(row) for row in sample] == [rows[position] for position in positions]
+
+
+def test_random_sample_of_a_small_file_takes_every_row(tmp_path):
+    file_path = str(tmp_path / "report.xlsx")
+    write_workbook(file_path, ["id"], [["E1"], ["E2"]])
+    _, sample, total_rows, _, _ = sk.sample_excel_rows(file_path, 50, random_sample=True)
+    assert sample == [("E1",), ("E2",)] and total_rows == 2
@@ -0,0 +1,46 @@
+import types
+
+import pytest
+
+import SkyPrep_Migration as sk
+from regression_gate import write_workbook
+
+
+@pytest.fixture
+def xls_headers(monkeypatch):
+    """Answer pandas header reads of .xls files with the given columns, without an .xls engine."""
+    def set_headers(columns):
+        def read_excel(file_path, nrows=None):
+            assert file_path.endswith(".xls") and nrows == 0
+            return types.SimpleNamespace(columns=columns)
+        monkeypatch.setattr(sk, "pd", types.SimpleNamespace(read_excel=read_excel))
+    return set_headers
+
+
+@pytest.mark.parametrize("stage", ["All_Course_Progresses", "Transfer"])
+def test_probe_reads_xls_headers_of_the_pandas_stages(stage, xls_headers, tmp_path):
+    file_path = str(tmp_path / "report.xls")
+    required_columns = sk.stage_input_requirements[stage][0][1]
+    xls_headers(required_columns)
+    assert sk.probe_stage_inputs(stage, [file_path]) == []
+    xls_headers(required_columns[1:])
+    assert sk.probe_stage_inputs(stage, [file_path]) == [
+        f"Missing required columns in {sk.stage_input_requirements[stage][0][0]}: {required_columns[0]}"
+    ]
+
+
+def test_probe_rejects_xls_in_the_openpyxl_stages(xls_headers, tmp_path):
+    file_path = str(tmp_path / "report.xls")
+    (tmp_path / "report.xls").write_bytes(b"\xd0\xcf\x11\xe0 not a zip")
+    xls_headers(sk.stage_schemas["Deficiency_Recertification"])
+    problems = sk.probe_stage_inputs("Deficiency_Recertification", [file_path])
+    assert len(problems) == 1 and "cannot be read as an Excel workbook" in problems[0]
+
+
+def test_probe_reports_every_missing_column(tmp_path):
+    file_path = str(tmp_path / "main.xlsx")
+    write_workbook(file_path, ["Position ID", "Payroll Name"], [])
+    problems = sk.probe_stage_inputs("Deficiency_Recertification", [file_path])
+    assert problems == [
+        "Missing required columns in report: Course Name Description, Start Date, Recertification Date, Acquired Date"
+    ]
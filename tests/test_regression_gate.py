@@ -0,0 +1,22 @@
+import json
+
+from regression_gate import regression_gate_stages, run_regression_gate
+
+
+def test_every_engine_matches_the_legacy_logic(tmp_path):
+    # Without recorded baselines only the outputs are checked, not the throughput
+    report_lines, passed = run_regression_gate(employees=40, baselines_path=str(tmp_path / "baselines.json"))
+    assert passed, "\n".join(report_lines)
+
+
+def test_gate_fails_below_the_recorded_throughput(tmp_path):
+    baselines_path = tmp_path / "baselines.json"
+    baselines_path.write_text(json.dumps({
+        f"{stage} / {engine_name}": 1e12
+        for stage, (_, engines) in regression_gate_stages.items() for engine_name in engines
+    }))
+    report_lines, passed = run_regression_gate(employees=10, baselines_path=str(baselines_path))
+    assert not passed
+    problems = [line.strip() for line in report_lines if line.startswith("       ")]
+    assert problems and all(problem.startswith("throughput ") and "below the baseline" in problem for problem in problems)
+    assert sum(line.startswith("FAIL") for line in report_lines) == len(json.loads(baselines_path.read_text()))
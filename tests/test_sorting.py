@@ -0,0 +1,56 @@
+from datetime import date, datetime
+
+import SkyPrep_Migration as sk
+from regression_gate import write_workbook
+
+
+def test_descending_sort_key_orders_like_pandas():
+    values = [None, "b", 3, datetime(2024, 1, 2), "a", None, 10.5, date(2025, 6, 1), "c"]
+    ordered = sorted(values, key=sk.descending_sort_key)
+    assert ordered == [date(2025, 6, 1), datetime(2024, 1, 2), 10.5, 3, "c", "b", "a", None, None]
+
+
+def test_descending_text_compares_in_reverse():
+    assert sk.DescendingText("b") < sk.DescendingText("a")
+    assert sk.DescendingText("a") >= sk.DescendingText("b")
+    assert sorted(["a", "c", "b"], key=sk.DescendingText) == ["c", "b", "a"]
+
+
+def test_row_codec_round_trip():
+    headers = ["Employee", "Course Name", "Start Date", "Completion Date"]
+    rows = [
+        ("A1", "First Aid", datetime(2024, 3, 1), None),
+        ("A2", "First Aid", datetime(2024, 3, 1, 9, 30), "2024-04-01"),
+        ("A3", 42, date(2024, 5, 1), datetime(2024, 5, 2)),
+        ("A4", None, None, datetime(2024, 5, 2)),
+    ]
+    encode, decode = sk.make_row_codec(headers)
+    encoded = [encode(row) for row in rows]
+    # Repeated course names share one category code, midnight dates become day numbers
+    assert encoded[0][1] == encoded[1][1] == 0
+    assert encoded[0][2] == datetime(2024, 3, 1).toordinal()
+    assert [decode(row) for row in encoded] == rows
+
+
+def test_iter_excel_rows_pads_short_rows(tmp_path):
+    file_path = str(tmp_path / "short.xlsx")
+    write_workbook(file_path, ["a", "b", "c"], [[1, 2, 3], [4]])
+    assert list(sk.iter_excel_rows(file_path)) == [("a", "b", "c"), (1, 2, 3), (4, None, None)]
+
+
+def test_compact_columns_round_trip():
+    headers = ["Position ID", "Payroll Name", "Course Name Description", "Start Date", "Acquired Date"]
+    rows = [
+        (2, ("P1", "Ann", "First Aid", datetime(2024, 3, 1), None)),
+        (3, ("P1", "Ann", None, datetime(2024, 3, 1), datetime(2024, 3, 2, 8))),
+        (5, ("P2", "Bob", "CPR", None, datetime(2024, 3, 2))),
+        (6, ("P3", 7, "CPR", datetime(2024, 1, 1), date(2024, 1, 1))),
+    ]
+    table = sk.encode_compact_columns(headers, rows)
+    columns = dict(zip(headers, table["columns"]))
+    # Coded columns stay in int32 arrays unless a value has no code
+    assert columns["Course Name Description"].typecode == "i"
+    assert columns["Start Date"].typecode == "i"
+    assert isinstance(columns["Payroll Name"], list) and isinstance(columns["Acquired Date"], list)
+    assert sk.compact_table_rows(table) == 4
+    assert list(sk.iter_compact_columns(table)) == rows
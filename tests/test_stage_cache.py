@@ -0,0 +1,58 @@
+import os
+import time
+
+import SkyPrep_Migration as sk
+from regression_gate import write_workbook
+
+
+def write_bytes(size):
+    def write_files(entry_dir):
+        with open(os.path.join(entry_dir, sk.stage_result_file), "wb") as result_file:
+            result_file.write(b"x" * size)
+    return write_files
+
+
+def test_stage_cache_key_follows_content_report_and_rules(tmp_path, monkeypatch):
+    first_path = str(tmp_path / "first.xlsx")
+    copy_path = str(tmp_path / "copy.xlsx")
+    changed_path = str(tmp_path / "changed.xlsx")
+    write_workbook(first_path, ["id"], [["E1"]])
+    write_workbook(copy_path, ["id"], [["E1"]])
+    write_workbook(changed_path, ["id"], [["E2"]])
+
+    key = sk.stage_cache_key("Clean", [first_path], "All_Course_Progresses")
+    assert sk.stage_cache_key("Clean", [copy_path], "All_Course_Progresses") == key
+    assert sk.stage_cache_key("Clean", [changed_path], "All_Course_Progresses") != key
+    assert sk.stage_cache_key("Clean", [first_path], "Deficiency_Recertification") != key
+    assert sk.stage_cache_key("Transfer", [first_path]) != sk.stage_cache_key("Transfer", [first_path], parent_key=key)
+
+    # In-memory tables are keyed by their values
+    assert sk.stage_cache_key("Transform", [(["id"], [("E1",)])]) == sk.stage_cache_key("Transform", [(("id",), [["E1"]])])
+
+    monkeypatch.setattr(sk, "stage_rule_version", sk.stage_rule_version + ".next")
+    assert sk.stage_cache_key("Clean", [first_path], "All_Course_Progresses") != key
+
+
+def test_stage_cache_evicts_the_least_recently_used_entries(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    entry_size = 400 * 1024
+    sk.store_stage_cache("old", write_bytes(entry_size), cache_dir=cache_dir, max_mb=1)
+    sk.store_stage_cache("used", write_bytes(entry_size), cache_dir=cache_dir, max_mb=1)
+    now = time.time()
+    os.utime(os.path.join(cache_dir, "old"), (now - 200, now - 200))
+    os.utime(os.path.join(cache_dir, "used"), (now - 100, now - 100))
+
+    # Reading an entry marks it as recently used
+    assert sk.stage_cache_entry("used", cache_dir=cache_dir)
+    sk.store_stage_cache("new", write_bytes(entry_size), cache_dir=cache_dir, max_mb=1)
+
+    assert sk.stage_cache_entry("old", cache_dir=cache_dir) is None
+    assert sk.stage_cache_entry("used", cache_dir=cache_dir)
+    assert sk.stage_cache_entry("new", cache_dir=cache_dir)
+    assert sorted(os.listdir(cache_dir)) == ["new", "used"]
+
+
+def test_stage_cache_keeps_the_new_entry_over_the_limit(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    sk.store_stage_cache("big", write_bytes(2 * 1024 * 1024), cache_dir=cache_dir, max_mb=1)
+    assert sk.stage_cache_entry("big", cache_dir=cache_dir)
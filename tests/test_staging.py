@@ -0,0 +1,52 @@
+import pytest
+
+import SkyPrep_Migration as sk
+from regression_gate import write_workbook
+
+
+def staged_ids(connection, table_name):
+    return [row[0] for row in connection.execute(f'SELECT "id" FROM "{table_name}" ORDER BY row_number')]
+
+
+def test_stage_excel_file_reuses_an_unchanged_file(tmp_path, monkeypatch):
+    file_path = str(tmp_path / "input.xlsx")
+    write_workbook(file_path, ["id", "name"], [["E1", "Ann"], ["E2", "Bob"]])
+    connection = sk.open_staging_db(str(tmp_path / "stage.db"))
+    sk.stage_excel_file(connection, "input", file_path, ["id"])
+
+    def fail_to_read(file_path):
+        raise AssertionError("an unchanged file must not be read again")
+
+    monkeypatch.setattr(sk, "iter_excel_rows", fail_to_read)
+    sk.stage_excel_file(connection, "input", file_path, ["id"])
+    assert staged_ids(connection, "input") == ["E1", "E2"]
+    assert sk.staged_headers(connection, "input") == ["id", "name"]
+    connection.close()
+
+
+def test_stage_excel_file_crash_keeps_the_previous_table(tmp_path, monkeypatch):
+    old_path = str(tmp_path / "old.xlsx")
+    new_path = str(tmp_path / "new.xlsx")
+    write_workbook(old_path, ["id", "name"], [["E1", "Ann"], ["E2", "Bob"]])
+    write_workbook(new_path, ["id", "name"], [["E3", "Cy"]])
+    db_path = str(tmp_path / "stage.db")
+    connection = sk.open_staging_db(db_path)
+    sk.stage_excel_file(connection, "input", old_path, ["id"])
+
+    def crash_while_reading(file_path):
+        yield ("id", "name")
+        yield ("E3", "Cy")
+        raise OSError("disk went away")
+
+    monkeypatch.setattr(sk, "iter_excel_rows", crash_while_reading)
+    with pytest.raises(OSError):
+        sk.stage_excel_file(connection, "input", new_path, ["id"])
+    connection.close()
+
+    # The old table and its catalog row survive, so the old file is still reused as-is
+    connection = sk.open_staging_db(db_path)
+    assert staged_ids(connection, "input") == ["E1", "E2"]
+    monkeypatch.undo()
+    sk.stage_excel_file(connection, "input", new_path, ["id"])
+    assert staged_ids(connection, "input") == ["E3"]
+    connection.close()
@@ -0,0 +1,63 @@
+import os
+
+import SkyPrep_Migration as sk
+from regression_gate import write_workbook
+
+
+def test_scan_watch_folder_waits_for_a_stable_file(tmp_path):
+    drop_path = str(tmp_path / "drop.xlsx")
+    write_workbook(drop_path, ["id"], [["E1"]])
+    (tmp_path / "notes.txt").write_text("not a workbook")
+    (tmp_path / "~$drop.xlsx").write_bytes(b"lock file")
+
+    ready_paths, first_scan = sk.scan_watch_folder(str(tmp_path), {}, set())
+    assert ready_paths == [] and list(first_scan) == [drop_path]
+
+    ready_paths, second_scan = sk.scan_watch_folder(str(tmp_path), first_scan, set())
+    assert ready_paths == [drop_path]
+
+    # A processed file is not picked up again until it changes
+    processed = {second_scan[drop_path]}
+    assert sk.scan_watch_folder(str(tmp_path), second_scan, processed)[0] == []
+    stat = os.stat(drop_path)
+    os.utime(drop_path, (stat.st_atime, stat.st_mtime + 10))
+    ready_paths, changed_scan = sk.scan_watch_folder(str(tmp_path), second_scan, processed)
+    assert ready_paths == []
+    assert sk.scan_watch_folder(str(tmp_path), changed_scan, processed)[0] == [drop_path]
+
+
+def test_scan_watch_folder_skips_a_vanishing_file(tmp_path, monkeypatch):
+    kept_path = str(tmp_path / "kept.xlsx")
+    gone_path = str(tmp_path / "gone.xlsx")
+    write_workbook(kept_path, ["id"], [["E1"]])
+    write_workbook(gone_path, ["id"], [["E2"]])
+    file_fingerprint = sk.file_fingerprint
+
+    def fingerprint_after_removal(file_path):
+        if file_path == gone_path:
+            os.remove(gone_path)
+        return file_fingerprint(file_path)
+
+    monkeypatch.setattr(sk, "file_fingerprint", fingerprint_after_removal)
+    ready_paths, this_scan = sk.scan_watch_folder(str(tmp_path), {}, set())
+    assert ready_paths == [] and list(this_scan) == [kept_path]
+
+
+def test_watch_service_logs_to_the_log_file(tmp_path):
+    drop_dir = tmp_path / "drop"
+    drop_dir.mkdir()
+    (drop_dir / "notes.xlsx").write_bytes(b"not a workbook")
+    log_path = tmp_path / "watch.log"
+    sk.configure_watch_logging(str(log_path), "WARNING")
+    try:
+        sk.watch_folder(str(drop_dir), output_dir=str(tmp_path / "out"), interval=0, cache_dir=None, max_scans=2)
+    finally:
+        for handler in sk.watch_logger.handlers[:]:
+            sk.watch_logger.removeHandler(handler)
+            handler.close()
+        sk.watch_logger.propagate = True
+        sk.watch_logger.setLevel("NOTSET")
+    log_text = log_path.read_text()
+    # The unreadable drop is logged with its traceback, and the level filters out the start banner
+    assert " ERROR Error processing " in log_text.splitlines()[0] and "Traceback" in log_text
+    assert " INFO " not in log_text and "Watching" not in log_text